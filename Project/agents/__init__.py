@@ -1,6 +1,7 @@
 from .isolation_forest_agent import IsolationForestAgent
 from .svm_agent import SVMAgent
 from .autoencoder_agent import AutoencoderAgent
+from .knn_agent import KNNAgent
 from .meta_agent import MetaAgent
 from .base_agent import BaseAgent
 
@@ -8,5 +9,6 @@ __all__ = [
     "IsolationForestAgent",
     "SVMAgent",
     "AutoencoderAgent",
+    "KNNAgent",
     "MetaAgent",
 ]
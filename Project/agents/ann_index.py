@@ -0,0 +1,274 @@
+# agents/ann_index.py
+import numpy as np
+
+
+# -----------------------------
+# Distance helpers
+# -----------------------------
+def squared_distances(A, B, B_sq_norms=None):
+    """
+    Pairwise squared euclidean distances between rows of A and rows of B.
+    Uses ||a||^2 - 2ab + ||b||^2 so the work is a single matrix product.
+    """
+    A_sq = np.einsum("ij,ij->i", A, A)[:, None]
+    if B_sq_norms is None:
+        B_sq_norms = np.einsum("ij,ij->i", B, B)
+    D = A_sq - 2.0 * (A @ B.T) + B_sq_norms[None, :]
+    np.maximum(D, 0.0, out=D)
+    return D
+
+
+def exact_search(X, Q, k, chunk_size=1024):
+    """
+    Brute-force k-NN, used as ground truth for recall measurements.
+    :return: (distances, ids) of shape (n_queries, k), sorted by distance
+    """
+    X = np.asarray(X, dtype=np.float32)
+    Q = np.asarray(Q, dtype=np.float32)
+    k = min(k, X.shape[0])
+    X_sq = np.einsum("ij,ij->i", X, X)
+
+    all_d = np.empty((Q.shape[0], k), dtype=np.float32)
+    all_i = np.empty((Q.shape[0], k), dtype=np.int64)
+
+    for start in range(0, Q.shape[0], chunk_size):
+        D = squared_distances(Q[start:start + chunk_size], X, X_sq)
+        idx = np.argpartition(D, k - 1, axis=1)[:, :k]
+        d = np.take_along_axis(D, idx, axis=1)
+        order = np.argsort(d, axis=1)
+        all_d[start:start + chunk_size] = np.sqrt(np.take_along_axis(d, order, axis=1))
+        all_i[start:start + chunk_size] = np.take_along_axis(idx, order, axis=1)
+
+    return all_d, all_i
+
+
+def _kmeans(X, n_clusters, n_iter=10, seed=42):
+    """
+    Plain Lloyd k-means with k-means++ seeding.
+    Only used to place the coarse IVF centroids, so a few iterations are enough.
+    """
+    rng = np.random.default_rng(seed)
+    n = X.shape[0]
+
+    centroids = np.empty((n_clusters, X.shape[1]), dtype=np.float32)
+    centroids[0] = X[rng.integers(n)]
+    closest = squared_distances(X, centroids[:1])[:, 0]
+    for c in range(1, n_clusters):
+        total = closest.sum()
+        probs = closest / total if total > 0 else None
+        centroids[c] = X[rng.choice(n, p=probs)]
+        closest = np.minimum(closest, squared_distances(X, centroids[c:c + 1])[:, 0])
+
+    for _ in range(n_iter):
+        labels = np.argmin(squared_distances(X, centroids), axis=1)
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, X)
+        non_empty = counts > 0
+        centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+
+    return centroids
+
+
+def npz_path(path):
+    """ np.savez appends '.npz' to other names: save and load both use the name it writes. """
+    path = str(path)
+    return path if path.endswith(".npz") else f"{path}.npz"
+
+
+# -----------------------------
+# IVF index
+# -----------------------------
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index (pure NumPy).
+
+    - build(): places coarse centroids with k-means and buckets the vectors
+    - add(): incremental inserts into the existing buckets (no rebuild)
+    - search(): probes the n_probe closest buckets per query
+    - save() / load(): single .npz file
+    """
+
+    def __init__(self, n_lists=None, n_probe=8, kmeans_iters=10, max_train_rows=20000, seed=42):
+        """
+        :param n_lists: number of buckets (default: ~sqrt(n_rows) at build time)
+        :param n_probe: buckets visited per query, trades recall for latency
+        :param max_train_rows: rows sampled to place the centroids
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.kmeans_iters = kmeans_iters
+        self.max_train_rows = max_train_rows
+        self.seed = seed
+
+        self.centroids = None
+        self._vecs = []
+        self._ids = []
+        self._sizes = None
+        self.ntotal = 0
+
+    # =========================
+    # Build / insert
+    # =========================
+    def build(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        n = X.shape[0]
+        if n == 0:
+            raise ValueError("Cannot build an index on an empty matrix.")
+
+        n_lists = self.n_lists or int(np.clip(np.sqrt(n), 1, 4096))
+        n_lists = min(n_lists, n)
+
+        rng = np.random.default_rng(self.seed)
+        train = X if n <= self.max_train_rows else X[rng.choice(n, self.max_train_rows, replace=False)]
+        self.centroids = _kmeans(train, n_lists, n_iter=self.kmeans_iters, seed=self.seed)
+
+        dim = X.shape[1]
+        self._vecs = [np.empty((0, dim), dtype=np.float32) for _ in range(n_lists)]
+        self._ids = [np.empty(0, dtype=np.int64) for _ in range(n_lists)]
+        self._sizes = np.zeros(n_lists, dtype=np.int64)
+        self.ntotal = 0
+
+        self.add(X)
+        return self
+
+    def add(self, X):
+        """
+        Insert new vectors. Ids continue from the current total.
+        Buckets grow geometrically so repeated small inserts stay amortized O(1).
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if self.centroids is None:
+            return self.build(X)
+
+        ids = np.arange(self.ntotal, self.ntotal + X.shape[0], dtype=np.int64)
+        labels = self._assign(X)
+
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(len(self.centroids) + 1))
+
+        for l in np.unique(labels):
+            rows = order[bounds[l]:bounds[l + 1]]
+            size = self._sizes[l]
+            new_size = size + len(rows)
+
+            if new_size > len(self._ids[l]):
+                capacity = max(new_size, 2 * len(self._ids[l]), 16)
+                vecs = np.empty((capacity, X.shape[1]), dtype=np.float32)
+                vecs[:size] = self._vecs[l][:size]
+                id_buf = np.empty(capacity, dtype=np.int64)
+                id_buf[:size] = self._ids[l][:size]
+                self._vecs[l], self._ids[l] = vecs, id_buf
+
+            self._vecs[l][size:new_size] = X[rows]
+            self._ids[l][size:new_size] = ids[rows]
+            self._sizes[l] = new_size
+
+        self.ntotal += X.shape[0]
+        return ids
+
+    def _assign(self, X):
+        labels = np.empty(X.shape[0], dtype=np.int64)
+        for start in range(0, X.shape[0], 4096):
+            D = squared_distances(X[start:start + 4096], self.centroids)
+            labels[start:start + 4096] = np.argmin(D, axis=1)
+        return labels
+
+    # =========================
+    # Search
+    # =========================
+    def search(self, Q, k, n_probe=None):
+        """
+        Approximate k-NN search.
+        Queries are grouped per probed bucket, so every bucket is scanned with
+        one matrix product for all the queries that visit it.
+        :return: (distances, ids) of shape (n_queries, k); missing neighbours are inf / -1
+        """
+        if self.centroids is None:
+            raise ValueError("Index is empty. Call build() first.")
+
+        Q = np.asarray(Q, dtype=np.float32)
+        nq = Q.shape[0]
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+
+        best_d = np.full((nq, k), np.inf, dtype=np.float32)
+        best_i = np.full((nq, k), -1, dtype=np.int64)
+
+        D_c = squared_distances(Q, self.centroids)
+        if n_probe < len(self.centroids):
+            probes = np.argpartition(D_c, n_probe - 1, axis=1)[:, :n_probe]
+        else:
+            probes = np.tile(np.arange(len(self.centroids)), (nq, 1))
+
+        flat_lists = probes.ravel()
+        flat_queries = np.repeat(np.arange(nq), n_probe)
+        order = np.argsort(flat_lists, kind="stable")
+        bounds = np.searchsorted(flat_lists[order], np.arange(len(self.centroids) + 1))
+
+        for l in range(len(self.centroids)):
+            size = self._sizes[l]
+            if size == 0 or bounds[l] == bounds[l + 1]:
+                continue
+
+            qs = flat_queries[order[bounds[l]:bounds[l + 1]]]
+            D = squared_distances(Q[qs], self._vecs[l][:size]).astype(np.float32)
+
+            cand_d = np.concatenate([best_d[qs], D], axis=1)
+            cand_i = np.concatenate([best_i[qs], np.broadcast_to(self._ids[l][:size], D.shape)], axis=1)
+
+            top = np.argpartition(cand_d, k - 1, axis=1)[:, :k]
+            best_d[qs] = np.take_along_axis(cand_d, top, axis=1)
+            best_i[qs] = np.take_along_axis(cand_i, top, axis=1)
+
+        order = np.argsort(best_d, axis=1)
+        best_d = np.sqrt(np.take_along_axis(best_d, order, axis=1))
+        best_i = np.take_along_axis(best_i, order, axis=1)
+        return best_d, best_i
+
+    # =========================
+    # Persistence
+    # =========================
+    def get_state(self, prefix=""):
+        state = {
+            f"{prefix}params": np.array(
+                [self.n_lists or 0, self.n_probe, self.kmeans_iters, self.max_train_rows, self.seed, self.ntotal],
+                dtype=np.int64,
+            ),
+        }
+        # an index that was never built stores its params only (no object arrays, loadable without pickle)
+        if self.centroids is not None:
+            state[f"{prefix}centroids"] = self.centroids
+            state[f"{prefix}sizes"] = self._sizes
+            state[f"{prefix}vecs"] = np.concatenate([v[:s] for v, s in zip(self._vecs, self._sizes)])
+            state[f"{prefix}ids"] = np.concatenate([i[:s] for i, s in zip(self._ids, self._sizes)])
+        return state
+
+    @classmethod
+    def from_state(cls, state, prefix=""):
+        n_lists, n_probe, kmeans_iters, max_train_rows, seed, ntotal = state[f"{prefix}params"].tolist()
+        index = cls(n_lists=n_lists or None, n_probe=n_probe, kmeans_iters=kmeans_iters,
+                    max_train_rows=max_train_rows, seed=seed)
+
+        if f"{prefix}centroids" not in state:
+            return index
+
+        centroids = state[f"{prefix}centroids"]
+
+        sizes = state[f"{prefix}sizes"]
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        vecs, ids = state[f"{prefix}vecs"], state[f"{prefix}ids"]
+
+        index.centroids = centroids
+        index._sizes = sizes.copy()
+        index._vecs = [vecs[offsets[l]:offsets[l + 1]].copy() for l in range(len(sizes))]
+        index._ids = [ids[offsets[l]:offsets[l + 1]].copy() for l in range(len(sizes))]
+        index.ntotal = ntotal
+        return index
+
+    def save(self, path):
+        np.savez(npz_path(path), **self.get_state())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(npz_path(path)) as state:
+            return cls.from_state(dict(state))
@@ -10,7 +10,7 @@ from tf_keras.callbacks import EarlyStopping
 
 from sklearn.preprocessing import StandardScaler
 
-from .base_agent import BaseAgent
+from .base_agent import BaseAgent, top_contributions
 
 
 class AutoencoderAgent(BaseAgent):
@@ -21,6 +21,14 @@ class AutoencoderAgent(BaseAgent):
     - Stable random seed
     """
 
+    supports_sparse = False
+    supports_incremental = True
+    thread_safe = False
+    supports_attribution = True
+
+    # blocks up to this many rows are scored with model(X) instead of model.predict(X)
+    direct_call_rows = 4096
+
     def __init__(
         self,
         name="Autoencoder",
@@ -116,26 +124,80 @@ class AutoencoderAgent(BaseAgent):
             verbose=0
         )
 
+    def partial_fit(self, X, epochs=1):
+        """
+        Continue training on one more block of (benign) rows.
+        The scaler is fitted on the first block and then kept fixed,
+        so scores stay comparable across blocks.
+        """
+        if self.model is None:
+            if self.input_dim is None:
+                self.input_dim = X.shape[1]
+            self.scaler.fit(X)
+            self.model = self._build_model()
+
+        X_scaled = self.scaler.transform(X)
+
+        self.model.fit(
+            X_scaled,
+            X_scaled,
+            epochs=epochs,
+            batch_size=self.batch_size,
+            shuffle=True,
+            verbose=0
+        )
+
     # =========================
     # Scoring
     # =========================
-    def score(self, X):
+    def _squared_errors(self, X):
+        """ Per-feature squared reconstruction errors (num_samples, num_features). """
 
         if self.model is None:
             raise ValueError("Model not trained. Call fit() first.")
 
         X_scaled = self.scaler.transform(X)
 
-        reconstructions = self.model.predict(X_scaled, verbose=0)
+        if X_scaled.shape[0] <= self.direct_call_rows:
+            # small blocks (online micro-batches): a direct call skips predict()'s per-call setup
+            reconstructions = self.model(X_scaled, training=False).numpy()
+        else:
+            reconstructions = self.model.predict(X_scaled, verbose=0)
+
+        return np.square(X_scaled - reconstructions)
+
+    def score(self, X):
 
         # calculating MSE for each sample
-        reconstruction_error = np.mean(
-            np.square(X_scaled - reconstructions),
-            axis=1
-        )
+        reconstruction_error = np.mean(self._squared_errors(X), axis=1)
 
         return reconstruction_error
 
+    def score_with_attribution(self, X, top_k=3):
+        """
+        Reconstruction errors plus the features with the largest share of each row's error.
+        """
+        errors = self._squared_errors(X)
+        indices, shares = top_contributions(errors, top_k)
+        return np.mean(errors, axis=1), indices, shares
+
+    # =========================
+    # Pickling (model bundles)
+    # =========================
+    def __getstate__(self):
+        # Keras models do not pickle; keep the weights and rebuild the network on load
+        state = self.__dict__.copy()
+        state["model"] = None
+        state["weights"] = self.model.get_weights() if self.model is not None else None
+        return state
+
+    def __setstate__(self, state):
+        weights = state.pop("weights", None)
+        self.__dict__.update(state)
+        if weights is not None:
+            self.model = self._build_model()
+            self.model.set_weights(weights)
+
     # =========================
     # Prediction
     # =========================
@@ -146,5 +208,13 @@ class AutoencoderAgent(BaseAgent):
                 "Threshold not provided. Decide threshold in MetaAgent."
             )
 
-        scores = self.score(X)
+        return self.predict_from_scores(self.score(X), threshold)
+
+    def predict_from_scores(self, scores, threshold=None):
+
+        if threshold is None:
+            raise ValueError(
+                "Threshold not provided. Decide threshold in MetaAgent."
+            )
+
         return (scores > threshold).astype(int)
\ No newline at end of file
@@ -1,13 +1,77 @@
 # base_agent.py
 from abc import ABC, abstractmethod
 
+import numpy as np
+from scipy import sparse
+
+from .quantile_sketch import KLLSketch
+
+
+def iter_blocks(X, batch_size):
+    """
+    Yield consecutive row blocks of X (ndarray, DataFrame or sparse matrix).
+    """
+    n = X.shape[0]
+    for start in range(0, n, batch_size):
+        if hasattr(X, "iloc"):
+            yield X.iloc[start:start + batch_size]
+        else:
+            yield X[start:start + batch_size]
+
+
+def to_dense(X):
+    """
+    Densify a sparse block, leave everything else untouched.
+    """
+    return X.toarray() if sparse.issparse(X) else X
+
+
+def top_contributions(contributions, top_k=3, batch_size=4096):
+    """
+    The top_k features of every row of a (num_samples, num_features) matrix of
+    non-negative per-feature contributions (dense or sparse).
+    :return: (feature indices, shares of the row total), both (num_samples, top_k), largest first
+    """
+    top_k = min(top_k, contributions.shape[1])
+    indices, shares = [], []
+    for block in iter_blocks(contributions, batch_size):
+        block = np.asarray(to_dense(block), dtype=float)
+        idx = np.argpartition(-block, top_k - 1, axis=1)[:, :top_k]
+        values = np.take_along_axis(block, idx, axis=1)
+        order = np.argsort(-values, axis=1, kind="stable")
+        idx, values = np.take_along_axis(idx, order, axis=1), np.take_along_axis(values, order, axis=1)
+        totals = block.sum(axis=1, keepdims=True)
+        indices.append(idx)
+        shares.append(np.divide(values, totals, out=np.zeros_like(values), where=totals > 0))
+    if not indices:
+        return np.zeros((0, top_k), dtype=np.int64), np.zeros((0, top_k))
+    return np.vstack(indices), np.vstack(shares)
+
 
 class BaseAgent(ABC):
     """
     Abstract base class for all model agents.
     Enforces a common interface across agents.
+
+    Capability flags (override in subclasses):
+    - supports_sparse: score()/fit() accept scipy sparse matrices as-is
+    - supports_incremental: partial_fit() updates the model without a full refit
+    - thread_safe: score() may be called concurrently from several threads
+    - supports_attribution: score_with_attribution() returns the top contributing
+      features of every row, from the same pass that computes the scores
+
+    calibrate() fits a quantile sketch of the agent's scores, after which
+    contamination-based thresholds no longer depend on the batch being predicted.
     """
 
+    supports_sparse = False
+    supports_incremental = False
+    thread_safe = False
+    supports_attribution = False
+
+    # class-level default: agents pickled before calibration existed load uncalibrated
+    score_sketch = None
+
     def __init__(self, name):
         self.name = name
         self.model = None
@@ -27,17 +91,92 @@ class BaseAgent(ABC):
         """
         pass
 
+    def score_with_attribution(self, X, top_k=3):
+        """
+        Anomaly scores plus the top_k features behind each of them.
+        Only available for agents with supports_attribution = True.
+        :return: (scores, feature indices (num_samples, top_k), contribution shares (num_samples, top_k))
+        """
+        raise NotImplementedError(f"{self.get_name()} does not support feature attribution.")
+
+    def partial_fit(self, X):
+        """
+        Update the model with one more block of training rows.
+        Only available for agents with supports_incremental = True.
+        """
+        raise NotImplementedError(f"{self.get_name()} does not support incremental training.")
+
+    def score_batches(self, blocks):
+        """
+        Score an iterable of row blocks, yielding one score array per block.
+        Only one block needs to be in memory at a time.
+        """
+        for block in blocks:
+            if not self.supports_sparse:
+                block = to_dense(block)
+            yield self.score(block)
+
+    def score_stream(self, rows, batch_size=4096):
+        """
+        Generator-based scoring.
+        Accepts either a matrix (sliced into batches) or any iterable of
+        single feature rows (buffered into batches), and yields score arrays.
+        """
+        if hasattr(rows, "shape"):
+            yield from self.score_batches(iter_blocks(rows, batch_size))
+            return
+
+        buffer = []
+        for row in rows:
+            buffer.append(np.asarray(row).ravel())
+            if len(buffer) == batch_size:
+                yield self.score(np.vstack(buffer))
+                buffer = []
+
+        if buffer:
+            yield self.score(np.vstack(buffer))
+
     def predict(self, X, threshold=None):
         """
         Optional binary prediction from anomaly scores.
         """
-        scores = self.score(X)
+        return self.predict_from_scores(self.score(X), threshold)
 
+    def predict_from_scores(self, scores, threshold=None):
+        """
+        Binary prediction from already computed anomaly scores.
+        """
         if threshold is None:
             return scores
 
         return (scores > threshold).astype(int)
 
+    # =========================
+    # Calibration
+    # =========================
+    def calibrate(self, scores, k=1000):
+        """
+        Fit a score quantile sketch on calibration scores (e.g. the validation split).
+        """
+        self.score_sketch = KLLSketch(k).update(scores)
+        return self
+
+    def update_calibration(self, scores):
+        """
+        Add freshly scored rows to the calibration sketch (no-op when uncalibrated).
+        """
+        if self.score_sketch is not None:
+            self.score_sketch.update(scores)
+
+    def contamination_threshold(self, contamination):
+        """
+        Score above which a `contamination` fraction of the calibration data lies,
+        or None when the agent has not been calibrated.
+        """
+        if self.score_sketch is None:
+            return None
+        return float(self.score_sketch.quantile(1 - contamination))
+
     def get_name(self):
         """
         Return agent name.
@@ -1,16 +1,46 @@
 # isolation_forest_agent.py
 import numpy as np
+from scipy import sparse
 from sklearn.ensemble import IsolationForest
 
-from .base_agent import BaseAgent
+from .base_agent import BaseAgent, top_contributions
+
+
+def average_path_length(n_samples):
+    """
+    Average path length of an unsuccessful BST search in n_samples points: the
+    depth an isolation tree would still need below a leaf holding n_samples rows.
+    """
+    n_samples = np.asarray(n_samples, dtype=float)
+    lengths = np.zeros_like(n_samples)
+    lengths[n_samples == 2] = 1.0
+    many = n_samples > 2
+    lengths[many] = (2.0 * (np.log(n_samples[many] - 1.0) + np.euler_gamma)
+                     - 2.0 * (n_samples[many] - 1.0) / n_samples[many])
+    return lengths
 
 
 class IsolationForestAgent(BaseAgent):
     """
     Isolation Forest agent for anomaly detection.
     Higher score = more anomalous.
+
+    score_with_attribution() walks every tree once (tree.apply, as sklearn does)
+    and reads both the isolation depth and the features split on along the path
+    from tables compiled per leaf, so the explanation comes from the same traversal.
+    Each split on a row's path is credited to its feature with weight
+    log(training rows at the parent / training rows at the child): splits that cut
+    the row off from most of the data dominate, balanced splits count little.
     """
 
+    supports_sparse = True
+    supports_incremental = False
+    thread_safe = True
+    supports_attribution = True
+
+    # class-level default: agents pickled before attribution existed compile their paths on first use
+    paths_ = None
+
     def __init__(
         self,
         name="IsolationForest",
@@ -37,6 +67,7 @@ class IsolationForestAgent(BaseAgent):
         Train the Isolation Forest on numeric features only.
         """
         self.model.fit(X)
+        self.paths_ = None
 
 
     # =========================
@@ -56,12 +87,102 @@ class IsolationForestAgent(BaseAgent):
         # Flip sign: now higher = more anomalous
         return -scores
 
+    # =========================
+    # Attribution
+    # =========================
+    def _compile_paths(self, n_features):
+        """
+        Stack all trees' nodes into one table:
+        - offsets: first table row of every tree
+        - lengths: path length of every leaf (depth + average_path_length of its training rows)
+        - usage: sparse (total nodes, n_features), the features split on above every leaf,
+                 each split weighted by log(n_node_samples of the parent / of the child)
+        """
+        offsets, lengths, rows, cols, weights = [], [], [], [], []
+        total = 0
+        for tree, features in zip(self.model.estimators_, self.model.estimators_features_):
+            t = tree.tree_
+            internal = np.flatnonzero(t.children_left >= 0)
+            parent = np.full(t.node_count, -1)
+            parent[t.children_left[internal]] = internal
+            parent[t.children_right[internal]] = internal
+            # sklearn only indexes the columns of a tree when it saw a feature subset
+            feature_map = np.asarray(features) if len(features) != n_features else np.arange(n_features)
+
+            leaves = np.flatnonzero(t.children_left < 0)
+            depth = np.zeros(len(leaves))
+            n_samples = t.n_node_samples.astype(float)
+            path_rows, path_features, path_weights = [], [], []
+            current = leaves.copy()
+            while True:
+                up = parent[current]
+                active = up >= 0
+                if not active.any():
+                    break
+                depth += active
+                path_rows.append(leaves[active])
+                path_features.append(feature_map[t.feature[up[active]]])
+                path_weights.append(np.log(n_samples[up[active]] / n_samples[current[active]]))
+                current = np.where(active, up, current)
+
+            tree_lengths = np.zeros(t.node_count)
+            tree_lengths[leaves] = depth + average_path_length(t.n_node_samples[leaves])
+            empty = [np.zeros(0, dtype=np.int64)]
+
+            offsets.append(total)
+            lengths.append(tree_lengths)
+            rows.append(np.concatenate(path_rows or empty) + total)
+            cols.append(np.concatenate(path_features or empty))
+            weights.append(np.concatenate(path_weights or empty).astype(float))
+            total += t.node_count
+
+        usage = sparse.csr_matrix(
+            (np.concatenate(weights), (np.concatenate(rows), np.concatenate(cols))), shape=(total, n_features)
+        )
+        self.paths_ = {"offsets": np.asarray(offsets), "lengths": np.concatenate(lengths), "usage": usage,
+                       "n_features": n_features}
+        return self.paths_
+
+    def score_with_attribution(self, X, top_k=3):
+        """
+        Same scores as score(), plus the features that isolated each row the fastest.
+        """
+        n_features = X.shape[1]
+        paths = self.paths_
+        if paths is None or paths["n_features"] != n_features:
+            paths = self._compile_paths(n_features)
+
+        X = X.tocsr().astype(np.float32) if sparse.issparse(X) else np.ascontiguousarray(X, dtype=np.float32)
+        estimators = self.model.estimators_
+        leaves = np.empty((X.shape[0], len(estimators)), dtype=np.int64)
+        for i, (tree, features) in enumerate(zip(estimators, self.model.estimators_features_)):
+            X_tree = X[:, features] if len(features) != n_features else X
+            leaves[:, i] = tree.apply(X_tree, check_input=False) + paths["offsets"][i]
+
+        # sklearn's score_samples from the leaf path lengths
+        depths = paths["lengths"][leaves].sum(axis=1)
+        denominator = len(estimators) * average_path_length([self.model.max_samples_])[0]
+        normality = -2.0 ** (-np.divide(depths, denominator, out=np.ones_like(depths), where=denominator != 0))
+        scores = -(normality - self.model.offset_)
+
+        # one row per sample with a 1 at each of its leaves: summing the leaves' usage rows
+        n_samples, n_trees = leaves.shape
+        visited = sparse.csr_matrix(
+            (np.ones(leaves.size), leaves.ravel(), np.arange(0, leaves.size + 1, n_trees)),
+            shape=(n_samples, paths["usage"].shape[0])
+        )
+        indices, shares = top_contributions(visited @ paths["usage"], top_k)
+        return scores, indices, shares
+
 
     # =========================
     # Prediction
     # =========================
-    def predict(self, X, threshold=None):
-        scores = self.score(X)
+    def predict_from_scores(self, scores, threshold=None):
+
+        if threshold is None:
+            # calibrated: fixed threshold from the score sketch, independent of this batch
+            threshold = self.contamination_threshold(self.model.contamination)
 
         if threshold is None:
             # אם לא נשלח threshold, השתמש ב-contamination default
@@ -0,0 +1,137 @@
+# knn_agent.py
+import numpy as np
+
+from .base_agent import BaseAgent
+from .ann_index import IVFIndex, npz_path
+
+
+class KNNAgent(BaseAgent):
+    """
+    k-NN distance agent for anomaly detection.
+    Scores each sample by its mean distance to the k nearest benign training rows.
+    Higher score = more anomalous.
+
+    Features are reduced with PCA before indexing, and neighbours are found
+    through an IVF approximate nearest-neighbour index instead of brute force.
+
+    Standalone detector: used by the benchmarks and utils.knn_index_report,
+    not part of the run_pipeline ensemble (whose weight search covers three agents).
+    """
+
+    supports_sparse = False
+    supports_incremental = True
+    thread_safe = True
+
+    def __init__(
+        self,
+        name="KNN",
+        n_neighbors=5,
+        n_components=32,
+        n_lists=None,
+        n_probe=8,
+        seed=42
+    ):
+        super().__init__(name)
+
+        self.n_neighbors = n_neighbors
+        self.n_components = n_components
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+
+        self.mean_ = None
+        self.components_ = None
+        self.model = None
+
+
+    # =========================
+    # Feature reduction
+    # =========================
+    def _fit_reduction(self, X):
+        self.mean_ = X.mean(axis=0)
+        n_components = min(self.n_components, X.shape[0], X.shape[1])
+
+        # PCA through SVD of the centered data
+        _, _, Vt = np.linalg.svd(X - self.mean_, full_matrices=False)
+        self.components_ = Vt[:n_components].astype(np.float32)
+
+    def reduce(self, X):
+        """
+        Project samples onto the fitted principal components.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        return (X - self.mean_) @ self.components_.T
+
+
+    # =========================
+    # Training
+    # =========================
+    def fit(self, X):
+        """
+        Fit PCA and build the index on (benign) training rows.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        self._fit_reduction(X)
+
+        self.model = IVFIndex(n_lists=self.n_lists, n_probe=self.n_probe, seed=self.seed)
+        self.model.build(self.reduce(X))
+
+    def add(self, X):
+        """
+        Incrementally insert new benign rows into the index (PCA is kept fixed).
+        """
+        if self.model is None:
+            return self.fit(X)
+        self.model.add(self.reduce(X))
+
+    def partial_fit(self, X):
+        """
+        Incremental training = inserting the block into the index.
+        """
+        self.add(X)
+
+
+    # =========================
+    # Scoring
+    # =========================
+    def score(self, X):
+        """
+        Return anomaly scores.
+        Higher = farther from known benign behaviour.
+        """
+        if self.model is None:
+            raise ValueError("Model not trained. Call fit() first.")
+
+        distances, _ = self.model.search(self.reduce(X), self.n_neighbors)
+
+        # fewer than k rows in the probed buckets -> ignore the missing slots
+        distances = np.where(np.isinf(distances), np.nan, distances)
+        return np.nan_to_num(np.nanmean(distances, axis=1), nan=np.inf)
+
+
+    # =========================
+    # Persistence
+    # =========================
+    def save(self, path):
+        if self.model is None:
+            raise ValueError("Model not trained. Call fit() first.")
+        np.savez(
+            npz_path(path),
+            knn_params=np.array([self.n_neighbors, self.n_components, self.n_probe, self.seed], dtype=np.int64),
+            knn_mean=self.mean_,
+            knn_components=self.components_,
+            **self.model.get_state(prefix="index_")
+        )
+
+    @classmethod
+    def load(cls, path, name="KNN"):
+        with np.load(npz_path(path)) as state:
+            state = dict(state)
+
+        n_neighbors, n_components, n_probe, seed = state["knn_params"].tolist()
+        agent = cls(name=name, n_neighbors=n_neighbors, n_components=n_components, n_probe=n_probe, seed=seed)
+        agent.mean_ = state["knn_mean"]
+        agent.components_ = state["knn_components"]
+        agent.model = IVFIndex.from_state(state, prefix="index_")
+        agent.n_lists = agent.model.n_lists
+        return agent
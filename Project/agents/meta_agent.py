@@ -1,6 +1,11 @@
 # agents/meta_agent.py
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-from .base_agent import BaseAgent
+from scipy import sparse
+
+from .base_agent import BaseAgent, iter_blocks, to_dense
+from .quantile_sketch import KLLSketch
 
 class MetaAgent(BaseAgent):
     """
@@ -11,20 +16,44 @@ class MetaAgent(BaseAgent):
     - Hard majority vote option (uses percentile-based threshold if no threshold provided)
     - Supports X_val for agents that need it (e.g., Autoencoder)
     - Can return raw scores or binary predictions automatically
+    - Streaming: partial_fit / score_batches / score_stream over dict blocks
+    - Uses the agents' capability flags to pick chunking and parallelism
+    - calibrate(): per-agent and ensemble quantile sketches, so contamination thresholds
+      (hard-vote cutoffs, automatic predict threshold) are fixed lookups instead of
+      percentiles of whatever batch is being scored
     """
 
-    def __init__(self, agents, name="MetaAgent", weights=None, voting="soft", contamination=0.05):
+    # class-level defaults: ensembles pickled before calibration existed load uncalibrated
+    agent_thresholds_ = None
+    threshold_ = None
+    online_calibration = False
+
+    def __init__(self, agents, name="MetaAgent", weights=None, voting="soft", contamination=0.05,
+                 batch_size=None, n_jobs=1, online_calibration=False):
         """
         :param agents: list of BaseAgent instances
         :param weights: optional list of weights for each agent
         :param voting: 'soft' for weighted sum, 'hard' for majority vote
         :param contamination: fraction of data expected to be anomalies (for automatic threshold)
+        :param batch_size: optional row chunk size used when scoring (None = whole matrix,
+                           except sparse input for dense-only agents, which is always chunked)
+        :param n_jobs: number of threads used to score thread-safe agents concurrently
+        :param online_calibration: once calibrated, keep updating the sketches with every scored batch
         """
         super().__init__(name)
         self.agents = agents
         self.voting = voting.lower()
         assert self.voting in ["soft", "hard"], "voting must be 'soft' or 'hard'"
         self.contamination = contamination
+        self.batch_size = batch_size
+        self.n_jobs = n_jobs
+        self.online_calibration = online_calibration
+        self.score_sketch = None
+
+        # the ensemble is only as capable as its agents
+        self.supports_sparse = all(agent.supports_sparse for agent in agents)
+        self.supports_incremental = any(agent.supports_incremental for agent in agents)
+        self.thread_safe = all(agent.thread_safe for agent in agents)
 
         if weights is None:
             self.weights = np.ones(len(agents)) / len(agents)
@@ -39,50 +68,181 @@ class MetaAgent(BaseAgent):
         :param X_val_dict: optional dict {agent_name: X_features_for_validation} for agents that support it
         """
         for agent in self.agents:
-            agent_name = agent.get_name()
-            if agent_name not in X_dict:
-                raise ValueError(f"X_dict missing data for agent '{agent_name}'")
+            self.fit_agent(agent, X_dict, X_val_dict)
 
-            if agent_name == "Autoencoder" and X_val_dict is not None and agent_name in X_val_dict:
-                agent.fit(X_dict[agent_name], X_val=X_val_dict[agent_name])
-            else:
-                agent.fit(X_dict[agent_name])
+    def fit_agent(self, agent, X_dict, X_val_dict=None):
+        """
+        Fit one agent on its entry of X_dict (lets callers time or log agents one by one).
+        """
+        agent_name = agent.get_name()
+        if agent_name not in X_dict:
+            raise ValueError(f"X_dict missing data for agent '{agent_name}'")
 
+        if agent_name == "Autoencoder" and X_val_dict is not None and agent_name in X_val_dict:
+            agent.fit(X_dict[agent_name], X_val=X_val_dict[agent_name])
+        else:
+            agent.fit(X_dict[agent_name])
 
-    def score(self, X_dict):
+    def partial_fit(self, X_dict):
         """
-        Compute ensemble anomaly scores.
-        :param X_dict: dict of {agent_name: X_features_for_agent}
-        :return: np.array of final anomaly scores (higher = more anomalous)
+        Update the agents that support incremental training with one more block.
+        Agents without incremental support keep their current model.
         """
-        all_scores = []
         for agent in self.agents:
-            agent_name = agent.get_name()
-            if agent_name not in X_dict:
-                raise ValueError(f"X_dict missing data for agent '{agent_name}'")
-            scores = agent.score(X_dict[agent_name])
-            all_scores.append(scores)
+            if agent.supports_incremental and agent.get_name() in X_dict:
+                agent.partial_fit(X_dict[agent.get_name()])
+
+    # =========================
+    # Scoring
+    # =========================
+    def _score_agent(self, agent, X):
+        """
+        Score one agent, chunking when needed:
+        - sparse input for a dense-only agent is densified one chunk at a time
+        - otherwise chunks of batch_size rows if batch_size is set
+        """
+        batch_size = self.batch_size
+        if sparse.issparse(X) and not agent.supports_sparse:
+            batch_size = batch_size or 4096
+
+        if batch_size is None or X.shape[0] <= batch_size:
+            return np.asarray(agent.score(X if agent.supports_sparse else to_dense(X)))
+
+        return np.concatenate(list(agent.score_batches(iter_blocks(X, batch_size))))
+
+    def score_matrix(self, X_dict):
+        """
+        Raw per-agent scores.
+        Thread-safe agents run concurrently when n_jobs > 1; the rest run in the calling thread.
+        :return: np.array of shape (num_agents, num_samples)
+        """
+        for agent in self.agents:
+            if agent.get_name() not in X_dict:
+                raise ValueError(f"X_dict missing data for agent '{agent.get_name()}'")
+
+        all_scores = [None] * len(self.agents)
+        parallel = [i for i, agent in enumerate(self.agents) if agent.thread_safe] if self.n_jobs > 1 else []
+        futures = {}
+
+        executor = ThreadPoolExecutor(max_workers=self.n_jobs) if parallel else None
+        try:
+            for i in parallel:
+                agent = self.agents[i]
+                futures[i] = executor.submit(self._score_agent, agent, X_dict[agent.get_name()])
+
+            for i, agent in enumerate(self.agents):
+                if i not in futures:
+                    all_scores[i] = self._score_agent(agent, X_dict[agent.get_name()])
+
+            for i, future in futures.items():
+                all_scores[i] = future.result()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        return np.array(all_scores)
 
-        all_scores = np.array(all_scores)  # shape = (num_agents, num_samples)
+    def combine_scores(self, all_scores):
+        """
+        Combine a (num_agents, num_samples) score matrix into ensemble scores.
+        """
+        all_scores = np.asarray(all_scores)
 
         if self.voting == "soft":
             final_scores = np.dot(self.weights, all_scores)
         else:  # hard voting
-            # compute binary predictions per agent using percentile threshold
+            # compute binary predictions per agent: calibrated thresholds,
+            # or (uncalibrated) a percentile of this batch
             binary_preds = []
             for i, scores in enumerate(all_scores):
-                threshold = np.percentile(scores, 100 * (1 - self.contamination))
+                if self.agent_thresholds_ is not None:
+                    threshold = self.agent_thresholds_[i]
+                else:
+                    threshold = np.percentile(scores, 100 * (1 - self.contamination))
                 binary_preds.append((scores >= threshold).astype(int))
             binary_preds = np.array(binary_preds)
             final_scores = np.mean(binary_preds, axis=0)  # fraction of agents voting anomaly
 
         return final_scores
 
+    def score(self, X_dict):
+        """
+        Compute ensemble anomaly scores.
+        :param X_dict: dict of {agent_name: X_features_for_agent}
+        :return: np.array of final anomaly scores (higher = more anomalous)
+        """
+        all_scores = self.score_matrix(X_dict)
+        final_scores = self.combine_scores(all_scores)
+        if self.online_calibration and self.threshold_ is not None:
+            self.update_calibration(all_scores, final_scores)
+        return final_scores
+
+    # =========================
+    # Calibration
+    # =========================
+    def calibrate(self, X_dict=None, all_scores=None, k=1000):
+        """
+        Fit per-agent and ensemble score sketches on calibration data (e.g. the validation split).
+        Call it after the weights are final: the ensemble sketch depends on them.
+        :param X_dict: calibration rows, or
+        :param all_scores: their already computed (num_agents, num_samples) score matrix
+        """
+        if all_scores is None:
+            all_scores = self.score_matrix(X_dict)
+        all_scores = np.asarray(all_scores)
+
+        for agent, scores in zip(self.agents, all_scores):
+            agent.calibrate(scores, k=k)
+        # hard-vote cutoffs must exist before the (vote-fraction) ensemble scores are sketched
+        self._refresh_agent_thresholds()
+        self.score_sketch = KLLSketch(k).update(self.combine_scores(all_scores))
+        self.threshold_ = self.contamination_threshold(self.contamination)
+        return self
+
+    def update_calibration(self, all_scores, final_scores=None):
+        """
+        Add one scored batch to the sketches and refresh the cached thresholds.
+        Costs O(batch + k log k), independent of how much data the sketches have seen.
+        """
+        if self.threshold_ is None:
+            raise RuntimeError("MetaAgent is not calibrated. Call calibrate() first.")
+        all_scores = np.asarray(all_scores)
+        if final_scores is None:
+            final_scores = self.combine_scores(all_scores)
+
+        for agent, scores in zip(self.agents, all_scores):
+            agent.update_calibration(scores)
+        self.score_sketch.update(final_scores)
+        self._refresh_agent_thresholds()
+        self.threshold_ = self.contamination_threshold(self.contamination)
+
+    def _refresh_agent_thresholds(self):
+        self.agent_thresholds_ = np.array([agent.contamination_threshold(self.contamination)
+                                           for agent in self.agents])
+
+    def score_batches(self, blocks):
+        """
+        Score an iterable of X_dict blocks, yielding one score array per block.
+        """
+        for X_dict in blocks:
+            yield self.score(X_dict)
+
+    def score_stream(self, X_dict, batch_size=4096):
+        """
+        Generator-based scoring of a full X_dict, one row chunk at a time.
+        """
+        n = next(iter(X_dict.values())).shape[0]
+        for start in range(0, n, batch_size):
+            yield self.score({
+                name: X.iloc[start:start + batch_size] if hasattr(X, "iloc") else X[start:start + batch_size]
+                for name, X in X_dict.items()
+            })
+
     def predict(self, X_dict, threshold=None):
         """
         Return binary predictions.
         - If threshold=None, computes automatic threshold using contamination,
-        for both soft and hard voting.
+        for both soft and hard voting (fixed once calibrate() has been called).
         """
         final_scores = self.score(X_dict)
 
@@ -91,9 +251,11 @@ class MetaAgent(BaseAgent):
                 # majority vote
                 return (final_scores > 0.5).astype(int)
             else:  # soft voting
-                # compute automatic threshold from contamination
-                auto_thresh = np.percentile(final_scores, 100 * (1 - self.contamination))
+                # automatic threshold from contamination: calibrated, or a percentile of this batch
+                auto_thresh = self.threshold_
+                if auto_thresh is None:
+                    auto_thresh = np.percentile(final_scores, 100 * (1 - self.contamination))
                 return (final_scores >= auto_thresh).astype(int)
 
         # explicit threshold
-        return (final_scores >= threshold).astype(int)
\ No newline at end of file
+        return (final_scores >= threshold).astype(int)
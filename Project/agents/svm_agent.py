@@ -10,6 +10,11 @@ class SVMAgent(BaseAgent):
     One-Class SVM agent for anomaly detection.
     """
 
+    # libsvm requires the same sparsity at fit and score time
+    supports_sparse = False
+    supports_incremental = False
+    thread_safe = True
+
     def __init__(
         self,
         name="OneClassSVM",
@@ -61,9 +66,12 @@ class SVMAgent(BaseAgent):
     # =========================
     # Prediction
     # =========================
-    def predict(self, X, threshold=None):
-        scores = self.score(X)
+    def predict_from_scores(self, scores, threshold=None):
         
+        if threshold is None:
+            # calibrated: fixed threshold from the score sketch, independent of this batch
+            threshold = self.contamination_threshold(self.contamination)
+
         if threshold is None:
             # אם לא נשלח threshold, השתמש ב-contamination default
             n_outliers = max(1, int(len(scores) * self.contamination))
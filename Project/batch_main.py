@@ -0,0 +1,122 @@
+# batch_main.py
+"""
+Non-interactive batch runner.
+
+Runs the full pipeline for any list of dataset files in a process pool,
+writes per-enterprise results, then compares whatever enterprises finished.
+
+Example:
+    python batch_main.py data/Enterprise_A.csv data/Enterprise_B.csv data/Enterprise_C.csv --workers 3
+"""
+from bootstrap import setup_environment
+setup_environment()
+
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import utils.report_generator as rg
+from utils.coreset import CORESET_METHODS
+
+
+def _run_one(dataset_path, results_root, results_format, trace_memory, search_workers, tuning_cache,
+             behavior_features, dedup, coreset_size, coreset_method, coreset_agents, explain_top_k):
+    # imported inside the worker so every process builds its own TensorFlow state
+    from main import run_pipeline
+    return run_pipeline(dataset_path, results_root=results_root, results_format=results_format,
+                        trace_memory=trace_memory, search_workers=search_workers, tuning_cache=tuning_cache,
+                        behavior_features=behavior_features, dedup=dedup, coreset_size=coreset_size,
+                        coreset_method=coreset_method, coreset_agents=coreset_agents,
+                        explain_top_k=explain_top_k)
+
+
+def run_batch(dataset_paths, workers=1, results_root="Results", results_format="parquet", compare=True,
+              trace_memory=False, search_workers=1, tuning_cache=True, behavior_features=False, dedup=False,
+              coreset_size=None, coreset_method="stratified", coreset_agents=("OneClassSVM",), explain_top_k=3):
+    """
+    Run the pipeline for every dataset file.
+    :return: (finished enterprise names, {dataset_path: error message} for failures)
+    """
+    finished = []
+    failed = {}
+
+    # spawn: TensorFlow does not survive fork() reliably
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {
+            executor.submit(
+                _run_one, path, results_root, results_format, trace_memory, search_workers, tuning_cache,
+                behavior_features, dedup, coreset_size, coreset_method, coreset_agents, explain_top_k
+            ): path
+            for path in dataset_paths
+        }
+
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                name = future.result()
+                finished.append(name)
+                print(f"\n✅ Finished {name} ({path})")
+            except Exception as e:
+                failed[path] = repr(e)
+                print(f"\n❌ Failed {path}: {e!r}")
+
+    if compare and finished:
+        rg.compare_enterprises(results_root, enterprises=finished)
+
+    return finished, failed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the anomaly detection pipeline on several datasets.")
+    parser.add_argument("datasets", nargs="+", help="dataset CSV files (e.g. data/Enterprise_A.csv)")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes")
+    parser.add_argument("--results-dir", default="Results", help="root folder for per-enterprise results")
+    parser.add_argument("--results-format", default="parquet", choices=["parquet", "arrow", "csv"],
+                        help="file format of the per-enterprise anomaly results")
+    parser.add_argument("--no-compare", action="store_true", help="skip the cross-enterprise comparison")
+    parser.add_argument("--search-workers", type=int, default=1,
+                        help="processes for each pipeline's hyperparameter search (keep workers x this <= CPUs)")
+    parser.add_argument("--no-tuning-cache", action="store_true",
+                        help="always rerun the hyperparameter search instead of reusing .tuning_cache/")
+    parser.add_argument("--behavior-features", action="store_true",
+                        help="add per-user / per-host rolling-window features (utils.behavior_features)")
+    parser.add_argument("--dedup", action="store_true",
+                        help="score each distinct feature row once (pays off when many rows repeat)")
+    parser.add_argument("--coreset-size", type=int, default=None,
+                        help="train the --coreset-agents on at most this many benign rows (default: all)")
+    parser.add_argument("--coreset-method", default="stratified", choices=list(CORESET_METHODS),
+                        help="how the coreset is selected (utils.coreset)")
+    parser.add_argument("--coreset-agents", nargs="+", default=["OneClassSVM"],
+                        choices=["OneClassSVM", "Autoencoder"],
+                        help="agents trained on the coreset (the Autoencoder loses F1 on small training sets)")
+    parser.add_argument("--explain-top-k", type=int, default=3,
+                        help="top contributing features exported per predicted anomaly (0 disables it)")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="also trace Python allocations per stage (slows allocation-heavy stages)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    finished, failed = run_batch(
+        args.datasets,
+        workers=args.workers,
+        results_root=args.results_dir,
+        results_format=args.results_format,
+        compare=not args.no_compare,
+        trace_memory=args.tracemalloc,
+        search_workers=args.search_workers,
+        tuning_cache=not args.no_tuning_cache,
+        behavior_features=args.behavior_features,
+        dedup=args.dedup,
+        coreset_size=args.coreset_size,
+        coreset_method=args.coreset_method,
+        coreset_agents=tuple(args.coreset_agents),
+        explain_top_k=args.explain_top_k
+    )
+
+    print(f"\n✅ {len(finished)} enterprise(s) finished: {', '.join(sorted(finished)) or '-'}")
+    if failed:
+        print(f"❌ {len(failed)} failed: {', '.join(failed)}")
+        raise SystemExit(1)
@@ -0,0 +1,155 @@
+# benchmarks/coreset_impact.py
+"""
+F1 / fit-time impact of training OneClassSVM and the Autoencoder on a coreset
+of the benign training rows (utils.coreset) instead of all of them.
+
+For every input, method and budget:
+- the coreset is selected (timed)
+- both agents are fitted on it (timed)
+- the threshold is picked on the validation split (find_best_threshold)
+- test F1 is compared with the same agents fitted on all benign rows
+
+Run from the Project folder:
+    python -m benchmarks.coreset_impact --datasets A B C --budgets 500 2000
+    python -m benchmarks.coreset_impact --datasets --sizes 100000 --budgets 2000 5000 --full-max-rows 20000
+"""
+from bootstrap import setup_environment
+setup_environment()
+
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from utils.data_generator import PROFILES
+from utils.preprocessing import preprocess_for_metaagent
+from utils.metrics import classification_metrics
+from utils.coreset import select_coreset, CORESET_METHODS
+import utils.best_hyperparams as bh
+
+from agents.svm_agent import SVMAgent
+from benchmarks.run_benchmarks import BenchmarkRun, load_inputs, environment_info
+
+
+def make_agents(input_dim, args):
+    agents = [SVMAgent()]
+    try:
+        from agents.autoencoder_agent import AutoencoderAgent
+        agents.append(AutoencoderAgent(input_dim=input_dim, epochs=args.ae_epochs, latent_dim=16))
+    except ImportError as e:
+        print(f"❌ Autoencoder skipped: tensorflow unavailable ({e})")
+    return agents
+
+
+def fit_and_evaluate(run, name, label, X_fit, X_val, y_val, X_test, y_test, args):
+    """
+    Fit SVM / Autoencoder on X_fit; threshold on validation, F1 on test.
+    :return: {agent_name: {"fit_seconds", "f1"}}
+    """
+    results = {}
+    for agent in make_agents(X_fit.shape[1], args):
+        agent_name = agent.get_name()
+        # as in main.run_pipeline: the Autoencoder early-stops on the validation split
+        fit_kwargs = {"X_val": X_val} if agent_name == "Autoencoder" else {}
+        run.run(name, f"{agent_name}.fit[{label}]", X_fit.shape[0], agent.fit, X_fit, **fit_kwargs)
+        fit_record = run.records[-1]
+
+        threshold, _ = bh.find_best_threshold(agent.score(X_val), y_val)
+        preds = agent.predict_from_scores(agent.score(X_test), threshold=threshold)
+        f1 = classification_metrics(y_test, preds)["f1"]
+
+        fit_record.update(coreset=label, f1=round(float(f1), 4))
+        results[agent_name] = {"fit_seconds": fit_record["wall_seconds"], "f1": float(f1)}
+    return results
+
+
+def benchmark_input(run, name, df, args):
+    df = df.reset_index(drop=True)
+    X_dict, y = preprocess_for_metaagent(
+        df, text_col="command_text", label_col="is_anomaly", timestamp_col="timestamp", tfidf_max_features=512
+    )
+    X, y = X_dict["OneClassSVM"], pd.Series(y)
+
+    # same split as main.run_pipeline
+    X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
+    X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=0.5, random_state=42, stratify=y_temp)
+    benign_idx = y_train[y_train == 0].index.to_numpy()
+    if args.full_max_rows and len(benign_idx) > args.full_max_rows:
+        # reference fit on a random subset when all rows would not fit in time
+        benign_idx = np.sort(np.random.default_rng(42).choice(benign_idx, args.full_max_rows, replace=False))
+    X_benign = X[benign_idx]
+    strata = df.iloc[benign_idx][["user_id", "process_name"]]
+
+    full = fit_and_evaluate(run, name, "full", X_benign, X_val, y_val, X_test, y_test, args)
+
+    summary = []
+    for budget in args.budgets:
+        if budget >= len(benign_idx):
+            run.skip(name, f"coreset[{budget}]", f"budget >= {len(benign_idx)} benign rows")
+            continue
+        for method in args.methods:
+            label = f"{method}/{budget}"
+            keep = run.run(name, f"select[{label}]", len(benign_idx), select_coreset, X_benign, budget,
+                           method=method, strata=strata)
+            select_seconds = run.records[-1]["wall_seconds"]
+
+            results = fit_and_evaluate(run, name, label, X_benign[keep], X_val, y_val, X_test, y_test, args)
+            for agent_name, result in results.items():
+                reference = full[agent_name]
+                summary.append({
+                    "input": name, "agent": agent_name, "method": method, "budget": budget,
+                    "rows": len(benign_idx), "select_seconds": select_seconds,
+                    "fit_speedup": round(reference["fit_seconds"] / max(result["fit_seconds"], 1e-9), 2),
+                    "f1_full": round(reference["f1"], 4), "f1": round(result["f1"], 4),
+                    "f1_delta": round(result["f1"] - reference["f1"], 4),
+                })
+    return summary
+
+
+def print_summary(summary):
+    print("\n=== Coreset vs. full training (test F1, threshold picked on validation) ===\n")
+    print(f"{'input':>16} | {'agent':<16} | {'coreset':<16} | {'F1 full':>7} | {'F1':>7} | "
+          f"{'delta':>7} | {'fit speedup':>11}")
+    for row in summary:
+        label = f"{row['method']}/{row['budget']}"
+        print(f"{row['input']:>16} | {row['agent']:<16} | {label:<16} | {row['f1_full']:7.4f} | "
+              f"{row['f1']:7.4f} | {row['f1_delta']:+7.4f} | {row['fit_speedup']:10.2f}x")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure the F1 / fit-time impact of coreset training.")
+    parser.add_argument("--datasets", nargs="*", default=["A", "B", "C"], help="enterprise letters")
+    parser.add_argument("--sizes", nargs="*", type=int, default=[],
+                        help="synthetic input sizes (rows)")
+    parser.add_argument("--profile", default="C", choices=list(PROFILES), help="enterprise profile of the synthetic inputs")
+    parser.add_argument("--seed", type=int, default=42, help="seed of the synthetic inputs")
+    parser.add_argument("--budgets", nargs="+", type=int, default=[500, 2000], help="coreset sizes (rows)")
+    parser.add_argument("--methods", nargs="+", default=list(CORESET_METHODS), choices=list(CORESET_METHODS),
+                        help="coreset selection methods")
+    parser.add_argument("--full-max-rows", type=int, default=None,
+                        help="cap on the reference (full) training rows for very large inputs")
+    parser.add_argument("--ae-epochs", type=int, default=50, help="maximum Autoencoder epochs (early stopping)")
+    parser.add_argument("--output", default="benchmarks/coreset_results.json", help="JSON output path")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    run = BenchmarkRun(trace_memory=False)
+
+    summary = []
+    for name, df in load_inputs(args.datasets, args.sizes, args.profile, args.seed).items():
+        summary.extend(benchmark_input(run, name, df, args))
+
+    print_summary(summary)
+    report = {"environment": environment_info(run.tracer), "args": vars(args),
+              "summary": summary, "results": run.records}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Coreset results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
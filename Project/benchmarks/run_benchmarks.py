@@ -0,0 +1,267 @@
+# benchmarks/run_benchmarks.py
+"""
+Offline benchmark suite for preprocessing, agents and ensemble tuning.
+
+Times (wall + peak memory):
+- preprocess_for_metaagent
+- fit / score of every agent
+- find_best_nu, find_best_n_estimators_if, find_best_threshold
+- the MetaAgent weight + threshold search
+- MetaAgent.score with and without row deduplication (unique ratio + speedup)
+
+on the Enterprise datasets and on synthetic inputs from utils.data_generator.
+
+Run from the Project folder:
+    python -m benchmarks.run_benchmarks --datasets A B C --sizes 100000 1000000 --output benchmarks/results.json
+    python -m benchmarks.run_benchmarks --datasets A --sizes --compare benchmarks/baseline.json
+"""
+from bootstrap import setup_environment
+setup_environment()
+
+import argparse
+import contextlib
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.model_selection import train_test_split
+
+from utils.data_loader import load_dataset
+from utils.data_generator import generate_dataset, PROFILES
+from utils.preprocessing import preprocess_for_metaagent
+from utils.score_store import ScoreStore
+from utils.dedup import DedupScorer
+from utils.instrumentation import Tracer
+import utils.best_hyperparams as bh
+
+from agents.isolation_forest_agent import IsolationForestAgent
+from agents.svm_agent import SVMAgent
+from agents.knn_agent import KNNAgent
+from agents.meta_agent import MetaAgent
+
+
+# -----------------------------
+# Measurement
+# -----------------------------
+class BenchmarkRun:
+    """
+    Runs every benchmark as one stage of a Tracer and prints the records as they come.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.tracer = Tracer("benchmarks", trace_memory=trace_memory)
+        self.records = []
+
+    def run(self, input_name, benchmark, n_rows, fn, *args, quiet=True, **kwargs):
+        with contextlib.ExitStack() as stack:
+            if quiet:
+                # pipeline prints and tqdm bars would otherwise drown the table
+                stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+                stack.enter_context(contextlib.redirect_stderr(io.StringIO()))
+            with self.tracer.stage(benchmark, input=input_name, n_rows=int(n_rows)):
+                result = fn(*args, **kwargs)
+
+        record = {"benchmark": benchmark, **self.tracer.records[-1]}
+        del record["stage"], record["name"], record["depth"]
+        self.records.append(record)
+
+        memory = f"{record['tracemalloc_peak_mb']:9.1f} MB" if "tracemalloc_peak_mb" in record else "        -"
+        print(f"{input_name:>16} | {benchmark:<32} | {n_rows:>9} rows | "
+              f"{record['wall_seconds']:9.3f}s | {memory}")
+        return result
+
+    def skip(self, input_name, benchmark, reason):
+        self.records.append({"input": input_name, "benchmark": benchmark, "skipped": reason})
+        print(f"{input_name:>16} | {benchmark:<32} | skipped: {reason}")
+
+
+# -----------------------------
+# Inputs
+# -----------------------------
+def load_inputs(dataset_letters, sizes, synthetic_profile="C", seed=42):
+    inputs = {}
+    for letter in dataset_letters:
+        inputs[f"Enterprise_{letter}"] = load_dataset(f"data/Enterprise_{letter}.csv")
+
+    for n in sizes or []:
+        inputs[f"synthetic_{n}"] = generate_dataset(synthetic_profile, n, seed=seed)
+
+    return inputs
+
+
+def cap_rows(X, y, max_rows, seed=42):
+    if max_rows is None or X.shape[0] <= max_rows:
+        return X, y
+    idx = np.random.default_rng(seed).choice(X.shape[0], max_rows, replace=False)
+    return X[idx], y.iloc[idx].reset_index(drop=True)
+
+
+# -----------------------------
+# Benchmarks for one input
+# -----------------------------
+def benchmark_input(run, name, df, args):
+    X_dict, y = run.run(
+        name, "preprocess_for_metaagent", len(df),
+        preprocess_for_metaagent, df,
+        text_col="command_text", label_col="is_anomaly", timestamp_col="timestamp", tfidf_max_features=512
+    )
+    X, y = X_dict["IsolationForest"], pd.Series(y).reset_index(drop=True)
+
+    X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
+    X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=0.5, random_state=42, stratify=y_temp)
+    y_train, y_val = y_train.reset_index(drop=True), y_val.reset_index(drop=True)
+
+    X_fit, y_fit = cap_rows(X_train, y_train, args.max_train_rows)
+    X_benign = X_fit[y_fit.to_numpy() == 0]
+
+    agents = [IsolationForestAgent(), SVMAgent(), KNNAgent()]
+    fit_data = {"IsolationForest": X_fit, "OneClassSVM": X_benign, "KNN": X_benign}
+
+    try:
+        from agents.autoencoder_agent import AutoencoderAgent
+        agents.append(AutoencoderAgent(input_dim=X.shape[1], epochs=args.ae_epochs, latent_dim=16))
+        fit_data["Autoencoder"] = X_benign
+    except ImportError as e:
+        run.skip(name, "Autoencoder", f"tensorflow unavailable ({e})")
+
+    for agent in agents:
+        agent_name = agent.get_name()
+        X_agent = fit_data[agent_name]
+        run.run(name, f"{agent_name}.fit", X_agent.shape[0], agent.fit, X_agent)
+        run.run(name, f"{agent_name}.score", X_test.shape[0], agent.score, X_test)
+
+    # ensemble scoring of the test split: every row vs. each distinct feature row once
+    test_dict = {agent.get_name(): X_test for agent in agents}
+    full = run.run(name, "meta_score", X_test.shape[0], MetaAgent(agents).score, test_dict)
+    dedup = DedupScorer(MetaAgent(agents))
+    deduped = run.run(name, "meta_score_dedup", X_test.shape[0], dedup.score, test_dict)
+    speedup = run.records[-2]["wall_seconds"] / max(run.records[-1]["wall_seconds"], 1e-9)
+    run.records[-1].update(unique_ratio=dedup.stats()["unique_ratio"], speedup=round(speedup, 3),
+                           max_abs_diff=float(np.max(np.abs(full - deduped))))
+    print(f"{name:>16} | {'dedup':<32} | unique ratio {dedup.unique_ratio:.3f} | speedup {speedup:.2f}x")
+
+    # hyperparameter searches on a capped training set
+    X_tune, y_tune = cap_rows(X_train, y_train, args.max_tuning_rows)
+    X_tune_benign = X_tune[y_tune.to_numpy() == 0]
+    X_tune_val, y_tune_val = cap_rows(X_val, y_val, args.max_tuning_rows)
+
+    run.run(name, "find_best_nu", X_tune_benign.shape[0],
+            bh.find_best_nu, SVMAgent, X_tune_benign, X_tune_val, y_tune_val)
+    run.run(name, "find_best_n_estimators_if", X_tune.shape[0],
+            bh.find_best_n_estimators_if, X_tune, y_tune)
+
+    store = ScoreStore({"val": {agent.get_name(): X_val for agent in agents}})
+    val_scores = store.get(agents[0], "val")
+    run.run(name, "find_best_threshold", len(val_scores), bh.find_best_threshold, val_scores, y_val)
+
+    # the weight search covers the ensemble of run_pipeline: IsolationForest, OneClassSVM, Autoencoder
+    by_name = {agent.get_name(): agent for agent in agents}
+    if "Autoencoder" not in by_name:
+        run.skip(name, "meta_weight_search", "needs the Autoencoder (tensorflow unavailable)")
+        return
+    meta_agents = [by_name[key] for key in ("IsolationForest", "OneClassSVM", "Autoencoder")]
+    meta_agent = MetaAgent(meta_agents)
+    store.matrix(meta_agents, "val")  # scoring is benchmarked above, the search itself is timed here
+    run.run(name, "meta_weight_search", X_val.shape[0],
+            bh.find_best_weights_and_threshold_for_meta_agent, meta_agent, None, y_val, store=store, split="val")
+
+
+# -----------------------------
+# Regression comparison
+# -----------------------------
+def compare_to_baseline(records, baseline_records, tolerance=0.2, min_seconds=0.05):
+    """
+    Flag benchmarks whose wall time or peak memory grew by more than tolerance.
+    Timings below min_seconds are too noisy to judge and are ignored.
+    :return: list of regression dicts
+    """
+    baseline = {(r["input"], r["benchmark"]): r for r in baseline_records if "skipped" not in r}
+    regressions = []
+
+    print("\n=== Comparison against baseline ===\n")
+    for record in records:
+        key = (record["input"], record["benchmark"])
+        if "skipped" in record or key not in baseline:
+            continue
+
+        base = baseline[key]
+        for metric in ("wall_seconds", "tracemalloc_peak_mb"):
+            if metric not in base or metric not in record:
+                continue
+            old, new = base[metric], record[metric]
+            if metric == "wall_seconds" and max(old, new) < min_seconds:
+                continue
+
+            change = (new - old) / old if old > 0 else 0.0
+            flag = "❌ REGRESSION" if change > tolerance else ("✅ faster" if change < -tolerance else "")
+            print(f"{key[0]:>16} | {key[1]:<32} | {metric:<15} {old:10.3f} -> {new:10.3f} ({change:+.1%}) {flag}")
+
+            if change > tolerance:
+                regressions.append({"input": key[0], "benchmark": key[1], "metric": metric,
+                                    "baseline": old, "current": new, "change": change})
+
+    return regressions
+
+
+def environment_info(tracer):
+    trace = tracer.to_dict()
+    return {
+        "timestamp": trace["started"],
+        "python": trace["python"],
+        "platform": trace["platform"],
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing, agents and ensemble tuning.")
+    parser.add_argument("--datasets", nargs="*", default=["A", "B", "C"], help="enterprise letters")
+    parser.add_argument("--sizes", nargs="*", type=int, default=[100_000, 1_000_000],
+                        help="synthetic input sizes (rows); pass no value to skip")
+    parser.add_argument("--profile", default="C", choices=list(PROFILES), help="enterprise profile of the synthetic inputs")
+    parser.add_argument("--seed", type=int, default=42, help="seed of the synthetic inputs")
+    parser.add_argument("--max-train-rows", type=int, default=20_000,
+                        help="cap on agent training rows (OneClassSVM is super-linear)")
+    parser.add_argument("--max-tuning-rows", type=int, default=5_000,
+                        help="cap on rows used by the hyperparameter searches")
+    parser.add_argument("--ae-epochs", type=int, default=5, help="Autoencoder epochs")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="measure time and RSS only")
+    parser.add_argument("--output", default="benchmarks/results.json", help="JSON output path")
+    parser.add_argument("--compare", default=None, help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown / memory growth")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    run = BenchmarkRun(trace_memory=not args.no_tracemalloc)
+
+    inputs = load_inputs(args.datasets, args.sizes, args.profile, args.seed)
+    for name, df in inputs.items():
+        benchmark_input(run, name, df, args)
+
+    report = {"environment": environment_info(run.tracer), "args": vars(args), "results": run.records}
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(run.records, baseline["results"], tolerance=args.tolerance)
+        report["baseline"] = args.compare
+        report["regressions"] = regressions
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Benchmark results saved to {args.output}")
+
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) against {args.compare}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# follow.py
+"""
+Follow a growing command-log file (CSV or JSONL) and score new records as they arrive.
+
+Only newly appended lines are read; they are featurized with the fitted
+preprocessing state and scored by the saved MetaAgent (model bundle from
+main.py / batch_main.py) in small batches. Alerts are written as JSON lines as
+soon as their batch is scored. After each batch the file offset is checkpointed,
+so a restart continues after the last scored line instead of re-scoring old ones.
+A batch that cannot be scored is written to --dead-letter (or only counted) and
+its offset is committed too, so one bad batch never blocks the follower.
+
+Memory stays bounded: at most --batch-size records are buffered at a time.
+
+Usage:
+    python follow.py logs/commands.csv --model Results/Enterprise_A/model --alerts alerts.jsonl
+    python follow.py logs/commands.jsonl --from-start --once      # score what is there, then exit
+"""
+from bootstrap import setup_environment
+setup_environment()
+
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+
+from utils.log_follower import LogFollower
+from utils.online_scorer import OnlineScorer
+from utils.drift_monitor import AdaptiveScorer
+from utils.benign_allowlist import BenignAllowlist, ALLOWLIST_FILE
+
+
+def emit_alerts(records, results, out, emit_all=False):
+    """ Write one JSON line per alert (or per record with emit_all). :return: number of alerts """
+    n_alerts = 0
+    for record, result in zip(records, results):
+        if result["predicted_anomaly"] or emit_all:
+            out.write(json.dumps({**result, **record}) + "\n")
+            n_alerts += result["predicted_anomaly"]
+    out.flush()
+    return n_alerts
+
+
+def dead_letter_batch(records, error, dead_letter):
+    """ Write the records of a batch that failed to score, one JSON line each. """
+    print(f"❌ Batch of {len(records)} records failed to score: {error!r}", file=sys.stderr)
+    if dead_letter is None:
+        return
+    for record in records:
+        dead_letter.write(json.dumps({"error": repr(error), "record": record}, default=str) + "\n")
+    dead_letter.flush()
+
+
+def follow(path, scorer, out, fmt=None, checkpoint_path=None, from_start=False, batch_size=256,
+           max_delay=1.0, poll_interval=0.25, once=False, emit_all=False, status_every=10.0, dead_letter=None):
+    """
+    Score new records of path until interrupted (or, with once=True, until the end of the file).
+    A partially filled batch is scored after max_delay seconds, so alerts are never held back longer.
+    :param dead_letter: open file receiving the records of batches that failed to score (None = count only)
+    :return: dict with records / alerts / failed records / skipped lines
+    """
+    follower = LogFollower(path, fmt=fmt, checkpoint_path=checkpoint_path, from_start=from_start)
+    totals = {"records": 0, "alerts": 0, "failed": 0}
+    buffer = []
+    first_buffered = None
+    last_status = time.monotonic()
+    last_records = 0
+
+    def flush():
+        nonlocal buffer, first_buffered
+        try:
+            results = scorer.score_records(buffer)
+        except Exception as e:
+            # committing past the batch keeps a restart from failing on it again
+            dead_letter_batch(buffer, e, dead_letter)
+            totals["failed"] += len(buffer)
+        else:
+            totals["alerts"] += emit_alerts(buffer, results, out, emit_all)
+            totals["records"] += len(buffer)
+        follower.commit(records_scored=totals["records"], alerts=totals["alerts"], failed=totals["failed"])
+        buffer, first_buffered = [], None
+
+    try:
+        while True:
+            records = follower.poll(batch_size - len(buffer))
+            if records and first_buffered is None:
+                first_buffered = time.monotonic()
+            buffer += records
+
+            now = time.monotonic()
+            if buffer and (len(buffer) >= batch_size or now - first_buffered >= max_delay or
+                           (once and not records)):
+                flush()
+
+            if status_every and now - last_status >= status_every:
+                rate = (totals["records"] - last_records) / (now - last_status)
+                allowlist = getattr(scorer, "allowlist", None)
+                text_cache = getattr(scorer, "text_cache", None)
+                fast_path = f" | fast path {allowlist.hit_rate:.1%}" if allowlist is not None else ""
+                cached = f" | text cache {text_cache.hit_rate:.1%}" if text_cache is not None else ""
+                print(f"[follow] {totals['records']} records | {totals['alerts']} alerts | "
+                      f"{rate:.1f} records/s | lag {follower.lag_bytes()} bytes{fast_path}{cached}", file=sys.stderr)
+                last_status, last_records = now, totals["records"]
+
+            if not records:
+                if once and not buffer:
+                    break
+                time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        follower.close()
+
+    totals["skipped"] = follower.skipped
+    return totals
+
+
+def _stop_on_sigterm(signum, frame):
+    # service managers stop with SIGTERM: finish like Ctrl+C (the checkpoint is already saved per batch)
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a growing command-log file (like tail -f).")
+    parser.add_argument("path", help="CSV (with header) or JSONL log file")
+    parser.add_argument("--model", default="Results/Enterprise_A/model",
+                        help="model bundle directory written by main.py / batch_main.py")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    parser.add_argument("--checkpoint", help="offset checkpoint file (default: <path>.offset.json)")
+    parser.add_argument("--no-checkpoint", action="store_true")
+    parser.add_argument("--from-start", action="store_true",
+                        help="without a checkpoint, score the existing lines too (default: only new lines)")
+    parser.add_argument("--alerts", help="append alerts to this JSONL file (default: stdout)")
+    parser.add_argument("--all", action="store_true", help="emit every scored record, not only alerts")
+    parser.add_argument("--dead-letter", help="append the records of batches that fail to score to this JSONL file")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--max-delay", type=float, default=1.0,
+                        help="seconds a partial batch may wait before it is scored")
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--once", action="store_true", help="stop at the end of the file")
+    parser.add_argument("--drift-monitor", action="store_true",
+                        help="track score / feature drift and retrain + swap the model in the background")
+    parser.add_argument("--retrained-model-dir", help="also save retrained bundles here")
+    parser.add_argument("--allowlist", nargs="?", const="", metavar="PATH",
+                        help="known-benign fast path (counts persisted to PATH, default <model>/allowlist.npz)")
+    parser.add_argument("--text-cache-mb", type=float, default=64,
+                        help="memory budget of the command-text featurization cache (0 disables it)")
+    args = parser.parse_args()
+
+    checkpoint = None if args.no_checkpoint else (args.checkpoint or f"{args.path}.offset.json")
+    allowlist = None
+    if args.allowlist is not None:
+        allowlist = BenignAllowlist.open(args.allowlist or os.path.join(args.model, ALLOWLIST_FILE))
+    scorer = OnlineScorer.from_directory(args.model, allowlist=allowlist, text_cache_mb=args.text_cache_mb)
+    print(f"✅ Following {args.path} with {args.model} (threshold {scorer.threshold:.6f})", file=sys.stderr)
+    if args.drift_monitor:
+        scorer = AdaptiveScorer(scorer, save_dir=args.retrained_model_dir)
+
+    signal.signal(signal.SIGTERM, _stop_on_sigterm)
+    out = open(args.alerts, "a") if args.alerts else sys.stdout
+    dead_letter = open(args.dead_letter, "a") if args.dead_letter else None
+    try:
+        totals = follow(args.path, scorer, out, fmt=args.format, checkpoint_path=checkpoint,
+                        from_start=args.from_start, batch_size=args.batch_size, max_delay=args.max_delay,
+                        poll_interval=args.poll_interval, once=args.once, emit_all=args.all,
+                        dead_letter=dead_letter)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if dead_letter is not None:
+            dead_letter.close()
+        if hasattr(scorer, "close"):
+            scorer.close()
+
+    print(f"✅ Scored {totals['records']} records, {totals['alerts']} alerts "
+          f"({totals['skipped']} malformed lines skipped, {totals['failed']} records failed to score)",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# load_generator.py
+"""
+Load generator for serve.py.
+
+Opens --concurrency keep-alive connections, each sending POST /score requests
+(--records-per-request raw log rows each) as fast as the server answers, then
+reports client-side throughput and p50/p99 latency next to the server's /metrics.
+
+Usage:
+    python load_generator.py --data data/Enterprise_A.csv --requests 2000 --concurrency 32
+    python load_generator.py --profile C --requests 2000       # synthetic records (utils/data_generator)
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.data_generator import generate_dataset
+
+
+def load_records(data=None, profile="C", n_rows=10_000, seed=42):
+    """ Raw records as JSON-ready dicts (labels dropped, as a log shipper would send them). """
+    if data:
+        df = pd.read_csv(data, dtype=str, keep_default_na=False)
+    else:
+        df = generate_dataset(profile, n_rows, seed=seed).astype(str)
+    return df.drop(columns=["is_anomaly"], errors="ignore").to_dict("records")
+
+
+# -----------------------------
+# Minimal HTTP/1.1 client (keep-alive)
+# -----------------------------
+async def request(reader, writer, host, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        if key.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length)) if length else None
+
+
+async def client(host, port, records, request_ids, records_per_request, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in request_ids:
+            start = (i * records_per_request) % len(records)
+            batch = records[start:start + records_per_request] or records[:records_per_request]
+
+            t0 = time.perf_counter()
+            status, response = await request(reader, writer, host, "POST", "/score", {"records": batch})
+            latencies.append(time.perf_counter() - t0)
+            if status != 200 or len(response["results"]) != len(batch):
+                errors.append((status, response))
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, records, n_requests=1000, concurrency=16, records_per_request=1):
+    """
+    :return: dict with client-side results and the server's /metrics afterwards
+    """
+    latencies, errors = [], []
+    # request i goes to client i % concurrency
+    assignments = [range(c, n_requests, concurrency) for c in range(concurrency)]
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+        client(host, port, records, ids, records_per_request, latencies, errors) for ids in assignments if ids
+    ))
+    elapsed = time.perf_counter() - t0
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, server_metrics = await request(reader, writer, host, "GET", "/metrics")
+    writer.close()
+
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "records_per_second": len(latencies) * records_per_request / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "server": server_metrics,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send concurrent scoring requests to serve.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--data", help="CSV with raw log rows (default: synthetic records)")
+    parser.add_argument("--profile", default="C", help="synthetic profile A/B/C when --data is not given")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--records-per-request", type=int, default=1)
+    args = parser.parse_args()
+
+    records = load_records(args.data, args.profile)
+    result = asyncio.run(run_load(args.host, args.port, records, args.requests, args.concurrency,
+                                  args.records_per_request))
+
+    print(f"\n=== Load test: {result['requests']} requests x {args.records_per_request} records, "
+          f"concurrency {args.concurrency} ===\n")
+    print(f"Throughput : {result['requests_per_second']:.1f} req/s | {result['records_per_second']:.1f} records/s")
+    print(f"Latency    : p50 {result['p50_ms']:.2f} ms | p99 {result['p99_ms']:.2f} ms (client side)")
+    server = result["server"]
+    print(f"Server     : p50 {server['latency_ms']['p50']} ms | p99 {server['latency_ms']['p99']} ms | "
+          f"mean batch {server['mean_batch_size']} records | {server['batches']} batches")
+    print(f"{'✅' if not result['errors'] else '❌'} Errors: {result['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,15 +4,24 @@ setup_environment()
 
 import os
 import pandas as pd
-import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import f1_score, confusion_matrix, precision_score, recall_score
 
 
 from utils.preprocessing import preprocess_for_metaagent
+from utils.data_loader import load_dataset
 from utils.evaluation_utils import evaluate_agent, evaluate_ensemble
+from utils.score_store import ScoreStore
+from utils.metrics import classification_metrics
+from utils.results_writer import ResultsWriter, results_path, top_features_column
+from utils.instrumentation import Tracer
+from utils.model_io import save_bundle
+from utils.drift_monitor import build_reference
+from utils.benign_allowlist import BenignAllowlist, ALLOWLIST_FILE
+from utils.coreset import select_coreset
 import utils.report_generator as rg
 import utils.best_hyperparams as bh
+import utils.hyperparam_search as hs
+from utils.tuning_cache import TuningCache, cached_successive_halving_search
 
 from agents import (
     IsolationForestAgent,
@@ -22,29 +31,64 @@ from agents import (
 )
 
 
-def main():
-    # --------------------------
-    # 0. Choose dataset
-    # --------------------------
-    dataset_file, dataset_letter = bh.select_dataset()
-    results_folder = f"Results/Enterprise_{dataset_letter}"
-    os.makedirs(results_folder, exist_ok=True)  
+def enterprise_name_from_path(dataset_path):
+    """ data/Enterprise_A.csv -> Enterprise_A """
+    return os.path.splitext(os.path.basename(dataset_path))[0]
+
+
+def run_pipeline(dataset_path, enterprise_name=None, results_root="Results", results_format="parquet",
+                 results_batch_size=100_000, trace_memory=False, search_workers=None,
+                 tuning_cache=True, behavior_features=False, dedup=False, coreset_size=None,
+                 coreset_method="stratified", coreset_agents=("OneClassSVM",), explain_top_k=3):
+    """
+    Run the full workflow (load -> preprocess -> tune -> fit -> evaluate -> report)
+    for one dataset file, without any user interaction.
+    Results are written to {results_root}/{enterprise_name}/, together with a
+    per-stage timing/memory trace ({enterprise_name}_trace.json) and the fitted
+    model bundle (model/, used by serve.py to score new records).
+    :param results_format: 'parquet', 'arrow' or 'csv' for the anomaly results file
+    :param trace_memory: also follow Python allocations per stage with tracemalloc
+                         (several times slower in the tree / network fitting stages)
+    :param search_workers: processes for the hyperparameter search (None = all CPUs)
+    :param tuning_cache: reuse tuning results stored for the same data / search space (.tuning_cache/)
+    :param behavior_features: add per-user / per-host rolling-window features (utils.behavior_features)
+    :param dedup: score each distinct feature row of a split once (utils.dedup; slower when rows rarely repeat)
+    :param coreset_size: train the coreset_agents on at most this many benign rows (None = all)
+    :param coreset_method: 'stratified' (user x process), 'kmeans++' or 'herding' (utils.coreset)
+    :param coreset_agents: agents trained on the coreset; the Autoencoder is opt-in because it
+                           loses F1 on small training sets (benchmarks/coreset_impact.py)
+    :param explain_top_k: per predicted anomaly, export the top contributing features of every agent
+                          that supports attribution (IsolationForest, Autoencoder); 0 disables it
+    :return: enterprise_name
+    """
+    if enterprise_name is None:
+        enterprise_name = enterprise_name_from_path(dataset_path)
+
+    results_folder = f"{results_root}/{enterprise_name}"
+    os.makedirs(results_folder, exist_ok=True)
+
+    tracer = Tracer(enterprise_name, trace_memory=trace_memory)
+
     # --------------------------
     # 1. Load dataset
     # --------------------------
-    df = pd.read_csv(f"data/{dataset_file}")
+    with tracer.stage("load", path=dataset_path):
+        df = load_dataset(dataset_path)
 
     # --------------------------
     # 2. Preprocess data
     # --------------------------
-    X_dict, y = preprocess_for_metaagent(
-        df,
-        text_col='command_text',
-        label_col='is_anomaly',
-        timestamp_col='timestamp',
-        tfidf_max_features=512
-    )
-    y = pd.Series(y)
+    with tracer.stage("preprocess", rows=len(df), behavior_features=behavior_features):
+        X_dict, y, feature_pipeline = preprocess_for_metaagent(
+            df,
+            text_col='command_text',
+            label_col='is_anomaly',
+            timestamp_col='timestamp',
+            tfidf_max_features=512,
+            return_pipeline=True,
+            behavior_features=behavior_features
+        )
+        y = pd.Series(y)
 
 
     # --------------------------
@@ -55,43 +99,64 @@ def main():
     X_test_dict = {}
     y_train_dict = {}
 
-    # Assuming all features are in X_dict
-    for key, X in X_dict.items():
-
-        # Autoencoder has special train set without anomalies
-        X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
-        X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=0.5, random_state=42, stratify=y_temp)
-
-        if key == "Autoencoder" or key == "OneClassSVM":
-            benign_idx = y_train[y_train == 0].index
-            X_train = X[benign_idx]
-            y_train = y_train[benign_idx]
-
-        X_train_dict[key] = X_train
-        X_val_dict[key] = X_val
-        X_test_dict[key] = X_test
-        y_train_dict[key] = y_train
+    with tracer.stage("split"):
+        # Assuming all features are in X_dict
+        for key, X in X_dict.items():
+
+            # Autoencoder has special train set without anomalies
+            X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
+            X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=0.5, random_state=42, stratify=y_temp)
+
+            if key in ("Autoencoder", "OneClassSVM"):
+                benign_idx = y_train[y_train == 0].index
+                X_train = X[benign_idx]
+                y_train = y_train[benign_idx]
+
+            X_train_dict[key] = X_train
+            X_val_dict[key] = X_val
+            X_test_dict[key] = X_test
+            y_train_dict[key] = y_train
+
+    # The one-class agents share the same benign training rows: select their coreset once
+    benign_keys = [key for key in coreset_agents if key in X_train_dict]
+    if coreset_size and benign_keys:
+        y_benign = y_train_dict[benign_keys[0]]
+        with tracer.stage("coreset", method=coreset_method, budget=coreset_size, rows=len(y_benign)):
+            strata = None
+            if coreset_method == "stratified":
+                strata = df.loc[y_benign.index, ["user_id", "process_name"]]
+            keep = select_coreset(X_train_dict[benign_keys[0]], coreset_size, method=coreset_method, strata=strata)
+            for key in benign_keys:
+                X_train_dict[key] = X_train_dict[key][keep]
+                y_train_dict[key] = y_train_dict[key].iloc[keep]
+        print(f"✅ Coreset ({coreset_method}): {len(keep)} of {len(y_benign)} benign training rows")
 
     # --------------------------
     # 4. Initialize agents
     # --------------------------
 
-    # Find best nu for SVM
-    X_svm = X_train_dict["OneClassSVM"]
-    best_nu = bh.find_best_nu(SVMAgent, X_svm, X_val_dict["OneClassSVM"], y_val)
-
-    # Find ideal n_estimators for IsolationForest
-    X_if = X_train_dict["IsolationForest"]
-    y_if = y_train_dict["IsolationForest"]
-    best_n_estimators = bh.find_best_n_estimators_if(X_if, y_if)
-    print(f"Using best_n_estimators={best_n_estimators} for IsolationForestAgent")
+    # Successive halving over SVM nu, IsolationForest n_estimators and Autoencoder depth / latent size
+    # Reruns on unchanged data read the result from the tuning cache instead of searching again
+    with tracer.stage("tune_agents", cached=tuning_cache):
+        search_kwargs = dict(agents=["OneClassSVM", "IsolationForest", "Autoencoder"], n_jobs=search_workers)
+        if tuning_cache:
+            search = cached_successive_halving_search(
+                X_train_dict, X_val_dict, y_val, cache=TuningCache(), **search_kwargs
+            )
+        else:
+            search = hs.successive_halving_search(X_train_dict, X_val_dict, y_val, **search_kwargs)
+
+    best_nu = search["OneClassSVM"]["params"]["nu"]
+    best_n_estimators = search["IsolationForest"]["params"]["n_estimators"]
+    ae_params = search["Autoencoder"]["params"]
+    print(f"Using nu={best_nu}, n_estimators={best_n_estimators}, Autoencoder {ae_params}")
 
     if_agent = IsolationForestAgent(contamination=0.05, n_estimators=best_n_estimators)
     svm_agent = SVMAgent(nu=best_nu)
     ae_agent = AutoencoderAgent(
         input_dim=X_train_dict["Autoencoder"].shape[1],
         epochs=50,
-        latent_dim=16
+        **ae_params
     )
 
     agents = [if_agent, svm_agent, ae_agent]
@@ -104,7 +169,24 @@ def main():
     # --------------------------
     # 6. Fit all agents
     # --------------------------
-    meta_agent.fit(X_train_dict, X_val_dict=X_val_dict)
+    with tracer.stage("fit"):
+        for agent in agents:
+            agent_name = agent.get_name()
+            with tracer.stage(agent_name, rows=X_train_dict[agent_name].shape[0]):
+                meta_agent.fit_agent(agent, X_train_dict, X_val_dict=X_val_dict)
+
+    # Every agent scores each split exactly once; all later steps read from the store
+    # With dedup, repeated feature rows are scored once and their scores broadcast
+    store = ScoreStore({"val": X_val_dict, "test": X_test_dict}, dedup=dedup)
+    with tracer.stage("score", dedup=dedup):
+        for split, split_dict in (("val", X_val_dict), ("test", X_test_dict)):
+            for agent in agents:
+                agent_name = agent.get_name()
+                with tracer.stage(f"{agent_name}/{split}", rows=split_dict[agent_name].shape[0]):
+                    store.get(agent, split)
+    for split, stats in store.dedup_stats().items():
+        print(f"✅ Dedup {split}: {stats['unique_rows']} distinct of {stats['rows']} rows "
+              f"(unique ratio {stats['unique_ratio']:.3f})")
 
     # --------------------------
     # 7. Individual Evaluation
@@ -112,123 +194,182 @@ def main():
     print("\n=== Individual Agent Evaluation (Validation) ===\n")
 
     agents_info = []
-    generated_png_files = []
-
-    for agent in agents:
-        agent_name = agent.get_name()
-
-        # Validation set for threshold tuning
-        X_val = X_val_dict[agent_name]
+    figures = []  # (y_true, y_pred, title), rendered in memory later
 
-        # Get anomaly scores on validation
-        scores_val = agent.score(X_val)
+    with tracer.stage("evaluate"):
+        for agent in agents:
+            agent_name = agent.get_name()
+            with tracer.stage(agent_name):
+                # Get anomaly scores on validation
+                scores_val = store.get(agent, "val")
 
-        # Find best threshold based on validation
-        threshold, best_f1 = bh.find_best_threshold(scores_val, y_val)
-        print(f"\n✅ {agent_name} Best Threshold = {threshold:.6f} with F1 = {best_f1:.4f}\n")
+                # Find best threshold based on validation
+                threshold, best_f1 = bh.find_best_threshold(scores_val, y_val)
+                print(f"\n✅ {agent_name} Best Threshold = {threshold:.6f} with F1 = {best_f1:.4f}\n")
 
-        # Test set evaluation using threshold found on validation
-        X_test = X_test_dict[agent_name]
+                # Test set evaluation using threshold found on validation
+                X_test = X_test_dict[agent_name]
 
-        preds = agent.predict(X_test, threshold=threshold)
+                preds = agent.predict_from_scores(store.get(agent, "test"), threshold=threshold)
 
-        # Evaluate agent
-        evaluate_agent(agent, X_test, y_test, threshold=threshold)
+                # Evaluate agent
+                evaluate_agent(agent, X_test, y_test, threshold=threshold, store=store, split="test")
 
-        # Metrics
-        precision = precision_score(y_test, preds, zero_division=0)
-        recall = recall_score(y_test, preds, zero_division=0)
-        f1 = f1_score(y_test, preds, zero_division=0)
+                # Metrics
+                metrics = classification_metrics(y_test, preds)
+                precision, recall, f1 = metrics["precision"], metrics["recall"], metrics["f1"]
 
-        # Generate confusion matrix graph
-        graph_path = f"{results_folder}/{agent_name}_graph.png"
-        rg.plot_confusion_matrix_graph(y_test, preds, agent_name, graph_path)
-        generated_png_files.append(graph_path)
+                figures.append((y_test, preds, agent_name))
 
-        agents_info.append({
-            'name': agent_name,
-            'metrics': {'Precision': precision, 'Recall': recall, 'F1_score': f1},
-            'graph': graph_path
-        })
+                agents_info.append({
+                    'name': agent_name,
+                    'metrics': {'Precision': precision, 'Recall': recall, 'F1_score': f1},
+                })
 
 
     # --------------------------
     # 8. Find best weights + threshold for MetaAgent (validation only)
     # --------------------------
-    best_weights, best_threshold, best_preds_val = bh.find_best_weights_and_threshold_for_meta_agent(
-        meta_agent,
-        X_val_dict,
-        y_val
-    )
+    with tracer.stage("tune_ensemble_weights"):
+        best_weights, best_threshold, best_preds_val = bh.find_best_weights_and_threshold_for_meta_agent(
+            meta_agent,
+            X_val_dict,
+            y_val,
+            store=store,
+            split="val"
+        )
     meta_agent.weights = best_weights
+    # quantile sketches of the validation scores: contamination thresholds stop depending on the batch
+    meta_agent.calibrate(all_scores=store.matrix(agents, "val"))
 
     print("\nConfusion Matrix (Best Ensemble on Validation):")
-    print(confusion_matrix(y_val, best_preds_val))
+    print(classification_metrics(y_val, best_preds_val)["cm"])
 
 
     # --------------------------
     # 9. Final Ensemble Evaluation on test
     # --------------------------
     print("\n=== Final MetaAgent Evaluation (Test) ===\n")
-    best_preds_test = evaluate_ensemble(
-        agents,
-        X_test_dict,
-        y_test,
-        weights=best_weights,
-        threshold=best_threshold
-    )
+    with tracer.stage("evaluate_ensemble"):
+        best_preds_test = evaluate_ensemble(
+            agents,
+            X_test_dict,
+            y_test,
+            weights=best_weights,
+            threshold=best_threshold,
+            store=store,
+            split="test"
+        )
 
     ensemble_precision = best_preds_test["precision"]
     ensemble_recall = best_preds_test["recall"]
     ensemble_f1 = best_preds_test["f1"]
-    ensemble_graph_path = f"{results_folder}/Ensemble_graph.png"
-    rg.plot_confusion_matrix_graph(y_test, best_preds_test["prediction"], "Ensemble", ensemble_graph_path)
-    generated_png_files.append(ensemble_graph_path)
+    figures.append((y_test, best_preds_test["prediction"], "Ensemble"))
 
     ensemble_info = {
         'metrics': {'Precision': ensemble_precision, 'Recall': ensemble_recall, 'F1_score': ensemble_f1},
-        'graph': ensemble_graph_path
     }
 
     # --------------------------
     # 10. Save results
     # --------------------------
-    final_scores = meta_agent.score(X_test_dict)
-    test_idx = X_test_dict["Autoencoder"].index if isinstance(X_test_dict["Autoencoder"], pd.DataFrame) else np.arange(X_test_dict["Autoencoder"].shape[0])
-    results = df.loc[test_idx].copy()
-    results["anomaly_score"] = final_scores
-    results["predicted_anomaly"] = best_preds_test["prediction"]
+    final_scores = meta_agent.combine_scores(store.matrix(agents, "test"))
+    predictions = best_preds_test["prediction"]
+
+    # y_test keeps the original row labels of the test samples
+    test_idx = y_test.index.to_numpy()
+
+    # only the exported anomalies are explained, so attribution costs nothing on the other rows
+    attributions = {}
+    if explain_top_k:
+        feature_names = feature_pipeline.feature_names()
+        flagged = (predictions == 1).nonzero()[0]
+        with tracer.stage("explain", rows=len(flagged)):
+            attributions = {agent.get_name(): store.attribution(agent, "test", flagged, top_k=explain_top_k)
+                            for agent in agents if agent.supports_attribution}
+
+    output_file = results_path(f"{results_folder}/{enterprise_name}_anomaly_results", results_format)
+    with tracer.stage("export_results", rows=len(test_idx), format=results_format):
+        with ResultsWriter(output_file, fmt=results_format) as writer:
+            for start in range(0, len(test_idx), results_batch_size):
+                end = start + results_batch_size
+                batch = df.loc[test_idx[start:end]].reset_index(drop=True)
+                batch["anomaly_score"] = final_scores[start:end]
+                batch["predicted_anomaly"] = predictions[start:end]
+                for agent_name, (indices, shares) in attributions.items():
+                    batch[f"{agent_name}_top_features"] = top_features_column(
+                        indices[start:end], shares[start:end], feature_names, mask=predictions[start:end] == 1
+                    )
+                writer.write_batch(batch)
 
-    output_file = f"{results_folder}/Enterprise_{dataset_letter}_anomaly_results.csv"
-    results.to_csv(output_file, index=False)
     print(f"\n✅ Anomaly detection complete. Results saved to {output_file}")
+
+    # Fitted preprocessing + ensemble + threshold, for scoring new records (serve.py)
+    # Validation scores / numeric features are kept as the drift monitor's reference
+    with tracer.stage("save_model"):
+        n_numeric = len(feature_pipeline.feature_cols_)
+        reference = build_reference(
+            meta_agent.combine_scores(store.matrix(agents, "val")),
+            X_val_dict["IsolationForest"][:, :n_numeric],
+            feature_pipeline.feature_cols_
+        )
+        model_dir = save_bundle(
+            f"{results_folder}/model",
+            feature_pipeline,
+            meta_agent,
+            best_threshold,
+            metadata={"enterprise": enterprise_name, "test_f1": float(ensemble_f1)},
+            reference=reference
+        )
+    print(f"✅ Model bundle saved: {model_dir}")
+
+    # Known-benign fast path for online scoring, seeded with the labeled benign training rows
+    with tracer.stage("seed_allowlist"):
+        y_train_all = y_train_dict["IsolationForest"]
+        allowlist = BenignAllowlist()
+        allowlist.confirm(df.loc[y_train_all.index[y_train_all.to_numpy() == 0]])
+        allowlist.save(os.path.join(model_dir, ALLOWLIST_FILE))
         
-    report_file = f"{results_folder}/Enterprise_{dataset_letter}_report.pdf"
-    rg.generate_pdf_report(report_file, agents_info, ensemble_info, weights=best_weights)
+    # Confusion matrices are rendered concurrently into in-memory PNG buffers
+    report_file = f"{results_folder}/{enterprise_name}_report.pdf"
+    with tracer.stage("report"):
+        with tracer.stage("render_figures", figures=len(figures)):
+            graphs = rg.render_confusion_matrices(figures)
+        for info, graph in zip(agents_info + [ensemble_info], graphs):
+            info['graph'] = graph
+
+        with tracer.stage("pdf"):
+            rg.generate_pdf_report(report_file, agents_info, ensemble_info, weights=best_weights)
     print(f"\n✅ PDF report generated: {report_file}")
 
-    # Delete temporary PNG files
-    for file_path in generated_png_files:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
-    print("🗑️ Temporary PNG files deleted.")
-
     # --------------------------
     # 11. Export Metrics CSV
     # --------------------------
-    metrics_csv_path = f"{results_folder}/Enterprise_{dataset_letter}_metrics_summary.csv"
+    metrics_csv_path = f"{results_folder}/{enterprise_name}_metrics_summary.csv"
 
-    rg.export_metrics_to_csv(
-        metrics_csv_path,
-        agents_info,
-        ensemble_info
-    )
+    with tracer.stage("export_metrics"):
+        rg.export_metrics_to_csv(
+            metrics_csv_path,
+            agents_info,
+            ensemble_info
+        )
 
     print(f"✅ Metrics CSV exported: {metrics_csv_path}")
 
+    tracer.summary()
+    trace_file = tracer.save(f"{results_folder}/{enterprise_name}_trace.json")
+    print(f"✅ Stage trace saved: {trace_file}")
+
+    return enterprise_name
 
 
+def main():
+    # --------------------------
+    # 0. Choose dataset
+    # --------------------------
+    dataset_file, dataset_letter = bh.select_dataset()
+    run_pipeline(f"data/{dataset_file}", f"Enterprise_{dataset_letter}")
+
     # --------------------------
     # Compare enterprises
     # --------------------------
@@ -0,0 +1,433 @@
+# serve.py
+"""
+Local HTTP scoring service around a fitted ensemble (model bundle from main.py / batch_main.py).
+
+Concurrent requests are coalesced into micro-batches: the first waiting request
+opens a batch, which is scored as soon as it holds --max-batch-size records or
+--max-delay-ms has passed, whichever comes first. One preprocessing + MetaAgent
+call then serves every request in the batch. Records with non-scalar values are
+rejected with 400; if a batch still fails, each request is re-scored on its own
+so only the failing one gets a 500.
+
+With --models-root, one process serves every enterprise found there
+(utils.model_registry): records are routed by their tenant id, tenants are
+loaded on first use and the least recently used ones are evicted.
+
+Endpoints:
+    POST /score    {"records": [{...raw log columns...}, ...]}  (or a single record object)
+                   -> {"results": [{"anomaly_score": ..., "predicted_anomaly": 0/1}, ...]}
+    POST /score/<tenant>  same, for records without a tenant id field (--models-root only)
+    GET  /metrics  throughput, p50/p99 latency, batch sizes (+ drift / model version with --drift-monitor,
+                   fast-path hit rate with --allowlist, text cache hit rate, resident tenants with --models-root)
+    GET  /health
+
+Usage:
+    python serve.py --model Results/Enterprise_A/model --port 8080
+    python serve.py --models-root Results --max-resident 2 --port 8080
+    python load_generator.py --data data/Enterprise_A.csv --port 8080
+"""
+from bootstrap import setup_environment
+setup_environment()
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.online_scorer import OnlineScorer, SCALAR_TYPES
+from utils.drift_monitor import AdaptiveScorer
+from utils.benign_allowlist import BenignAllowlist, ALLOWLIST_FILE
+from utils.model_registry import ModelRegistry
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+# -----------------------------
+# Metrics
+# -----------------------------
+class ServiceMetrics:
+    """
+    Request latencies (enqueue -> result) and batch sizes over a bounded recent window.
+    """
+
+    def __init__(self, window=10_000, throughput_window_seconds=10.0):
+        self.started = time.monotonic()
+        self.throughput_window_seconds = throughput_window_seconds
+        self.requests = 0
+        self.records = 0
+        self.batches = 0
+        self.errors = 0
+        self.latencies_ms = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self._completed = deque()  # (time, records) of recent requests
+
+    def record_batch(self, n_records):
+        self.batches += 1
+        self.batch_sizes.append(n_records)
+
+    def record_request(self, n_records, latency_seconds):
+        now = time.monotonic()
+        self.requests += 1
+        self.records += n_records
+        self.latencies_ms.append(latency_seconds * 1000)
+        self._completed.append((now, n_records))
+        while self._completed and self._completed[0][0] < now - self.throughput_window_seconds:
+            self._completed.popleft()
+
+    def snapshot(self):
+        now = time.monotonic()
+        uptime = now - self.started
+        recent = sum(n for t, n in self._completed if t >= now - self.throughput_window_seconds)
+        latencies = np.asarray(self.latencies_ms) if self.latencies_ms else None
+        return {
+            "uptime_seconds": round(uptime, 3),
+            "requests": self.requests,
+            "records": self.records,
+            "batches": self.batches,
+            "errors": self.errors,
+            "throughput_records_per_second": round(self.records / uptime, 2) if uptime > 0 else 0.0,
+            "recent_throughput_records_per_second": round(recent / min(uptime, self.throughput_window_seconds), 2)
+            if uptime > 0 else 0.0,
+            "latency_ms": {
+                "p50": round(float(np.percentile(latencies, 50)), 3) if latencies is not None else None,
+                "p99": round(float(np.percentile(latencies, 99)), 3) if latencies is not None else None,
+                "max": round(float(latencies.max()), 3) if latencies is not None else None,
+            },
+            "mean_batch_size": round(float(np.mean(self.batch_sizes)), 2) if self.batch_sizes else None,
+        }
+
+
+# -----------------------------
+# Micro-batching
+# -----------------------------
+class MicroBatcher:
+    """
+    Collects pending requests and scores them together.
+    Scoring runs in a single worker thread (the Autoencoder is not thread-safe),
+    so the event loop keeps accepting requests while a batch is being scored.
+    """
+
+    def __init__(self, scorer, max_batch_size=256, max_delay_ms=10.0, metrics=None):
+        self.scorer = scorer
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.metrics = metrics or ServiceMetrics()
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scorer")
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown()
+
+    async def submit(self, records):
+        """
+        Queue one request's records and wait for their results.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((records, future, time.monotonic()))
+        return await future
+
+    async def _collect(self):
+        """ Wait for a first request, then fill the batch until it is full or the deadline passes. """
+        batch = [await self._queue.get()]
+        n_records = len(batch[0][0])
+        deadline = batch[0][2] + self.max_delay
+
+        while n_records < self.max_batch_size:
+            if not self._queue.empty():
+                # requests that queued up while the previous batch was scored join without waiting
+                item = self._queue.get_nowait()
+            else:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(item)
+            n_records += len(item[0])
+
+        return batch, n_records
+
+    async def _score(self, batch):
+        records = [record for request_records, _, _ in batch for record in request_records]
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.scorer.score_records, records)
+
+    def _fail(self, item, error):
+        _, future, _ = item
+        self.metrics.errors += 1
+        if not future.done():
+            future.set_exception(error)
+
+    def _deliver(self, batch, results):
+        self.metrics.record_batch(len(results))
+        done = time.monotonic()
+        start = 0
+        for request_records, future, enqueued in batch:
+            end = start + len(request_records)
+            if not future.done():
+                future.set_result(results[start:end])
+            self.metrics.record_request(len(request_records), done - enqueued)
+            start = end
+
+    async def _run(self):
+        while True:
+            batch, _ = await self._collect()
+            try:
+                results = await self._score(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    self._fail(batch[0], e)
+                    continue
+                # one bad request must not fail the others: score every request on its own
+                for item in batch:
+                    try:
+                        item_results = await self._score([item])
+                    except Exception as item_error:
+                        self._fail(item, item_error)
+                    else:
+                        self._deliver([item], item_results)
+                continue
+            self._deliver(batch, results)
+
+
+# -----------------------------
+# Minimal HTTP/1.1 (keep-alive)
+# -----------------------------
+async def read_request(reader, max_body_bytes):
+    """
+    :return: (method, path, headers, body) or None when the client closed the connection
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+    if length > max_body_bytes:
+        raise ValueError(413)
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path.split("?", 1)[0], headers, body
+
+
+def write_response(writer, status, payload, keep_alive=True):
+    body = json.dumps(payload).encode()
+    writer.write(
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+    )
+
+
+def parse_records(body):
+    payload = json.loads(body)
+    records = payload["records"] if isinstance(payload, dict) and "records" in payload else payload
+    if isinstance(records, dict):
+        records = [records]
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise ValueError("expected a record object, a list of records or {\"records\": [...]}")
+    for record in records:
+        for key, value in record.items():
+            if not isinstance(value, SCALAR_TYPES):
+                raise ValueError(f"field {key!r} must be a string, number, boolean or null")
+    return records
+
+
+class ScoringService:
+    def __init__(self, scorer, max_batch_size=256, max_delay_ms=10.0, max_body_bytes=16 * 2 ** 20):
+        self.metrics = ServiceMetrics()
+        self.batcher = MicroBatcher(scorer, max_batch_size, max_delay_ms, self.metrics)
+        self.max_body_bytes = max_body_bytes
+
+    async def handle(self, method, path, body):
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/metrics":
+            snapshot = self.metrics.snapshot()
+            if isinstance(self.batcher.scorer, ModelRegistry):
+                snapshot["registry"] = self.batcher.scorer.stats()
+            if hasattr(self.batcher.scorer, "status"):
+                snapshot["model"] = self.batcher.scorer.status()
+            if getattr(self.batcher.scorer, "allowlist", None) is not None:
+                snapshot["allowlist"] = self.batcher.scorer.allowlist.stats()
+            if getattr(self.batcher.scorer, "text_cache", None) is not None:
+                snapshot["text_cache"] = self.batcher.scorer.text_cache.stats()
+            return 200, snapshot
+        registry = self.batcher.scorer if isinstance(self.batcher.scorer, ModelRegistry) else None
+        tenant = None
+        if path.startswith("/score/") and registry is not None:
+            path, tenant = "/score", path[len("/score/"):]
+        if path != "/score":
+            return 404, {"error": f"unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST /score"}
+
+        try:
+            records = parse_records(body)
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        if not records:
+            return 200, {"results": []}
+
+        if registry is not None:
+            # rejected here, so one bad request never fails the rest of its micro-batch
+            tenants = set()
+            try:
+                for record in records:
+                    if tenant is not None:
+                        record.setdefault(registry.tenant_field, tenant)
+                    tenants.add(registry.tenant_id(record))
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            unknown = registry.cached_unknown(tenants)
+            if unknown:
+                # listing the models root is disk I/O: keep it off the event loop
+                unknown = await asyncio.get_running_loop().run_in_executor(None, registry.unknown_tenants, unknown)
+            if unknown:
+                return 404, {"error": f"unknown tenant {sorted(unknown)[0]!r}"}
+
+        try:
+            results = await self.batcher.submit(records)
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+        return 200, {"results": results}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader, self.max_body_bytes)
+                except ValueError as e:
+                    status = 413 if e.args == (413,) else 400
+                    write_response(writer, status, {"error": REASONS[status]}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                status, payload = await self.handle(method, path, body)
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"✅ Scoring service listening on http://{host}:{port} "
+              f"(max batch {self.batcher.max_batch_size}, max delay {self.batcher.max_delay * 1000:g} ms)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+def _stop_on_sigterm(signum, frame):
+    # service managers stop with SIGTERM: shut down like Ctrl+C so the scorer is closed (allowlist saved)
+    raise KeyboardInterrupt
+
+
+def tenant_scorer_factory(allowlist=False, text_cache_mb=64):
+    """ Loads one tenant's OnlineScorer; with allowlist, its counts live in <model>/allowlist.npz. """
+    def load(directory):
+        tenant_allowlist = BenignAllowlist.open(os.path.join(directory, ALLOWLIST_FILE)) if allowlist else None
+        return OnlineScorer.from_directory(directory, allowlist=tenant_allowlist, text_cache_mb=text_cache_mb)
+    return load
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fitted ensemble over HTTP with micro-batching.")
+    parser.add_argument("--model", default="Results/Enterprise_A/model",
+                        help="model bundle directory written by main.py / batch_main.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch-size", type=int, default=256,
+                        help="score as soon as this many records are waiting")
+    parser.add_argument("--max-delay-ms", type=float, default=10.0,
+                        help="longest time the first request of a batch waits for others")
+    parser.add_argument("--drift-monitor", action="store_true",
+                        help="track score / feature drift and retrain + swap the model in the background")
+    parser.add_argument("--retrained-model-dir", help="also save retrained bundles here")
+    parser.add_argument("--allowlist", nargs="?", const="", metavar="PATH",
+                        help="known-benign fast path (counts persisted to PATH, default <model>/allowlist.npz)")
+    parser.add_argument("--text-cache-mb", type=float, default=64,
+                        help="memory budget of the command-text featurization cache (0 disables it)")
+    parser.add_argument("--models-root", metavar="DIR",
+                        help="serve every tenant with a bundle in DIR/<tenant>/model instead of one --model")
+    parser.add_argument("--max-resident", type=int, default=4, help="tenants kept loaded (--models-root)")
+    parser.add_argument("--memory-budget-mb", type=float, default=None,
+                        help="estimated memory of the loaded tenants before LRU eviction (--models-root)")
+    parser.add_argument("--tenant-field", default="tenant_id", help="record field naming the tenant (--models-root)")
+    parser.add_argument("--default-tenant", help="tenant of records without a tenant field (--models-root)")
+    args = parser.parse_args()
+
+    if args.models_root:
+        if args.drift_monitor:
+            parser.error("--drift-monitor serves a single model; it cannot be combined with --models-root")
+        if args.allowlist:
+            parser.error("with --models-root, --allowlist takes no PATH (each tenant uses <model>/allowlist.npz)")
+        scorer = ModelRegistry(
+            args.models_root,
+            max_resident=args.max_resident,
+            memory_budget_mb=args.memory_budget_mb,
+            scorer_factory=tenant_scorer_factory(args.allowlist is not None, args.text_cache_mb),
+            tenant_field=args.tenant_field,
+            default_tenant=args.default_tenant
+        )
+        tenants = scorer.tenants()
+        print(f"✅ Model registry {args.models_root}: {len(tenants)} tenant(s) ({', '.join(tenants) or '-'}), "
+              f"loaded on first request, at most {args.max_resident} resident")
+    else:
+        allowlist = None
+        if args.allowlist is not None:
+            allowlist = BenignAllowlist.open(args.allowlist or os.path.join(args.model, ALLOWLIST_FILE))
+        scorer = OnlineScorer.from_directory(args.model, allowlist=allowlist, text_cache_mb=args.text_cache_mb)
+        print(f"✅ Loaded model bundle {args.model} (threshold {scorer.threshold:.6f})")
+        if args.drift_monitor:
+            scorer = AdaptiveScorer(scorer, save_dir=args.retrained_model_dir)
+
+    service = ScoringService(scorer, max_batch_size=args.max_batch_size, max_delay_ms=args.max_delay_ms)
+    signal.signal(signal.SIGTERM, _stop_on_sigterm)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        if hasattr(scorer, "close"):
+            scorer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# tests/conftest.py
+"""
+Shared fixtures. Run from the Project folder: python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from bootstrap import setup_environment
+setup_environment()
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join(PROJECT_DIR, "data")
+
+
+@pytest.fixture(scope="session")
+def enterprise_a_path():
+    return os.path.join(DATA_DIR, "Enterprise_A.csv")
+
+
+@pytest.fixture(scope="session")
+def enterprise_a(enterprise_a_path):
+    """ Enterprise_A log (1,000 rows) as read from the CSV. """
+    return pd.read_csv(enterprise_a_path)
+
+
+@pytest.fixture(scope="session")
+def features_a(enterprise_a):
+    """ (X_full, y) of Enterprise_A, as preprocess_for_metaagent builds them for the agents. """
+    from utils.preprocessing import preprocess_for_metaagent
+    X_dict, y = preprocess_for_metaagent(
+        enterprise_a, text_col="command_text", label_col="is_anomaly", timestamp_col="timestamp", tfidf_max_features=512
+    )
+    return np.asarray(X_dict["IsolationForest"], dtype=np.float64), np.asarray(y)
+
+
+@pytest.fixture(scope="session")
+def _bundle_a_bytes(enterprise_a):
+    """
+    A small model bundle of Enterprise_A (IsolationForest + OneClassSVM, no Autoencoder so no TF fit):
+    pipeline fitted on rows [0, 600) with behavior features, calibrated on rows [600, 800).
+    """
+    import pickle
+    from agents.isolation_forest_agent import IsolationForestAgent
+    from agents.meta_agent import MetaAgent
+    from agents.svm_agent import SVMAgent
+    from utils.drift_monitor import build_reference
+    from utils.model_io import ModelBundle
+    from utils.preprocessing import agent_inputs, preprocess_for_metaagent
+
+    train, val = enterprise_a.iloc[:600], enterprise_a.iloc[600:800].drop(columns="is_anomaly")
+    X_dict, y, pipeline = preprocess_for_metaagent(
+        train, label_col="is_anomaly", timestamp_col="timestamp", return_pipeline=True, behavior_features=True
+    )
+    meta_agent = MetaAgent([IsolationForestAgent(n_estimators=50, random_state=0), SVMAgent(nu=0.05)])
+    meta_agent.fit({name: X[np.asarray(y) == 0] for name, X in X_dict.items()})
+
+    X_val = pipeline.transform(val)
+    all_scores = meta_agent.score_matrix(agent_inputs(X_val))
+    meta_agent.calibrate(all_scores=all_scores)
+    n_numeric = len(pipeline.feature_cols_)
+    reference = build_reference(meta_agent.combine_scores(all_scores), X_val[:, :n_numeric], pipeline.feature_cols_)
+    return pickle.dumps(ModelBundle(pipeline, meta_agent, meta_agent.threshold_, reference=reference))
+
+
+@pytest.fixture
+def make_bundle_a(_bundle_a_bytes):
+    """ Fresh copies of the bundle: scoring advances its behavior windows. """
+    import pickle
+    return lambda: pickle.loads(_bundle_a_bytes)
+
+
+@pytest.fixture(scope="session")
+def new_records_a(enterprise_a):
+    """ Rows [800, 1000) of Enterprise_A as raw records, without the label (never seen by bundle_a). """
+    return enterprise_a.iloc[800:].drop(columns="is_anomaly").to_dict("records")
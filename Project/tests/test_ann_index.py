@@ -0,0 +1,57 @@
+# tests/test_ann_index.py
+import numpy as np
+import pytest
+
+from agents.ann_index import IVFIndex, exact_search
+from agents.knn_agent import KNNAgent
+
+
+def recall(approx_ids, exact_ids):
+    return np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approx_ids, exact_ids)])
+
+
+def test_ivf_recall_against_exact_search(features_a):
+    X, y = features_a
+    train, queries = X[y == 0][:600], X[600:800]
+
+    index = IVFIndex(n_probe=8).build(train)
+    _, approx = index.search(queries, 5)
+    _, exact = exact_search(train, queries, 5)
+    assert recall(approx, exact) >= 0.9
+
+    # probing every bucket is exact
+    _, full = index.search(queries, 5, n_probe=len(index.centroids))
+    assert recall(full, exact) == 1.0
+
+
+def test_ivf_incremental_add_keeps_ids():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 8)).astype(np.float32)
+    index = IVFIndex(n_lists=8).build(X[:200])
+    ids = index.add(X[200:])
+    assert ids.tolist() == list(range(200, 300)) and index.ntotal == 300
+
+    _, nearest = index.search(X[250:260], 1, n_probe=8)
+    assert nearest[:, 0].tolist() == list(range(250, 260))
+
+
+@pytest.mark.parametrize("name", ["knn_state", "knn_state.npz"])
+def test_knn_save_load_round_trip(features_a, tmp_path, name):
+    X, y = features_a
+    agent = KNNAgent()
+    agent.fit(X[y == 0][:500])
+    agent.save(tmp_path / name)
+
+    loaded = KNNAgent.load(tmp_path / "knn_state")
+    np.testing.assert_allclose(loaded.score(X[:100]), agent.score(X[:100]))
+
+
+def test_unbuilt_index_round_trip(tmp_path):
+    IVFIndex(n_probe=4).save(tmp_path / "empty")
+    index = IVFIndex.load(tmp_path / "empty.npz")
+    assert index.centroids is None and index.n_probe == 4
+
+
+def test_knn_refuses_unfitted_save(tmp_path):
+    with pytest.raises(ValueError):
+        KNNAgent().save(tmp_path / "knn")
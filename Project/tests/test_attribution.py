@@ -0,0 +1,76 @@
+# tests/test_attribution.py
+import numpy as np
+import pytest
+from scipy import sparse
+
+from agents.base_agent import top_contributions
+from agents.isolation_forest_agent import IsolationForestAgent
+from utils.score_store import ScoreStore
+
+
+@pytest.fixture(scope="module")
+def forests_a(features_a):
+    """ One forest on all columns, one whose trees see a random half of them (sklearn max_features). """
+    X, y = features_a
+    full = IsolationForestAgent(n_estimators=50, random_state=0)
+    half = IsolationForestAgent(n_estimators=50, random_state=0)
+    half.model.set_params(max_features=0.5)
+    for agent in (full, half):
+        agent.fit(X[y == 0])
+    return full, half
+
+
+def test_scores_equal_sklearn(features_a, forests_a):
+    X, _ = features_a
+    for agent in forests_a:
+        scores, indices, shares = agent.score_with_attribution(X, top_k=3)
+        np.testing.assert_allclose(scores, agent.score(X), rtol=0, atol=1e-12)
+        assert indices.shape == shares.shape == (len(X), 3)
+        assert np.all(shares[:, :-1] >= shares[:, 1:]) and np.all(shares.sum(axis=1) <= 1 + 1e-12)
+
+    sparse_scores, _, _ = forests_a[0].score_with_attribution(sparse.csr_matrix(X[:100]))
+    np.testing.assert_allclose(sparse_scores, forests_a[0].score(X[:100]), rtol=0, atol=1e-12)
+
+
+def test_contributions_match_the_decision_paths(features_a, forests_a):
+    X, _ = features_a
+    agent = forests_a[1]
+    rows = X[:20].astype(np.float32)
+    _, indices, shares = agent.score_with_attribution(rows, top_k=3)
+
+    # brute force: walk every tree's path and credit log(parent rows / child rows) to the split feature
+    credit = np.zeros((len(rows), X.shape[1]))
+    for tree, features in zip(agent.model.estimators_, agent.model.estimators_features_):
+        t = tree.tree_
+        paths = tree.decision_path(rows[:, features]).toarray()
+        for r, nodes in enumerate(paths):
+            nodes = np.flatnonzero(nodes)
+            for parent, child in zip(nodes[:-1], nodes[1:]):
+                credit[r, features[t.feature[parent]]] += np.log(t.n_node_samples[parent] / t.n_node_samples[child])
+
+    expected_indices, expected_shares = top_contributions(credit, top_k=3)
+    np.testing.assert_allclose(shares, expected_shares, rtol=1e-9)
+    np.testing.assert_array_equal(indices[:, 0], expected_indices[:, 0])
+
+
+def test_top_contributions():
+    contributions = sparse.csr_matrix(np.array([[0.0, 3.0, 1.0, 0.0], [0.0, 0.0, 0.0, 0.0], [2.0, 2.0, 0.0, 4.0]]))
+    indices, shares = top_contributions(contributions, top_k=2, batch_size=2)
+    np.testing.assert_array_equal(indices[[0, 2]], [[1, 2], [3, 0]])
+    np.testing.assert_allclose(shares, [[0.75, 0.25], [0.0, 0.0], [0.5, 0.25]])
+
+
+def test_store_explains_only_the_given_rows(features_a, forests_a):
+    X, _ = features_a
+    agent = forests_a[0]
+    store = ScoreStore({"test": {agent.get_name(): X}})
+    flagged = np.flatnonzero(store.get(agent, "test") > np.quantile(store.get(agent, "test"), 0.95))
+
+    indices, shares = store.attribution(agent, "test", flagged, top_k=3)
+    _, expected_indices, expected_shares = agent.score_with_attribution(X[flagged], top_k=3)
+    np.testing.assert_array_equal(indices[flagged], expected_indices)
+    np.testing.assert_array_equal(shares[flagged], expected_shares)
+
+    others = np.setdiff1d(np.arange(len(X)), flagged)
+    assert not shares[others].any() and not indices[others].any()
+    assert not store.attribution(agent, "test", np.array([], dtype=int))[1].any()
@@ -0,0 +1,72 @@
+# tests/test_behavior_features.py
+import math
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.behavior_features import BehaviorFeatures
+
+
+@pytest.fixture(scope="module")
+def events_a(enterprise_a):
+    """ Enterprise_A in time order, as a log stream would deliver it. """
+    t = pd.to_datetime(enterprise_a["timestamp"], dayfirst=True)
+    return enterprise_a.iloc[np.argsort(t.to_numpy(), kind="stable")].reset_index(drop=True)
+
+
+def test_user_features_match_brute_force(events_a):
+    behavior = BehaviorFeatures(novelty_days=365)
+    features = behavior.fit_transform(events_a)
+
+    t = pd.to_datetime(events_a["timestamp"], dayfirst=True)
+    seconds = ((t - pd.Timestamp("1970-01-01")).dt.total_seconds()).to_numpy()
+    offhour = ((t.dt.hour < 8) | (t.dt.hour >= 18) | t.dt.dayofweek.isin([4, 5])).to_numpy()
+    tau = 24 * 3600 / math.log(2)
+
+    for _, rows in events_a.groupby("user_id").indices.items():
+        for n, i in enumerate(rows):
+            previous = rows[:n + 1]
+            decay = np.exp(-(seconds[i] - seconds[previous]) / tau)
+            recent = previous[seconds[previous] >= seconds[i] - 24 * 3600]
+            pairs = set(zip(events_a["parent_process"].iloc[rows[:n]], events_a["process_name"].iloc[rows[:n]]))
+
+            expected = [
+                decay.sum() * 3600 / tau,
+                events_a["process_name"].iloc[recent].nunique(),
+                (decay * offhour[previous]).sum() / decay.sum(),
+                float((events_a["parent_process"].iloc[i], events_a["process_name"].iloc[i]) not in pairs),
+            ]
+            actual = features.loc[i, ["user_cmd_rate", "user_distinct_procs", "user_offhour_ratio", "user_novel_pair"]]
+            np.testing.assert_allclose(actual.to_numpy(dtype=float), expected, rtol=1e-9)
+
+
+def test_streaming_chunks_equal_one_batch(events_a):
+    batch = BehaviorFeatures().fit_transform(events_a)
+
+    stream = BehaviorFeatures()
+    chunks = [stream.transform(events_a.iloc[start:start + 97]) for start in range(0, len(events_a), 97)]
+    pd.testing.assert_frame_equal(pd.concat(chunks), batch)
+    assert stream.events == len(events_a)
+
+
+def test_rollback_restores_the_state(events_a):
+    behavior = BehaviorFeatures()
+    behavior.fit_transform(events_a.iloc[:600])
+    untouched = pickle.loads(pickle.dumps(behavior))
+
+    behavior.stage(events_a.iloc[600:700])
+    behavior.stage(events_a.iloc[700:750])
+    behavior.rollback()
+    assert behavior.events == 600
+
+    pd.testing.assert_frame_equal(behavior.transform(events_a.iloc[600:]), untouched.transform(events_a.iloc[600:]))
+
+    # a committed stage is kept, like transform()
+    behavior.reset().update(events_a.iloc[:600])
+    staged = behavior.stage(events_a.iloc[600:700])
+    behavior.commit()
+    behavior.rollback()
+    pd.testing.assert_frame_equal(staged, BehaviorFeatures().fit_transform(events_a.iloc[:700]).iloc[600:])
+    assert behavior.events == 700
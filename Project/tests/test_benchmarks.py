@@ -0,0 +1,44 @@
+# tests/test_benchmarks.py
+import numpy as np
+import pandas as pd
+
+from benchmarks.run_benchmarks import BenchmarkRun, cap_rows, compare_to_baseline
+
+
+def test_benchmark_run_records(enterprise_a):
+    run = BenchmarkRun(trace_memory=False)
+    result = run.run("Enterprise_A", "value_counts", len(enterprise_a), enterprise_a["user_id"].value_counts)
+    run.skip("Enterprise_A", "OneClassSVM fit", "too many rows")
+
+    assert result.sum() == len(enterprise_a)
+    timed, skipped = run.records
+    assert timed["benchmark"] == "value_counts" and timed["input"] == "Enterprise_A" and timed["n_rows"] == 1000
+    assert timed["wall_seconds"] >= 0 and "stage" not in timed
+    assert skipped == {"input": "Enterprise_A", "benchmark": "OneClassSVM fit", "skipped": "too many rows"}
+
+
+def test_cap_rows(features_a):
+    X, y = features_a
+    X_small, y_small = cap_rows(X, pd.Series(y), 100)
+    assert X_small.shape == (100, X.shape[1]) and list(y_small.index) == list(range(100))
+    # the labels follow their rows
+    rows = [np.flatnonzero((X == row).all(axis=1))[0] for row in X_small[:10]]
+    assert y_small[:10].tolist() == y[rows].tolist()
+    assert cap_rows(X, y, None)[0] is X
+
+
+def test_compare_to_baseline():
+    baseline = [
+        {"input": "A", "benchmark": "fit", "wall_seconds": 1.0, "tracemalloc_peak_mb": 100.0},
+        {"input": "A", "benchmark": "score", "wall_seconds": 0.01},
+        {"input": "A", "benchmark": "search", "skipped": "no data"},
+    ]
+    records = [
+        {"input": "A", "benchmark": "fit", "wall_seconds": 1.3, "tracemalloc_peak_mb": 90.0},
+        {"input": "A", "benchmark": "score", "wall_seconds": 0.04},   # too short to judge
+        {"input": "A", "benchmark": "search", "wall_seconds": 5.0},   # no baseline
+    ]
+    regressions = compare_to_baseline(records, baseline, tolerance=0.2)
+    assert [(r["benchmark"], r["metric"]) for r in regressions] == [("fit", "wall_seconds")]
+    assert np.isclose(regressions[0]["change"], 0.3)
+    assert compare_to_baseline(records, baseline, tolerance=0.5) == []
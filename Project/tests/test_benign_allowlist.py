@@ -0,0 +1,76 @@
+# tests/test_benign_allowlist.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.benign_allowlist import BenignAllowlist, CountMinSketch, normalize_commands
+from utils.online_scorer import OnlineScorer
+
+
+@pytest.fixture(scope="module")
+def repeated_benign(enterprise_a):
+    """ 3,000 records replaying 60 benign Enterprise_A tuples with uneven frequencies. """
+    benign = enterprise_a[enterprise_a["is_anomaly"] == "benign"].iloc[:60]
+    rng = np.random.default_rng(0)
+    idx = rng.choice(60, 3000, p=np.arange(1, 61) / np.arange(1, 61).sum())
+    return benign.iloc[idx].reset_index(drop=True)
+
+
+def test_count_min_never_underestimates(enterprise_a, repeated_benign):
+    allowlist = BenignAllowlist()
+    keys = np.concatenate([allowlist.keys(repeated_benign), allowlist.keys(enterprise_a)])
+    unique, true_counts = np.unique(keys, return_counts=True)
+
+    small = CountMinSketch(width=64, depth=4)
+    small.add(keys)
+    estimates = small.estimate(unique)
+    assert np.all(estimates >= true_counts)
+    # e / width * n with probability 1 - exp(-depth)
+    assert np.mean(estimates - true_counts <= np.e / 64 * len(keys)) > 0.95
+
+    large = CountMinSketch(width=2 ** 18, depth=4)
+    large.add(keys)
+    np.testing.assert_array_equal(large.estimate(unique), true_counts)
+
+    large.decay()
+    np.testing.assert_array_equal(large.estimate(unique), true_counts // 2)
+
+
+def test_normalized_commands_share_a_tuple():
+    commands = pd.Series(["Stop-Process -Id 4312 ", "stop-process   -id 77", None])
+    assert normalize_commands(commands).tolist() == ["stop-process -id 0", "stop-process -id 0", ""]
+
+    records = pd.DataFrame({"user_id": ["user_01"] * 2, "process_name": ["cmd.exe"] * 2,
+                            "parent_process": ["explorer.exe"] * 2, "command_text": commands[:2]})
+    keys = BenignAllowlist().keys(records)
+    assert keys[0] == keys[1]
+
+
+def test_lookup_after_min_count(repeated_benign, tmp_path):
+    allowlist = BenignAllowlist(min_count=20)
+    allowlist.confirm(repeated_benign)
+
+    counts = repeated_benign.groupby(list(allowlist.key_columns), observed=True).size()
+    known = allowlist.lookup(counts.index.to_frame(index=False))
+    np.testing.assert_array_equal(known, counts.to_numpy() >= 20)
+    assert 0 < known.sum() < len(counts)
+
+    path = allowlist.save(str(tmp_path / "model" / "allowlist.npz"))
+    restored = BenignAllowlist.open(path)
+    np.testing.assert_array_equal(restored.sketch.table, allowlist.sketch.table)
+    assert (restored.min_count, restored.confirmations) == (20, len(repeated_benign))
+    assert BenignAllowlist.load(path, min_count=5).min_count == 5
+    assert BenignAllowlist.open(str(tmp_path / "missing.npz")).confirmations == 0
+
+
+def test_fast_path_in_the_scorer(make_bundle_a, repeated_benign):
+    allowlist = BenignAllowlist(min_count=20, learn_online=False)
+    allowlist.confirm(repeated_benign)
+    scorer = OnlineScorer(make_bundle_a(), allowlist=allowlist)
+
+    records = repeated_benign.drop(columns="is_anomaly").iloc[:300]
+    scores, fast, X_full = scorer.score_partitioned(records)
+    assert fast.any() and not fast.all()
+    np.testing.assert_array_equal(fast, allowlist.lookup(records))
+    assert np.all(scores[fast] == scorer.benign_score) and scorer.benign_score < scorer.threshold
+    assert X_full.shape[0] == (~fast).sum()
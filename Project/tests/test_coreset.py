@@ -0,0 +1,61 @@
+# tests/test_coreset.py
+import numpy as np
+import pytest
+from sklearn.metrics.pairwise import rbf_kernel
+
+from utils.coreset import CORESET_METHODS, select_coreset, stratified_coreset
+
+
+@pytest.mark.parametrize("method", CORESET_METHODS)
+@pytest.mark.parametrize("budget", [1, 50, 333])
+def test_sizes_and_indices(features_a, enterprise_a, method, budget):
+    X, _ = features_a
+    strata = enterprise_a[["user_id", "process_name"]]
+    rows = select_coreset(X, budget, method=method, strata=strata, seed=3)
+
+    assert len(rows) == budget
+    assert np.all(np.diff(rows) > 0) and rows[0] >= 0 and rows[-1] < len(X)
+    np.testing.assert_array_equal(rows, select_coreset(X, budget, method=method, strata=strata, seed=3))
+    np.testing.assert_array_equal(select_coreset(X, 5000, method=method, strata=strata), np.arange(len(X)))
+
+
+def test_stratified_covers_every_stratum(enterprise_a):
+    strata = enterprise_a[["user_id", "process_name"]]
+    n_strata = len(strata.drop_duplicates())
+    rows = stratified_coreset(strata, 2 * n_strata)
+
+    sizes = strata.value_counts()
+    kept = strata.iloc[rows].value_counts().reindex(sizes.index, fill_value=0)
+    assert (kept >= 1).all()
+    # proportional: no stratum is more than one row away from its quota (beyond the minimum of 1)
+    quota = sizes * len(rows) / len(strata)
+    assert (kept <= np.maximum(np.ceil(quota), 1) + 1).all()
+
+
+def test_kmeanspp_skips_duplicates(features_a):
+    X, _ = features_a
+    # 200 distinct rows, each repeated five times: exact copies of a chosen row have distance 0
+    repeated = np.repeat(X[:200], 5, axis=0)
+    rows = select_coreset(repeated, 100, method="kmeans++")
+    assert len(np.unique(rows // 5)) == 100
+
+
+def test_herding_tracks_the_kernel_mean(features_a):
+    X, _ = features_a
+    gamma = 1.0 / (X.shape[1] * X.var())
+
+    def mmd(rows):
+        return (rbf_kernel(X, X, gamma=gamma).mean() + rbf_kernel(X[rows], X[rows], gamma=gamma).mean()
+                - 2 * rbf_kernel(X, X[rows], gamma=gamma).mean())
+
+    rng = np.random.default_rng(0)
+    random_mmd = [mmd(rng.choice(len(X), 100, replace=False)) for _ in range(20)]
+    assert mmd(select_coreset(X, 100, method="herding")) < min(random_mmd)
+
+
+def test_unknown_method(features_a):
+    X, _ = features_a
+    with pytest.raises(ValueError):
+        select_coreset(X, 10, method="random")
+    with pytest.raises(ValueError):
+        select_coreset(X, 10, method="stratified")
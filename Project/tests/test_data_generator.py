@@ -0,0 +1,46 @@
+# tests/test_data_generator.py
+import pandas as pd
+import pytest
+
+from utils.data_generator import COLUMNS, PROFILES, generate_dataset, write_csv
+from utils.data_loader import load_dataset
+
+
+@pytest.mark.parametrize("profile", list(PROFILES))
+def test_schema_and_consistency(profile):
+    df = generate_dataset(profile, 5000, seed=1, t1059_rate=0.5)
+    assert list(df.columns) == COLUMNS
+    assert len(df) == 5000
+
+    assert (df["command_length"] == df["command_text"].str.len()).all()
+    assert df["host_id"].nunique() <= PROFILES[profile]["n_hosts"]
+    assert set(df["is_anomaly"]) <= {"benign", "suspicious"}
+    assert 0.03 < (df["is_anomaly"] == "suspicious").mean() < 0.07
+
+    timestamps = pd.to_datetime(df["timestamp"], dayfirst=True, errors="coerce")
+    assert timestamps.notna().all()
+    if PROFILES[profile]["no_weekend"]:
+        # like the notebook (and data/Enterprise_A.csv), only Saturdays are redrawn
+        assert (timestamps.dt.dayofweek != 5).all()
+
+
+def test_same_seed_same_rows():
+    first = generate_dataset("B", 3000, seed=7, chunk_size=1000)
+    pd.testing.assert_frame_equal(first, generate_dataset("B", 3000, seed=7, chunk_size=1000))
+    assert not first["command_text"].equals(generate_dataset("B", 3000, seed=8, chunk_size=1000)["command_text"])
+
+
+def test_csv_matches_in_memory(tmp_path, enterprise_a):
+    path = str(tmp_path / "Enterprise_A_small.csv")
+    write_csv(path, "A", 2500, seed=3, chunk_size=1000)
+
+    written = load_dataset(path, engine="c")
+    expected = generate_dataset("A", 2500, seed=3, chunk_size=1000)
+    assert list(written.columns) == list(enterprise_a.columns)
+    assert written["command_text"].tolist() == expected["command_text"].tolist()
+    assert (written["num_arguments"].to_numpy() == expected["num_arguments"].to_numpy()).all()
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        generate_dataset("Z", 10)
@@ -0,0 +1,49 @@
+# tests/test_data_loader.py
+import pandas as pd
+import pytest
+
+from utils.data_loader import CATEGORY_COLUMNS, INT_COLUMNS, load_dataset, read_dataset_chunks
+
+
+@pytest.mark.parametrize("engine", ["c", "pyarrow"])
+def test_load_dataset_schema(enterprise_a_path, enterprise_a, engine):
+    df = load_dataset(enterprise_a_path, engine=engine)
+
+    for col in CATEGORY_COLUMNS:
+        assert isinstance(df[col].dtype, pd.CategoricalDtype)
+        assert df[col].astype(str).tolist() == enterprise_a[col].astype(str).tolist()
+    for col, dtype in INT_COLUMNS.items():
+        assert df[col].dtype == dtype
+        assert df[col].tolist() == enterprise_a[col].tolist()
+    assert df["command_text"].tolist() == enterprise_a["command_text"].tolist()
+
+
+def test_usecols(enterprise_a_path):
+    df = load_dataset(enterprise_a_path, usecols=["user_id", "command_length"])
+    assert sorted(df.columns) == ["command_length", "user_id"]
+    assert df["command_length"].dtype == "int32"
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_missing_ints_fall_back_to_float(tmp_path, enterprise_a):
+    path = tmp_path / "with_gaps.csv"
+    broken = enterprise_a.head(50).copy()
+    broken.loc[3, "command_length"] = None
+    broken.to_csv(path, index=False)
+
+    df = load_dataset(str(path), engine="c")
+    assert df["command_length"].dtype == "float32"
+    assert df["command_length"].isna().sum() == 1
+
+
+def test_chunks_concatenate_to_full_load(enterprise_a_path):
+    full = load_dataset(enterprise_a_path, engine="c")
+    chunks = list(read_dataset_chunks(enterprise_a_path, chunksize=300))
+
+    assert [len(c) for c in chunks] == [300, 300, 300, 100]
+    joined = pd.concat(chunks, ignore_index=True)
+    for col in full.columns.difference(list(INT_COLUMNS)):
+        assert joined[col].astype(str).tolist() == full[col].astype(str).tolist()
+    for col in INT_COLUMNS:
+        assert joined[col].dtype == "float32"
+        assert (joined[col] == full[col]).all()
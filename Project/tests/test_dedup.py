@@ -0,0 +1,68 @@
+# tests/test_dedup.py
+import numpy as np
+import pytest
+from scipy import sparse
+
+import utils.dedup as dedup_module
+from agents.isolation_forest_agent import IsolationForestAgent
+from agents.meta_agent import MetaAgent
+from agents.svm_agent import SVMAgent
+from utils.dedup import DedupScorer, RowDedup
+from utils.preprocessing import agent_inputs
+from utils.score_store import ScoreStore
+
+
+@pytest.fixture(scope="module")
+def repeated_a(features_a):
+    """ 1,000 rows drawn from 150 distinct Enterprise_A feature rows, as repetitive telemetry looks. """
+    X, _ = features_a
+    idx = np.random.default_rng(0).integers(0, 150, 1000)
+    return X[idx], idx
+
+
+@pytest.fixture(scope="module")
+def meta_agent_a(features_a):
+    X, y = features_a
+    meta_agent = MetaAgent([IsolationForestAgent(n_estimators=50, random_state=0), SVMAgent(nu=0.05)])
+    meta_agent.fit(agent_inputs(X[y == 0]))
+    return meta_agent
+
+
+def test_groups_are_the_distinct_rows(repeated_a):
+    X, idx = repeated_a
+    dedup = RowDedup(X)
+
+    assert dedup.n_unique == len(np.unique(idx)) and dedup.collisions == 0
+    np.testing.assert_array_equal(dedup.expand(dedup.take(X)[:, 0]), X[:, 0])
+    # first occurrences, in order of appearance
+    np.testing.assert_array_equal(dedup.first, np.sort(np.unique(idx, return_index=True)[1]))
+    assert RowDedup(sparse.csr_matrix(X)).n_unique == dedup.n_unique
+
+
+def test_dedup_scores_equal_full_scores(repeated_a, meta_agent_a):
+    X, idx = repeated_a
+    scorer = DedupScorer(meta_agent_a)
+    np.testing.assert_allclose(scorer.score(agent_inputs(X)), meta_agent_a.score(agent_inputs(X)), rtol=1e-12)
+    assert scorer.stats()["unique_rows"] == len(np.unique(idx))
+
+    store = ScoreStore({"test": agent_inputs(X)}, dedup=True)
+    plain = ScoreStore({"test": agent_inputs(X)})
+    for agent in meta_agent_a.agents:
+        np.testing.assert_allclose(store.get(agent, "test"), plain.get(agent, "test"), rtol=1e-12)
+    assert store.dedup_stats()["test"]["unique_rows"] == len(np.unique(idx))
+
+
+def test_hash_collisions_are_split(repeated_a, monkeypatch):
+    X, idx = repeated_a
+    # every row hashes alike: only the row comparison keeps distinct rows apart
+    monkeypatch.setattr(dedup_module, "row_hashes", lambda M: np.zeros(M.shape[0], dtype=np.uint64))
+    dedup = RowDedup(X)
+
+    assert dedup.n_unique == len(np.unique(idx))
+    assert dedup.collisions == np.sum(idx != idx[0])
+    np.testing.assert_array_equal(dedup.take(X)[dedup.inverse], X)
+
+
+def test_nan_rows_are_duplicates():
+    X = np.array([[1.0, np.nan], [1.0, np.nan], [2.0, 0.0]])
+    assert RowDedup(X).n_unique == 2
@@ -0,0 +1,68 @@
+# tests/test_drift_monitor.py
+import numpy as np
+import pytest
+
+from utils.drift_monitor import (AdaptiveScorer, DriftMonitor, RollingHistogram, build_reference, histogram, ks,
+                                 psi, quantile_edges, retrain_bundle)
+from utils.online_scorer import OnlineScorer
+
+
+def test_psi_and_ks_on_real_feature(enterprise_a):
+    lengths = enterprise_a["command_length"].to_numpy(dtype=float)
+    edges = quantile_edges(lengths[:500], bins=10)
+    reference = histogram(lengths[:500], edges)
+
+    assert psi(reference, reference) == 0.0 and ks(reference, reference) == 0.0
+    assert psi(reference, histogram(lengths[500:], edges)) < 0.1
+    assert psi(reference, histogram(lengths[500:] * 1.5 + 10, edges)) > 1.0
+    assert ks(reference, histogram(lengths[500:] * 1.5 + 10, edges)) > 0.4
+
+
+def test_rolling_histogram_keeps_the_last_window():
+    edges = np.array([0.5, 1.5])
+    rolling = RollingHistogram(edges, window=100, n_buckets=4)
+    rolling.add(np.zeros(130))
+    rolling.add(np.full(55, 2.0))
+
+    # 7 full buckets of 25 seen, the ring holds the last 4 (+ 10 rows of the open one)
+    assert rolling.n == 110
+    np.testing.assert_array_equal(rolling.counts(), [55, 0, 55])
+
+
+def test_monitor_flags_shifted_scores_only(enterprise_a):
+    lengths = enterprise_a["command_length"].to_numpy(dtype=float)
+    reference = build_reference(lengths[:500], lengths[:500, None], ["command_length"])
+
+    same = DriftMonitor(reference, window=500, min_samples=200)
+    same.update(lengths[500:], lengths[500:, None])
+    report = same.check()
+    assert not report["drifted"] and report["samples"] == 500
+
+    shifted = DriftMonitor(reference, window=500, min_samples=200)
+    shifted.update(lengths[500:] * 1.5 + 10, lengths[500:, None])
+    report = shifted.check()
+    assert report["drifted"] and report["reasons"] == ["score_psi", "score_ks"]
+
+    too_few = DriftMonitor(reference, min_samples=200)
+    too_few.update(lengths[500:600] * 1.5 + 10)
+    assert not too_few.check()["drifted"]
+
+
+def test_retrain_and_swap(make_bundle_a, new_records_a):
+    adaptive = AdaptiveScorer(OnlineScorer(make_bundle_a()), monitor_kwargs={"min_samples": 50},
+                              retrain=False, check_every=50)
+    shifted = [dict(r, command_length=r["command_length"] * 5) for r in new_records_a]
+    adaptive.score_records(shifted[:100])
+
+    assert adaptive.last_report["drifted"]
+    # drift is dated back to one check_every before the check that flagged it
+    assert adaptive.post_drift_records() == shifted[50:100]
+
+    bundle = retrain_bundle(adaptive.scorer.bundle, shifted, contamination=0.1)
+    assert bundle.threshold == pytest.approx(np.quantile(bundle.reference["scores"], 0.9), rel=0.05)
+    assert bundle.pipeline.feature_cols_ == bundle.reference["feature_names"]
+
+    adaptive.swap(adaptive.scorer.with_bundle(bundle))
+    assert adaptive.status()["model_version"] == 2 and adaptive.post_drift_records() == []
+    assert adaptive.threshold == bundle.threshold
+    assert len(adaptive.score_records(shifted[100:])) == 100
@@ -0,0 +1,36 @@
+# tests/test_eda.py
+import numpy as np
+import pandas as pd
+
+from utils.EDA import aggregate_data, _weighted_kde
+
+
+def test_chunked_aggregates_match_full_scan(enterprise_a_path, enterprise_a):
+    agg = aggregate_data(enterprise_a_path, chunksize=128)
+
+    timestamps = pd.to_datetime(enterprise_a["timestamp"].astype(str).str.strip(), dayfirst=True, errors="coerce")
+    df = enterprise_a[timestamps.notna()]
+    label = df["is_anomaly"].astype(str)
+
+    assert agg["class_counts"].to_dict() == label.value_counts().to_dict()
+    for col in ["command_length", "num_arguments"]:
+        expected = pd.crosstab(df[col], label)
+        np.testing.assert_array_equal(agg[col].to_numpy(), expected.to_numpy())
+        np.testing.assert_array_equal(agg[col].index.to_numpy(), expected.index.to_numpy())
+
+    hours = pd.crosstab(timestamps[timestamps.notna()].dt.hour, label).reindex(range(24), fill_value=0)
+    np.testing.assert_array_equal(agg["hour"].to_numpy(), hours.to_numpy())
+    assert agg["hour"].to_numpy().sum() == len(df)
+
+
+def test_weighted_kde_equals_expanded_sample():
+    values = np.array([1.0, 2.0, 5.0])
+    weights = np.array([3.0, 1.0, 2.0])
+    grid = np.linspace(0, 6, 13)
+
+    sample = np.repeat(values, weights.astype(int))
+    bandwidth = sample.std() * len(sample) ** (-1 / 5)
+    z = (grid[:, None] - sample[None, :]) / bandwidth
+    expected = np.exp(-0.5 * z ** 2).sum(axis=1) / (len(sample) * bandwidth * np.sqrt(2 * np.pi))
+
+    np.testing.assert_allclose(_weighted_kde(values, weights, grid), expected)
@@ -0,0 +1,47 @@
+# tests/test_hyperparam_search.py
+import numpy as np
+
+from utils.hyperparam_search import evaluate_config, expand_space, rung_budgets, successive_halving_search
+
+
+def test_expand_space():
+    configs = expand_space({"hidden_dims": [(128, 64), (64,)], "latent_dim": [8, 16, 32]})
+    assert len(configs) == 6
+    assert configs[0] == {"hidden_dims": (128, 64), "latent_dim": 8}
+
+
+def test_rung_budgets_end_at_full_budget():
+    assert rung_budgets("IsolationForest", 27, 10_000) == [1 / 27, 1 / 9, 1 / 3, 1.0]
+    # too few rows for a 27x smaller subsample: fewer rungs, none below min_rows
+    budgets = rung_budgets("OneClassSVM", 27, 500)
+    assert budgets[-1] == 1.0 and budgets[0] * 500 >= 100
+    assert rung_budgets("Autoencoder", 9, 10_000) == [6, 17, 50]
+    assert rung_budgets("IsolationForest", 1, 10_000) == [1.0]
+
+
+def test_successive_halving_on_enterprise_a(features_a):
+    X, y = features_a
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(y))
+    train, val = order[:600], order[600:]
+    train = train[y[train] == 0]
+
+    X_train = {"IsolationForest": X[train]}
+    X_val = {"IsolationForest": X[val]}
+    spaces = {"IsolationForest": {"n_estimators": [20, 30, 40, 50, 60, 70, 80, 90, 100]}}
+
+    best = successive_halving_search(X_train, X_val, y[val], spaces=spaces, eta=3, n_jobs=1)["IsolationForest"]
+
+    # ~570 benign training rows and min_rows=100 -> two rungs (1/3 of the rows, then all)
+    budgets = rung_budgets("IsolationForest", 9, len(train))
+    assert budgets == [1 / 3, 1.0]
+    rungs = [[h for h in best["history"] if h["rung"] == r] for r in range(len(budgets))]
+    assert [len(r) for r in rungs] == [9, 3]
+    assert [r[0]["budget"] for r in rungs] == budgets
+    # the promoted configurations are the best of the previous rung
+    top = sorted(rungs[0], key=lambda h: h["f1"], reverse=True)[:3]
+    assert sorted(h["params"]["n_estimators"] for h in rungs[1]) == sorted(h["params"]["n_estimators"] for h in top)
+
+    data = {"IsolationForest": X[train], "IsolationForest_val": X[val], "y_val": y[val]}
+    assert best["f1"] == evaluate_config("IsolationForest", best["params"], 1.0, seed=42 + 1, data=data)
+    assert best["f1"] == max(h["f1"] for h in rungs[-1])
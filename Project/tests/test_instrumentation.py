@@ -0,0 +1,50 @@
+# tests/test_instrumentation.py
+import json
+import tracemalloc
+
+import numpy as np
+
+from utils.instrumentation import Tracer
+
+
+def test_nested_stages_and_memory(tmp_path, enterprise_a):
+    tracer = Tracer("Enterprise_A", trace_memory=True)
+
+    with tracer.stage("preprocess", rows=len(enterprise_a)):
+        with tracer.stage("copy"):
+            kept = enterprise_a["command_text"].to_numpy().copy()
+        with tracer.stage("scratch"):
+            scratch = np.ones(4 * 2 ** 20 // 8)
+            del scratch
+
+    @tracer.trace()
+    def count(texts):
+        return len(texts)
+
+    assert count(kept) == len(enterprise_a)
+    assert not tracemalloc.is_tracing()
+
+    stages = {r["stage"]: r for r in tracer.records}
+    assert list(stages) == ["preprocess/copy", "preprocess/scratch", "preprocess", "count"]
+    assert stages["preprocess"]["rows"] == 1000
+    assert stages["preprocess/copy"]["depth"] == 1 and stages["preprocess"]["depth"] == 0
+
+    # a freed 4 MB buffer shows in the peak of its stage and its parent, not in the delta
+    assert stages["preprocess/scratch"]["tracemalloc_peak_mb"] >= 4
+    assert stages["preprocess/scratch"]["tracemalloc_delta_mb"] < 1
+    assert stages["preprocess"]["tracemalloc_peak_mb"] >= 4
+    assert stages["preprocess"]["wall_seconds"] >= stages["preprocess/copy"]["wall_seconds"]
+
+    saved = json.load(open(tracer.save(str(tmp_path / "trace.json"))))
+    assert [r["stage"] for r in saved["stages"]] == ["preprocess", "preprocess/copy", "preprocess/scratch", "count"]
+
+
+def test_without_trace_memory():
+    tracer = Tracer("run", trace_memory=False)
+    with tracer.stage("fit"):
+        assert not tracemalloc.is_tracing()
+
+    record = tracer.records[0]
+    assert "tracemalloc_peak_mb" not in record
+    assert record["max_rss_mb"] > 0 and record["cpu_seconds"] >= 0
+    assert tracer.to_dict()["trace_memory"] is False
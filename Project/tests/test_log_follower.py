@@ -0,0 +1,97 @@
+# tests/test_log_follower.py
+import json
+import os
+
+import pytest
+
+from utils.log_follower import LogFollower, detect_format
+
+
+@pytest.fixture
+def log_lines(enterprise_a_path):
+    with open(enterprise_a_path, "rb") as f:
+        return f.readlines()
+
+
+def _texts(records):
+    return [r["command_text"] for r in records]
+
+
+def test_reads_complete_lines_only(tmp_path, log_lines, enterprise_a):
+    path = str(tmp_path / "live.csv")
+    with open(path, "wb") as f:
+        f.writelines(log_lines[:201])
+    follower = LogFollower(path, from_start=True)
+
+    assert _texts(follower.poll(150)) == enterprise_a["command_text"].iloc[:150].tolist()
+    with open(path, "ab") as f:
+        f.write(log_lines[201][:20])
+    assert len(follower.poll(1000)) == 50
+    assert follower.poll(1000) == []
+
+    # the rest of the half-written line arrives
+    with open(path, "ab") as f:
+        f.write(log_lines[201][20:])
+    (record,) = follower.poll(1000)
+    assert record["command_text"] == enterprise_a["command_text"].iloc[200]
+    assert record["user_id"] == enterprise_a["user_id"].iloc[200]
+    assert follower.lag_bytes() == 0
+
+
+def test_restart_resumes_at_committed_offset(tmp_path, log_lines, enterprise_a):
+    path, checkpoint = str(tmp_path / "live.csv"), str(tmp_path / "live.checkpoint.json")
+    with open(path, "wb") as f:
+        f.writelines(log_lines[:301])
+
+    follower = LogFollower(path, checkpoint_path=checkpoint, from_start=True)
+    follower.poll(120)
+    follower.commit(scored=120)
+    follower.poll(60)  # read but never committed (e.g. the process died while scoring)
+    follower.close()
+
+    restarted = LogFollower(path, checkpoint_path=checkpoint)
+    assert json.load(open(checkpoint))["scored"] == 120
+    assert _texts(restarted.poll(1000)) == enterprise_a["command_text"].iloc[120:300].tolist()
+
+    # a checkpoint of another file is ignored; without from_start only new lines are read
+    other = str(tmp_path / "other.csv")
+    with open(other, "wb") as f:
+        f.writelines(log_lines[:11])
+    tail = LogFollower(other, checkpoint_path=checkpoint)
+    assert tail.poll(1000) == []
+    with open(other, "ab") as f:
+        f.write(log_lines[11])
+    assert _texts(tail.poll(1000)) == [enterprise_a["command_text"].iloc[10]]
+
+
+def test_truncation_and_rotation_restart_from_the_top(tmp_path, log_lines, enterprise_a):
+    path = str(tmp_path / "live.csv")
+    with open(path, "wb") as f:
+        f.writelines(log_lines[:101])
+    follower = LogFollower(path, from_start=True)
+    assert len(follower.poll(1000)) == 100
+
+    with open(path, "wb") as f:
+        f.writelines(log_lines[:1] + log_lines[500:511])
+    assert _texts(follower.poll(1000)) == enterprise_a["command_text"].iloc[499:510].tolist()
+
+    rotated = str(tmp_path / "live.csv.new")
+    with open(rotated, "wb") as f:
+        f.writelines(log_lines[:1] + log_lines[700:1000])
+    os.replace(rotated, path)
+    assert _texts(follower.poll(1000)) == enterprise_a["command_text"].iloc[699:999].tolist()
+
+
+def test_jsonl_skips_malformed_lines(tmp_path, enterprise_a):
+    path = str(tmp_path / "live.jsonl")
+    records = enterprise_a.iloc[:5].to_dict("records")
+    lines = [json.dumps(r) for r in records]
+    lines.insert(2, json.dumps(dict(records[0], command_text=["nested"])))
+    lines.insert(4, "{not json")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n\n")
+
+    follower = LogFollower(path, from_start=True)
+    assert detect_format(path) == "jsonl"
+    assert follower.poll(1000) == records
+    assert follower.skipped == 2
@@ -0,0 +1,37 @@
+# tests/test_metrics.py
+import numpy as np
+from sklearn import metrics as skm
+
+from utils.metrics import classification_metrics, threshold_metrics, batched_confusion_counts
+from utils.preprocessing import encode_labels
+
+
+def test_classification_metrics_match_sklearn(enterprise_a):
+    y_true = np.asarray(encode_labels(enterprise_a["is_anomaly"]))
+    rng = np.random.default_rng(0)
+    for _ in range(5):
+        y_pred = (rng.random(len(y_true)) < 0.1).astype(int)
+        result = classification_metrics(y_true, y_pred)
+        assert result["precision"] == skm.precision_score(y_true, y_pred, zero_division=0)
+        assert result["recall"] == skm.recall_score(y_true, y_pred, zero_division=0)
+        assert np.isclose(result["f1"], skm.f1_score(y_true, y_pred, zero_division=0))
+        np.testing.assert_array_equal(result["cm"], skm.confusion_matrix(y_true, y_pred))
+
+
+def test_undefined_ratios_are_zero():
+    result = classification_metrics([0, 0, 0], [0, 0, 0])
+    assert result["precision"] == result["recall"] == result["f1"] == 0.0
+
+
+def test_threshold_metrics_match_single_pass(enterprise_a):
+    y_true = np.asarray(encode_labels(enterprise_a["is_anomaly"]))
+    scores = enterprise_a["command_length"].to_numpy(dtype=float)
+    thresholds = np.unique(scores)
+
+    batched = threshold_metrics(scores, y_true, thresholds, chunk_size=7)
+    for i, threshold in enumerate(thresholds):
+        expected = skm.f1_score(y_true, (scores >= threshold).astype(int), zero_division=0)
+        assert np.isclose(batched["f1"][i], expected)
+
+    tp, fp, tn, fn = batched_confusion_counts(y_true, scores[None, :] >= thresholds[:, None])
+    assert np.all(tp + fp + tn + fn == len(y_true))
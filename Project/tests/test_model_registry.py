@@ -0,0 +1,100 @@
+# tests/test_model_registry.py
+import os
+from unittest import mock
+
+import pytest
+
+from utils.model_io import BUNDLE_FILE, write_bundle
+from utils.model_registry import ModelRegistry, UnknownTenantError
+from utils.online_scorer import OnlineScorer
+
+
+class FakeScorer:
+    """ Scores a record by the length of its command; remembers whether it was closed. """
+
+    text_cache_mb = 1
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.closed = False
+
+    def score_records(self, records):
+        return [{"anomaly_score": float(len(r["command_text"])), "predicted_anomaly": 0} for r in records]
+
+    def close(self):
+        self.closed = True
+
+
+def _make_root(root, tenants):
+    for tenant in tenants:
+        os.makedirs(os.path.join(root, tenant, "model"))
+        with open(os.path.join(root, tenant, "model", BUNDLE_FILE), "wb") as f:
+            f.write(b"\0" * 1024)
+    return str(root)
+
+
+def test_routing_keeps_record_order(tmp_path, new_records_a):
+    registry = ModelRegistry(_make_root(tmp_path, ["Enterprise_A", "Enterprise_B"]), scorer_factory=FakeScorer)
+    records = [dict(r, tenant_id="Enterprise_A" if i % 3 else "Enterprise_B") for i, r in enumerate(new_records_a)]
+
+    results = registry.score_records(records)
+    assert [r["tenant"] for r in results] == [r["tenant_id"] for r in records]
+    assert [r["anomaly_score"] for r in results] == [len(r["command_text"]) for r in records]
+    assert registry.stats()["loads"] == 2
+
+    with pytest.raises(UnknownTenantError):
+        registry.score_records([dict(records[0], tenant_id="Enterprise_Z")])
+    with pytest.raises(ValueError):
+        registry.score_records([new_records_a[0]])
+    assert ModelRegistry(registry.root, scorer_factory=FakeScorer, default_tenant="Enterprise_A").score_records(
+        [new_records_a[0]])[0]["tenant"] == "Enterprise_A"
+
+
+def test_lru_eviction(tmp_path):
+    registry = ModelRegistry(_make_root(tmp_path, ["A", "B", "C"]), max_resident=2, scorer_factory=FakeScorer)
+    a = registry.get("A")
+    registry.get("B")
+    registry.get("A")       # B is now the least recently used
+    registry.get("C")
+
+    stats = registry.stats()
+    assert stats["resident"] == ["A", "C"]
+    assert (stats["loads"], stats["hits"], stats["evictions"]) == (3, 1, 1)
+    assert registry.get("A") is a and not a.closed
+
+    # the memory budget evicts too: each tenant is ~1 MB of text cache + the 1 KB bundle
+    tight = ModelRegistry(registry.root, max_resident=3, memory_budget_mb=1.5, scorer_factory=FakeScorer)
+    b = tight.get("B")
+    tight.get("C")
+    assert tight.stats()["resident"] == ["C"] and b.closed
+
+    registry.close()
+    assert a.closed and registry.stats()["resident"] == []
+
+
+def test_tenant_lookups_list_root_only_on_a_miss(tmp_path):
+    root = _make_root(tmp_path, ["A", "B"])
+    registry = ModelRegistry(root, scorer_factory=FakeScorer)
+    assert registry.tenants() == ["A", "B"]
+
+    with mock.patch("utils.model_registry.os.listdir", wraps=os.listdir) as listdir:
+        assert registry.unknown_tenants(["A", "B"]) == set()
+        assert listdir.call_count == 0
+
+        _make_root(tmp_path, ["C"])  # trained after start-up
+        assert registry.cached_unknown(["C"]) == {"C"}
+        assert registry.unknown_tenants(["C", "D"]) == {"D"}
+        assert listdir.call_count == 1
+
+    assert not registry.has_tenant("../A") and not registry.has_tenant("")
+    assert registry.stats()["known_tenants"] == 3
+
+
+def test_real_bundles_score_like_the_scorer(tmp_path, make_bundle_a, new_records_a):
+    write_bundle(str(tmp_path / "Enterprise_A" / "model"), make_bundle_a())
+    registry = ModelRegistry(str(tmp_path))
+
+    records = [dict(r, tenant_id="Enterprise_A") for r in new_records_a[:50]]
+    results = registry.score_records(records)
+    expected = OnlineScorer(make_bundle_a()).score_records(new_records_a[:50])
+    assert [{k: r[k] for k in ("anomaly_score", "predicted_anomaly")} for r in results] == expected
@@ -0,0 +1,86 @@
+# tests/test_online_scorer.py
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from serve import MicroBatcher, parse_records
+from utils.online_scorer import OnlineScorer
+from utils.preprocessing import agent_inputs
+
+
+def test_records_scored_like_the_pipeline(make_bundle_a, new_records_a):
+    scorer = OnlineScorer(make_bundle_a())
+    results = scorer.score_records(new_records_a[:100]) + scorer.score_records(new_records_a[100:])
+
+    bundle = make_bundle_a()
+    X_full = bundle.pipeline.transform(pd.DataFrame.from_records(new_records_a))
+    expected = bundle.meta_agent.score(agent_inputs(X_full))
+
+    np.testing.assert_allclose([r["anomaly_score"] for r in results], expected, rtol=1e-12)
+    assert [r["predicted_anomaly"] for r in results] == (expected >= bundle.threshold).astype(int).tolist()
+    assert scorer.score_records([]) == []
+
+
+def test_failed_batch_does_not_advance_behavior(make_bundle_a, new_records_a):
+    scorer = OnlineScorer(make_bundle_a())
+
+    def fail(df, behavior):
+        raise RuntimeError("scoring failed")
+
+    scorer._score_partitioned = fail
+    with pytest.raises(RuntimeError):
+        scorer.score_records(new_records_a[:50])
+    del scorer._score_partitioned
+
+    retried = scorer.score_records(new_records_a[:50])
+    assert retried == OnlineScorer(make_bundle_a()).score_records(new_records_a[:50])
+
+
+def test_parse_records():
+    record = {"user_id": "user_01", "command_length": 12, "command_text": "Get-Process"}
+    assert parse_records(json.dumps(record)) == [record]
+    assert parse_records(json.dumps([record, record])) == [record, record]
+    assert parse_records(json.dumps({"records": [record]})) == [record]
+
+    for body in ([1, 2], {"records": "x"}, {"records": [dict(record, command_text=["a"])]}):
+        with pytest.raises(ValueError):
+            parse_records(json.dumps(body))
+
+
+class _EchoScorer:
+    """ Scores every record by its 'value'; a record with 'bad' fails the whole call. """
+
+    def __init__(self):
+        self.calls = []
+
+    def score_records(self, records):
+        self.calls.append(len(records))
+        if any(r.get("bad") for r in records):
+            raise ValueError("bad record")
+        return [{"anomaly_score": float(r["value"])} for r in records]
+
+
+def test_micro_batcher_coalesces_and_isolates_failures():
+    scorer = _EchoScorer()
+
+    async def run():
+        batcher = MicroBatcher(scorer, max_batch_size=100, max_delay_ms=50)
+        batcher.start()
+        requests = [[{"value": 1}, {"value": 2}], [{"value": 3, "bad": True}], [{"value": 4}]]
+        results = await asyncio.gather(*(batcher.submit(r) for r in requests), return_exceptions=True)
+        ok = await batcher.submit([{"value": 5}])
+        await batcher.stop()
+        return results, ok, batcher.metrics
+
+    (first, failed, last), ok, metrics = asyncio.run(run())
+
+    assert [r["anomaly_score"] for r in first] == [1.0, 2.0]
+    assert isinstance(failed, ValueError)
+    assert [r["anomaly_score"] for r in last] == [4.0]
+    assert [r["anomaly_score"] for r in ok] == [5.0]
+    # one coalesced call of 4 records, then each request alone, then the next batch
+    assert scorer.calls == [4, 2, 1, 1, 1]
+    assert (metrics.errors, metrics.requests) == (1, 3)
@@ -0,0 +1,75 @@
+# tests/test_quantile_sketch.py
+import numpy as np
+import pytest
+
+from agents.isolation_forest_agent import IsolationForestAgent
+from agents.meta_agent import MetaAgent
+from agents.quantile_sketch import KLLSketch
+from agents.svm_agent import SVMAgent
+from utils.preprocessing import agent_inputs
+
+
+@pytest.fixture(scope="module")
+def scores_a(features_a):
+    """ IsolationForest scores of Enterprise_A, repeated with jitter to a 50k-value stream. """
+    X, y = features_a
+    agent = IsolationForestAgent(n_estimators=50, random_state=0)
+    agent.fit(X[y == 0])
+    scores = agent.score(X)
+    rng = np.random.default_rng(0)
+    return np.concatenate([scores + rng.normal(0, 1e-3, len(scores)) for _ in range(50)])
+
+
+def _max_rank_error(sketch, values):
+    values = np.sort(values)
+    q = np.linspace(0.01, 0.99, 99)
+    estimates = sketch.quantile(q)
+    true_ranks = np.searchsorted(values, estimates, side="right") / len(values)
+    return np.max(np.abs(true_ranks - q))
+
+
+def test_rank_error_within_bound(scores_a):
+    sketch = KLLSketch(k=200)
+    for start in range(0, len(scores_a), 777):
+        sketch.update(scores_a[start:start + 777])
+
+    assert sketch.n == len(scores_a)
+    assert sketch.size < 3 * 200 + 64
+    assert _max_rank_error(sketch, scores_a) < 0.02
+    assert _max_rank_error(KLLSketch(k=1000).update(scores_a), scores_a) < 0.005
+
+    ranks = sketch.rank(np.quantile(scores_a, [0.05, 0.5, 0.95]))
+    np.testing.assert_allclose(ranks, [0.05, 0.5, 0.95], atol=0.02)
+
+
+def test_exact_for_small_streams_and_merge(scores_a):
+    small = scores_a[:150]
+    sketch = KLLSketch(k=200).update(small)
+    assert sketch.quantile(0.5) == np.sort(small)[74]
+    assert sketch.quantile(1.0) == small.max() and sketch.quantile(0.0) == small.min()
+
+    half = len(scores_a) // 2
+    merged = KLLSketch(k=200).update(scores_a[:half]).merge(KLLSketch(k=200, seed=1).update(scores_a[half:]))
+    assert merged.n == len(scores_a)
+    assert _max_rank_error(merged, scores_a) < 0.02
+
+    with pytest.raises(ValueError):
+        KLLSketch().quantile(0.5)
+
+
+def test_calibrated_hard_vote_does_not_depend_on_the_batch(features_a):
+    X, y = features_a
+    meta_agent = MetaAgent([IsolationForestAgent(n_estimators=50, random_state=0), SVMAgent(nu=0.05)],
+                           voting="hard")
+    meta_agent.fit(agent_inputs(X[:600][y[:600] == 0]))
+    meta_agent.calibrate(agent_inputs(X[600:800]))
+
+    test = agent_inputs(X[800:])
+    whole = meta_agent.predict(test)
+    split = np.concatenate([meta_agent.predict(agent_inputs(X[800:850])), meta_agent.predict(agent_inputs(X[850:]))])
+    np.testing.assert_array_equal(whole, split)
+
+    # the per-agent cutoffs are the calibration quantiles
+    val_scores = meta_agent.score_matrix(agent_inputs(X[600:800]))
+    for threshold, scores in zip(meta_agent.agent_thresholds_, val_scores):
+        assert threshold == np.sort(scores)[int(np.ceil(0.95 * len(scores))) - 1]
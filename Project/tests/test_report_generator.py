@@ -0,0 +1,69 @@
+# tests/test_report_generator.py
+import io
+import os
+
+import numpy as np
+
+from utils.preprocessing import encode_labels
+from utils.report_generator import (compare_enterprises, export_metrics_to_csv, find_enterprise_summaries,
+                                    generate_pdf_report, plot_confusion_matrix_graph, render_confusion_matrices)
+
+
+def _write_summary(root, name, agents):
+    folder = os.path.join(root, name)
+    os.makedirs(folder, exist_ok=True)
+    agents_info = [{"name": agent, "metrics": {"Recall": 0.5, "Precision": 0.25, "F1_score": 1 / 3}}
+                   for agent in agents]
+    export_metrics_to_csv(os.path.join(folder, f"{name}_metrics_summary.csv"), agents_info,
+                          {"metrics": {"Recall": 0.75, "Precision": 0.5, "F1_score": 0.6}})
+
+
+def test_summaries_are_discovered(tmp_path):
+    root = str(tmp_path)
+    _write_summary(root, "Enterprise_A", ["IsolationForest", "OneClassSVM"])
+    _write_summary(root, "Enterprise_C_10M", ["IsolationForest"])
+    os.makedirs(os.path.join(root, "Enterprise_B"))  # a run that did not finish
+
+    assert list(find_enterprise_summaries(root)) == ["Enterprise_A", "Enterprise_C_10M"]
+    assert find_enterprise_summaries(str(tmp_path / "missing")) == {}
+
+
+def test_compare_any_set_of_enterprises(tmp_path):
+    root = str(tmp_path)
+    _write_summary(root, "Enterprise_A", ["IsolationForest", "OneClassSVM"])
+    _write_summary(root, "Enterprise_C_10M", ["IsolationForest"])
+
+    compare_enterprises(root, enterprises=["Enterprise_C_10M"])
+    output = os.path.join(root, "Enterprise_Comparison")
+    assert sorted(os.listdir(output)) == ["F1 Score_comparison.png", "Precision_comparison.png",
+                                          "Recall_comparison.png"]
+
+    # enterprises with different agents: missing bars count as 0 instead of failing
+    compare_enterprises(root)
+    assert len(os.listdir(output)) == 3
+
+    compare_enterprises(str(tmp_path / "empty"))
+    assert not os.path.exists(tmp_path / "empty" / "Enterprise_Comparison")
+
+
+def test_figures_render_in_memory_and_concurrently(tmp_path, enterprise_a):
+    y_true = np.asarray(encode_labels(enterprise_a["is_anomaly"]))
+    rng = np.random.default_rng(0)
+    figures = [(y_true, (rng.random(len(y_true)) < p).astype(int), f"Agent {i}") for i, p in enumerate([0.05, 0.1, 0.2])]
+
+    buffers = render_confusion_matrices(figures, max_workers=3)
+    sequential = [plot_confusion_matrix_graph(*f) for f in figures]
+    assert all(isinstance(b, io.BytesIO) for b in buffers)
+    assert [b.getvalue() for b in buffers] == [b.getvalue() for b in sequential]
+    assert all(b.getvalue().startswith(b"\x89PNG") for b in buffers)
+    assert render_confusion_matrices([]) == []
+
+    path = plot_confusion_matrix_graph(*figures[0], path=str(tmp_path / "cm.png"))
+    assert open(path, "rb").read() == sequential[0].getvalue()
+
+    metrics = {"Recall": 0.5, "Precision": 0.25, "F1_score": 1 / 3}
+    agents_info = [{"name": f"Agent {i}", "metrics": metrics, "graph": buffers[i]} for i in range(2)]
+    pdf = str(tmp_path / "report.pdf")
+    generate_pdf_report(pdf, agents_info, {"metrics": metrics, "graph": buffers[2]}, weights=[0.5, 0.5])
+    content = open(pdf, "rb").read()
+    assert content.startswith(b"%PDF-") and content.count(b"/Subtype /Image") == 3
@@ -0,0 +1,49 @@
+# tests/test_results_writer.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.results_writer import ResultsWriter, read_results, results_path, top_features_column
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet", "arrow"])
+def test_batches_round_trip(tmp_path, enterprise_a, fmt):
+    path = results_path(str(tmp_path / "Enterprise_A_anomaly_results"), fmt)
+    results = enterprise_a.assign(anomaly_score=np.arange(len(enterprise_a)) / 1024)
+
+    with ResultsWriter(path, fmt=fmt) as writer:
+        for start in range(0, len(results), 300):
+            writer.write_batch(results.iloc[start:start + 300])
+        writer.write_batch(results.iloc[:0])
+    assert writer.rows_written == len(results)
+
+    loaded = read_results(path)
+    assert list(loaded.columns) == list(results.columns)
+    for col in results.columns:
+        np.testing.assert_array_equal(loaded[col].astype(results[col].dtype).to_numpy(), results[col].to_numpy())
+
+    subset = read_results(path, columns=["user_id", "anomaly_score"])
+    assert list(subset.columns) == ["user_id", "anomaly_score"]
+
+
+def test_writer_replaces_existing_file(tmp_path, enterprise_a):
+    path = results_path(str(tmp_path / "results"), "csv")
+    for _ in range(2):
+        with ResultsWriter(path, fmt="csv") as writer:
+            writer.write_batch(enterprise_a.iloc[:10])
+    assert len(read_results(path)) == 10
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        results_path("results", "xlsx")
+
+
+def test_top_features_column_masks_rows():
+    indices = np.array([[0, 2], [1, 0], [2, 1]])
+    shares = np.array([[0.6, 0.4], [1.0, 0.0], [0.5, 0.5]])
+    names = ["hour", "tfidf:sudo", "command_length"]
+
+    column = top_features_column(indices, shares, names, mask=np.array([True, True, False]))
+    assert column.tolist() == ["hour=0.60; command_length=0.40", "tfidf:sudo=1.00", ""]
+    assert top_features_column(indices, shares, names)[2] == "command_length=0.50; tfidf:sudo=0.50"
@@ -0,0 +1,57 @@
+# tests/test_score_store.py
+import numpy as np
+import pytest
+
+from agents.isolation_forest_agent import IsolationForestAgent
+from agents.svm_agent import SVMAgent
+from utils.score_store import ScoreStore
+
+
+class CountingAgent:
+    """ Wraps an agent and counts its score() calls. """
+
+    supports_attribution = False
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.calls = 0
+
+    def get_name(self):
+        return self.agent.get_name()
+
+    def score(self, X):
+        self.calls += 1
+        return self.agent.score(X)
+
+
+@pytest.fixture(scope="module")
+def agents(features_a):
+    X, y = features_a
+    if_agent, svm_agent = IsolationForestAgent(), SVMAgent()
+    if_agent.fit(X[:700])
+    svm_agent.fit(X[:700][y[:700] == 0])
+    return [CountingAgent(if_agent), CountingAgent(svm_agent)]
+
+
+def test_each_agent_scores_a_split_once(features_a, agents):
+    X, _ = features_a
+    store = ScoreStore({"val": {agent.get_name(): X[700:850] for agent in agents}})
+    for agent in agents:
+        agent.calls = 0
+
+    first = store.matrix(agents, "val")
+    second = store.matrix(agents, "val")
+    store.get(agents[0], "val")
+    np.testing.assert_array_equal(first, second)
+    assert [agent.calls for agent in agents] == [1, 1]
+    assert all(count == 1 for count in store.inference_counts.values())
+
+    # refitting an agent invalidates only its scores
+    store.invalidate(agents[0])
+    store.matrix(agents, "val")
+    assert [agent.calls for agent in agents] == [2, 1]
+
+
+def test_unknown_split(agents):
+    with pytest.raises(KeyError):
+        ScoreStore().get(agents[0], "test")
@@ -0,0 +1,49 @@
+# tests/test_streaming.py
+import numpy as np
+import pytest
+
+from agents.isolation_forest_agent import IsolationForestAgent
+from agents.svm_agent import SVMAgent
+from agents.knn_agent import KNNAgent
+from agents.meta_agent import MetaAgent
+
+
+@pytest.fixture(scope="module")
+def fitted(features_a):
+    X, y = features_a
+    benign = X[y == 0][:600]
+    if_agent, svm_agent = IsolationForestAgent(), SVMAgent()
+    if_agent.fit(X[:600])
+    svm_agent.fit(benign)
+    return X, [if_agent, svm_agent]
+
+
+def test_score_stream_matches_score(fitted):
+    X, agents = fitted
+    for agent in agents:
+        expected = agent.score(X)
+        np.testing.assert_allclose(np.concatenate(list(agent.score_stream(X, batch_size=128))), expected)
+        # an iterable of single rows is buffered into batches
+        np.testing.assert_allclose(np.concatenate(list(agent.score_stream(iter(X), batch_size=100))), expected)
+
+
+def test_meta_agent_score_stream_matches_score(fitted):
+    X, agents = fitted
+    meta_agent = MetaAgent(agents)
+    X_dict = {agent.get_name(): X for agent in agents}
+    streamed = np.concatenate(list(meta_agent.score_stream(X_dict, batch_size=256)))
+    np.testing.assert_allclose(streamed, meta_agent.score(X_dict))
+
+
+def test_capability_flags_and_partial_fit(features_a):
+    X, y = features_a
+    assert KNNAgent.supports_incremental and not SVMAgent.supports_incremental
+    with pytest.raises(NotImplementedError):
+        SVMAgent().partial_fit(X[:10])
+
+    # incremental training ends with the same index size as one fit on all the blocks
+    agent = KNNAgent()
+    benign = X[y == 0][:600]
+    for start in range(0, len(benign), 200):
+        agent.partial_fit(benign[start:start + 200])
+    assert agent.model.ntotal == len(benign)
@@ -0,0 +1,59 @@
+# tests/test_text_cache.py
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from utils.preprocessing import FeaturePipeline, clean_text_column
+from utils.text_cache import TextVectorCache
+
+
+@pytest.fixture(scope="module")
+def vectorizer_a(enterprise_a):
+    return TfidfVectorizer(max_features=512).fit(clean_text_column(enterprise_a.copy(), "command_text")["command_text"])
+
+
+def _reference(vectorizer, texts):
+    cleaned = clean_text_column(pd.DataFrame({"text": pd.Series(texts).fillna("")}), "text")["text"]
+    return vectorizer.transform(cleaned).toarray()
+
+
+def test_cached_rows_equal_the_vectorizer(vectorizer_a, enterprise_a):
+    cache = TextVectorCache(vectorizer_a, clean_text_column)
+    texts = enterprise_a["command_text"].tolist()
+    replay = texts[:300] + texts[:300] + [None, "", "Get-Process 12"]
+
+    first = cache.transform(texts[:300])
+    second = cache.transform(replay)
+    np.testing.assert_array_equal(first.toarray(), _reference(vectorizer_a, texts[:300]))
+    np.testing.assert_array_equal(second.toarray(), _reference(vectorizer_a, replay))
+
+    assert cache.misses == len(set(texts[:300])) + 2
+    assert cache.hits == len(replay) - 2 + 300 - len(set(texts[:300]))
+
+
+def test_eviction_stays_within_budget(vectorizer_a, enterprise_a):
+    texts = enterprise_a["command_text"].tolist()
+    cache = TextVectorCache(vectorizer_a, clean_text_column, max_bytes=50_000)
+
+    for start in range(0, len(texts), 100):
+        X = cache.transform(texts[start:start + 100])
+        np.testing.assert_array_equal(X.toarray(), _reference(vectorizer_a, texts[start:start + 100]))
+        assert cache.bytes <= cache.max_bytes
+
+    # every miss was inserted once; an evicted string that comes back is a miss again
+    assert cache.evictions > 0 and len(cache) + cache.evictions == cache.misses >= len(set(texts))
+    # least recently used first: the newest strings are still cached
+    assert texts[-1] in cache._entries and texts[0] not in cache._entries
+
+
+def test_pipeline_with_cache_equals_without(enterprise_a):
+    pipeline = FeaturePipeline(label_col="is_anomaly", timestamp_col="timestamp")
+    pipeline.fit(enterprise_a.iloc[:700])
+    new = enterprise_a.iloc[700:]
+
+    expected = pipeline.transform(new)
+    pipeline.enable_text_cache(2 ** 20)
+    np.testing.assert_array_equal(pipeline.transform(new), expected)
+    np.testing.assert_array_equal(pipeline.transform(new), expected)
+    assert pipeline.text_cache_.hits >= len(new)
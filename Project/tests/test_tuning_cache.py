@@ -0,0 +1,53 @@
+# tests/test_tuning_cache.py
+import numpy as np
+from scipy import sparse
+
+from utils.tuning_cache import TuningCache, cached_find_best_n_estimators_if, fingerprint
+
+
+def test_fingerprint_follows_data_and_config(features_a):
+    X, y = features_a
+    key = fingerprint([X, y], {"step": 10})
+
+    assert key == fingerprint([X.copy(), y.copy()], {"step": 10})
+    assert key != fingerprint([X, y], {"step": 20})
+    assert key != fingerprint([X.astype(np.float32), y], {"step": 10})
+
+    changed = X.copy()
+    changed[500, 3] += 1e-9
+    assert key != fingerprint([changed, y], {"step": 10})
+
+    # sparse matrices hash their CSR parts, whatever the input format
+    S = sparse.random(50, 20, density=0.1, random_state=0)
+    assert fingerprint([S.tocoo()], {}) == fingerprint([S.tocsr()], {})
+
+
+def test_cached_search_hits_on_rerun(tmp_path, features_a):
+    X, y = features_a
+    cache = TuningCache(str(tmp_path / "cache"))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"params": {"n_estimators": 70}, "table": [[70, 0.5]]}
+
+    first = cache.cached("search", [X, y], {"step": 10}, compute)
+    second = cache.cached("search", [X, y], {"step": 10}, compute)
+    assert first == second and len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.cached("search", [X, y], {"step": 20}, compute)
+    assert len(calls) == 2
+    assert cache.clear() == 2
+
+
+def test_cached_if_search_equals_uncached(tmp_path, features_a):
+    from utils.best_hyperparams import find_best_n_estimators_if
+
+    X, y = features_a
+    cache = TuningCache(str(tmp_path / "cache"))
+    expected = find_best_n_estimators_if(X, y, 50, 80, 10)
+
+    assert cached_find_best_n_estimators_if(X, y, 50, 80, 10, cache=cache) == expected
+    assert cached_find_best_n_estimators_if(X, y, 50, 80, 10, cache=TuningCache(cache.directory)) == expected
+    assert len(list((tmp_path / "cache").iterdir())) == 1
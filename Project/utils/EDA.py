@@ -1,69 +1,112 @@
 # EDA.py
 
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from utils.data_loader import read_dataset_chunks
+
 
 # -----------------------------
 # Config
 # -----------------------------
+# Run from the Project folder: python -m utils.EDA [A B C] [--workers N]
 DATASET_LETTERS = ["A", "B", "C"]
-BASE_DATA_DIR = "../data"
-BASE_OUTPUT_DIR = "../Results/EDA"
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_DATA_DIR = os.path.join(PROJECT_DIR, "data")
+BASE_OUTPUT_DIR = os.path.join(PROJECT_DIR, "Results", "EDA")
+
+EDA_COLUMNS = ["timestamp", "command_length", "num_arguments", "is_anomaly"]
 
 sns.set(style="whitegrid")
 plt.rcParams["figure.figsize"] = (10, 6)
 
 
 # -----------------------------
-# Load Data
+# Aggregate (single pass)
 # -----------------------------
-def load_data(path):
-    df = pd.read_csv(path)
-
-    # ניקוי whitespace בעמודת timestamp
-    df["timestamp"] = df["timestamp"].astype(str).str.strip()
-
-    # המרת timestamp – מאפשר dayfirst=True כדי לזהות dd/mm/yyyy
-    df["timestamp"] = pd.to_datetime(
-        df["timestamp"],
-        dayfirst=True,   # חשוב: dd/mm/yyyy
-        errors="coerce"  # ערכים לא תקינים יהפכו ל-NaT
-    )
-
-    # בדיקה: אם יש ערכי NaT, כדאי לדווח
-    if df["timestamp"].isna().any():
-        print(f"Warning: {df['timestamp'].isna().sum()} invalid timestamps found in {path}")
-
-    # הוספת עמודת hour
-    df["hour"] = df["timestamp"].dt.hour
-
-    # במקרה שיש NaN ב-hour (מ timestamp לא חוקי), אפשר למלא ב- -1 או להשמיט
-    df = df.dropna(subset=["hour"])
-
-    # הפיכת hour ל-categorical מסודר מ-0 עד 23 (לגרפים)
-    df["hour"] = pd.Categorical(df["hour"], categories=range(24), ordered=True)
-
-    return df
+def _add_counts(total, counts):
+    return counts if total is None else total.add(counts, fill_value=0)
+
+
+def aggregate_data(path, chunksize=1_000_000):
+    """
+    One scan over the CSV that builds every table the plots need:
+    class counts, and per-class counts of command_length, num_arguments and hour.
+    Memory is bounded by the chunk size plus the (small) aggregate tables.
+    """
+    class_counts = lengths = arguments = hours = None
+    invalid_timestamps = 0
+
+    for chunk in read_dataset_chunks(path, chunksize=chunksize, usecols=EDA_COLUMNS):
+        timestamps = pd.to_datetime(chunk["timestamp"].astype(str).str.strip(), dayfirst=True, errors="coerce")
+        valid = timestamps.notna().to_numpy()
+        invalid_timestamps += int((~valid).sum())
+
+        # rows with an invalid timestamp are dropped
+        chunk = chunk[valid]
+        label = chunk["is_anomaly"].astype(str)
+        hour = timestamps[valid].dt.hour
+
+        class_counts = _add_counts(class_counts, label.value_counts())
+        lengths = _add_counts(lengths, pd.crosstab(chunk["command_length"], label))
+        arguments = _add_counts(arguments, pd.crosstab(chunk["num_arguments"], label))
+        hours = _add_counts(hours, pd.crosstab(hour, label))
+
+    if invalid_timestamps:
+        print(f"Warning: {invalid_timestamps} invalid timestamps found in {path}")
+
+    classes = sorted(class_counts.index)
+    return {
+        "class_counts": class_counts.reindex(classes).astype(int),
+        "command_length": lengths.reindex(columns=classes, fill_value=0).sort_index().astype(int),
+        "num_arguments": arguments.reindex(columns=classes, fill_value=0).sort_index().astype(int),
+        "hour": hours.reindex(index=range(24), columns=classes, fill_value=0).fillna(0).astype(int),
+    }
 
 
 # -----------------------------
 # Basic Info
 # -----------------------------
-def basic_info(df):
+def basic_info(agg):
     print("\n===== CLASS DISTRIBUTION =====")
-    print(df["is_anomaly"].value_counts(normalize=True) * 100)
+    print(agg["class_counts"] / agg["class_counts"].sum() * 100)
 
 
 # -----------------------------
-# Plots
+# Plots (from aggregate tables)
 # -----------------------------
-def plot_anomaly_distribution(df, output_dir):
-    ax = sns.countplot(data=df, x="is_anomaly")
-
-    total = len(df)
+def _weighted_kde(values, weights, grid):
+    """
+    Gaussian KDE of a weighted sample (Scott's rule), evaluated on grid.
+    The sample is the distinct values with their counts, so this is cheap
+    no matter how many raw rows were aggregated.
+    """
+    n = weights.sum()
+    mean = np.average(values, weights=weights)
+    std = np.sqrt(np.average((values - mean) ** 2, weights=weights))
+    if n == 0 or std == 0:
+        return np.zeros_like(grid)
+
+    bandwidth = std * n ** (-1 / 5)
+    z = (grid[:, None] - values[None, :]) / bandwidth
+    return (np.exp(-0.5 * z ** 2) @ weights) / (n * bandwidth * np.sqrt(2 * np.pi))
+
+
+def plot_anomaly_distribution(agg, output_dir):
+    counts = agg["class_counts"]
+    fig, ax = plt.subplots()
+    colors = sns.color_palette(n_colors=len(counts))
+    ax.bar(counts.index.astype(str), counts.values, color=colors)
+
+    total = counts.sum()
 
     for p in ax.patches:
         height = p.get_height()
@@ -75,82 +118,122 @@ def plot_anomaly_distribution(df, output_dir):
                     fontsize=11,
                     fontweight='bold')
 
-    plt.title("Anomaly Distribution")
-    plt.xlabel("Class")
-    plt.ylabel("Count")
+    ax.set_title("Anomaly Distribution")
+    ax.set_xlabel("Class")
+    ax.set_ylabel("Count")
+
+    fig.savefig(f"{output_dir}/anomaly_distribution.png")
+    plt.close(fig)
 
-    plt.savefig(f"{output_dir}/anomaly_distribution.png")
-    plt.close()
 
+def plot_command_length(agg, output_dir, bins=50):
+    table = agg["command_length"]
+    values = table.index.to_numpy(dtype=float)
+    edges = np.histogram_bin_edges(values, bins=bins, range=(values.min(), values.max()))
+    bin_width = edges[1] - edges[0]
+    grid = np.linspace(values.min(), values.max(), 200)
 
-def plot_command_length(df, output_dir):
-    sns.histplot(data=df, x="command_length", hue="is_anomaly",
-                 bins=50, kde=True)
+    fig, ax = plt.subplots()
+    for label, color in zip(table.columns, sns.color_palette(n_colors=len(table.columns))):
+        weights = table[label].to_numpy(dtype=float)
+        hist, _ = np.histogram(values, bins=edges, weights=weights)
+        ax.stairs(hist, edges, fill=True, alpha=0.5, color=color, label=label)
 
-    plt.title("Command Length Distribution")
-    plt.savefig(f"{output_dir}/command_length_distribution.png")
-    plt.close()
+        # KDE scaled to counts, like seaborn's histplot(kde=True)
+        ax.plot(grid, _weighted_kde(values, weights, grid) * weights.sum() * bin_width, color=color)
 
+    ax.legend(title="is_anomaly")
+    ax.set_title("Command Length Distribution")
+    ax.set_xlabel("command_length")
+    ax.set_ylabel("Count")
+    fig.savefig(f"{output_dir}/command_length_distribution.png")
+    plt.close(fig)
 
-def plot_num_arguments(df, output_dir):
-    max_val = df["num_arguments"].max()
 
-    ax = sns.histplot(
-        data=df,
-        x="num_arguments",
-        hue="is_anomaly",
-        bins=range(0, max_val + 2),
-        discrete=True
-    )
+def plot_num_arguments(agg, output_dir):
+    table = agg["num_arguments"]
+    max_val = int(table.index.max())
+    table = table.reindex(range(0, max_val + 1), fill_value=0)
+
+    fig, ax = plt.subplots()
+    for label, color in zip(table.columns, sns.color_palette(n_colors=len(table.columns))):
+        ax.bar(table.index, table[label], width=1.0, alpha=0.5, color=color, edgecolor=color, label=label)
 
     ax.set_xticks(range(0, max_val + 1, 1))
+    ax.legend(title="is_anomaly")
+
+    ax.set_title("Number of Arguments Distribution")
+    ax.set_xlabel("Number of Arguments")
+    ax.set_ylabel("Count")
 
-    plt.title("Number of Arguments Distribution")
-    plt.xlabel("Number of Arguments")
-    plt.ylabel("Count")
+    fig.savefig(f"{output_dir}/num_arguments_distribution.png")
+    plt.close(fig)
 
-    plt.savefig(f"{output_dir}/num_arguments_distribution.png")
-    plt.close()
 
+def plot_time_distribution(agg, output_dir):
+    # hours already ordered 0..23 by aggregate_data
+    table = agg["hour"]
+    n_classes = len(table.columns)
+    width = 0.8 / n_classes
 
-def plot_time_distribution(df, output_dir):
-    # ודא סדר שעות מ-0 עד 23
-    df['hour'] = pd.Categorical(df['hour'], categories=range(24), ordered=True)
+    fig, ax = plt.subplots()
+    for i, (label, color) in enumerate(zip(table.columns, sns.color_palette(n_colors=n_classes))):
+        positions = table.index + width * (i - (n_classes - 1) / 2)
+        ax.bar(positions, table[label], width=width, color=color, label=label)
 
-    sns.countplot(data=df, x="hour", hue="is_anomaly")
+    ax.set_xticks(range(24))
+    ax.legend(title="is_anomaly")
 
-    plt.title("Activity Distribution by Hour")
-    plt.xlabel("Hour of Day")
-    plt.ylabel("Count")
+    ax.set_title("Activity Distribution by Hour")
+    ax.set_xlabel("Hour of Day")
+    ax.set_ylabel("Count")
 
-    plt.savefig(f"{output_dir}/time_distribution_by_hour.png")
-    plt.close()
+    fig.savefig(f"{output_dir}/time_distribution_by_hour.png")
+    plt.close(fig)
 
 
 # -----------------------------
 # Run EDA for one dataset
 # -----------------------------
-def run_eda(dataset_letter):
+def run_eda(dataset_letter, chunksize=1_000_000):
     dataset_path = f"{BASE_DATA_DIR}/Enterprise_{dataset_letter}.csv"
     output_dir = f"{BASE_OUTPUT_DIR}/Enterprise_{dataset_letter}_EDA"
     os.makedirs(output_dir, exist_ok=True)
 
-    df = load_data(dataset_path)
+    agg = aggregate_data(dataset_path, chunksize=chunksize)
 
     print(f"\n===== Running EDA for Enterprise_{dataset_letter} =====")
-    basic_info(df)
+    basic_info(agg)
 
-    plot_anomaly_distribution(df, output_dir)
-    plot_command_length(df, output_dir)
-    plot_num_arguments(df, output_dir)
-    plot_time_distribution(df, output_dir)
+    plot_anomaly_distribution(agg, output_dir)
+    plot_command_length(agg, output_dir)
+    plot_num_arguments(agg, output_dir)
+    plot_time_distribution(agg, output_dir)
 
     print(f"EDA completed. Results saved in '{output_dir}' folder.")
+    return dataset_letter
+
+
+def run_all(letters=DATASET_LETTERS, workers=None, chunksize=1_000_000):
+    """
+    Run EDA for several enterprises, one process each.
+    """
+    workers = workers or min(len(letters), os.cpu_count() or 1)
+    if workers == 1:
+        return [run_eda(letter, chunksize) for letter in letters]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_eda, letters, [chunksize] * len(letters)))
 
 
 # -----------------------------
 # Entry Point: Run all datasets
 # -----------------------------
 if __name__ == "__main__":
-    for letter in DATASET_LETTERS:
-        run_eda(letter)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Exploratory data analysis of the enterprise datasets.")
+    parser.add_argument("letters", nargs="*", default=DATASET_LETTERS, help="enterprise letters (default: A B C)")
+    parser.add_argument("--workers", type=int, default=None, help="parallel processes (default: one per dataset)")
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="rows read per chunk")
+    args = parser.parse_args()
+
+    run_all([letter.upper() for letter in args.letters], workers=args.workers, chunksize=args.chunksize)
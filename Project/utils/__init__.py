@@ -6,6 +6,8 @@ from .preprocessing import preprocess_for_metaagent
 # You can also import evaluation utils if you want them accessible directly
 from .evaluation_utils import evaluate_agent, evaluate_ensemble
 
-from .report_generator import plot_confusion_matrix_graph, generate_pdf_report
+from .score_store import ScoreStore
+
+from .report_generator import plot_confusion_matrix_graph, render_confusion_matrices, generate_pdf_report
 
 from .best_hyperparams import find_best_weights_and_threshold_for_meta_agent, select_dataset
\ No newline at end of file
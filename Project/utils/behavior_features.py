@@ -0,0 +1,238 @@
+# utils/behavior_features.py
+"""
+Per-user / per-host behavioral context features, updated incrementally.
+
+preprocess_for_metaagent() looks at each command on its own; these features add
+what the same user / host has been doing recently:
+
+- cmd_rate:          commands per hour, exponentially decayed (half-life half_life_hours)
+- distinct_procs:    distinct process names in the last window_hours
+- offhour_ratio:     decayed share of commands outside office hours / on the weekend
+- novel_pair:        1 if the (parent_process, process_name) pair was not seen for this entity
+                     within novelty_days
+- novel_pair_ratio:  decayed share of novel pairs
+
+Every event costs O(1) amortized per entity: decayed counters are rescaled by
+exp(-dt / tau) on update, and the windowed sets are insertion-ordered dicts whose
+expired entries are popped from the front (each entry is evicted at most once).
+The state persists between calls, so the same object featurizes a training
+file (batch, sorted by time) and then keeps going on a live stream.
+
+Online, a batch can be staged: stage() computes its features and records the
+previous state of every entity it touches, commit() keeps the update and
+rollback() restores it, so a batch that fails to score is not counted twice
+when it is retried.
+"""
+import math
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+ENTITY_FEATURES = ["cmd_rate", "distinct_procs", "offhour_ratio", "novel_pair", "novel_pair_ratio"]
+
+
+def behavior_feature_names(entities=("user", "host")):
+    return [f"{entity}_{feature}" for entity in entities for feature in ENTITY_FEATURES]
+
+
+BEHAVIOR_FEATURES = behavior_feature_names()
+
+
+class _EntityState:
+    __slots__ = ("last_t", "count", "offhour", "novel", "procs", "pairs")
+
+    def __init__(self, t):
+        self.last_t = t
+        self.count = 0.0
+        self.offhour = 0.0
+        self.novel = 0.0
+        self.procs = OrderedDict()   # process_name -> last seen
+        self.pairs = OrderedDict()   # (parent, process) -> last seen
+
+    def copy(self):
+        other = _EntityState(self.last_t)
+        other.count, other.offhour, other.novel = self.count, self.offhour, self.novel
+        other.procs, other.pairs = self.procs.copy(), self.pairs.copy()
+        return other
+
+
+def _touch(window, key, t, horizon):
+    """ Mark key as seen at t and drop entries last seen before horizon. """
+    window[key] = t
+    window.move_to_end(key)
+    # key itself is inside the window, so the loop ends before the dict is empty
+    while True:
+        oldest = next(iter(window))
+        if window[oldest] >= horizon:
+            return
+        del window[oldest]
+
+
+class BehaviorFeatures:
+    """
+    Stateful rolling-window aggregates per user and per host.
+
+    :param half_life_hours: half-life of the decayed rates / ratios
+    :param window_hours: window of the distinct-process count
+    :param novelty_days: a parent/child pair counts as novel if unseen for this long
+    :param office_hours: (start, end) hours of normal activity; other hours are off-hours
+    :param weekend_days: pandas dayofweek values (Monday=0) of the weekend, Friday/Saturday as in process_timestamp
+    """
+
+    # class-level default: objects pickled before staging existed load without a pending stage
+    _undo = None
+
+    def __init__(self, timestamp_col="timestamp", user_col="user_id", host_col="host_id",
+                 process_col="process_name", parent_col="parent_process",
+                 half_life_hours=24.0, window_hours=24.0, novelty_days=30.0,
+                 office_hours=(8, 18), weekend_days=(4, 5)):
+        self.timestamp_col = timestamp_col
+        self.entity_cols = {"user": user_col, "host": host_col}
+        self.process_col = process_col
+        self.parent_col = parent_col
+        self.half_life_hours = half_life_hours
+        self.window_hours = window_hours
+        self.novelty_days = novelty_days
+        self.office_hours = office_hours
+        self.weekend_days = weekend_days
+
+        self.state = {entity: {} for entity in self.entity_cols}
+        self.last_t = None
+        self.events = 0
+
+    @property
+    def feature_names(self):
+        return behavior_feature_names(self.entity_cols)
+
+    def reset(self):
+        self.state = {entity: {} for entity in self.entity_cols}
+        self.last_t = None
+        self.events = 0
+        self._undo = None
+        return self
+
+    # -----------------------------
+    # Staged updates
+    # -----------------------------
+    def stage(self, df):
+        """
+        transform() that can be undone: until commit(), rollback() restores the state from before
+        the first staged batch (several staged batches are committed / rolled back together).
+        """
+        if self._undo is None:
+            self._undo = {"last_t": self.last_t, "events": self.events, "entities": {}}
+        return self.update(df, sort=False)
+
+    def commit(self):
+        self._undo = None
+
+    def rollback(self):
+        if self._undo is None:
+            return
+        for (entity, key), previous in self._undo["entities"].items():
+            if previous is None:
+                del self.state[entity][key]
+            else:
+                self.state[entity][key] = previous
+        self.last_t, self.events = self._undo["last_t"], self._undo["events"]
+        self._undo = None
+
+    # -----------------------------
+    # Per-event update
+    # -----------------------------
+    def _update(self, states, key, t, offhour, process, pair, tau, window, novelty):
+        s = states.get(key)
+        if s is None:
+            s = states[key] = _EntityState(t)
+
+        decay = math.exp(-max(t - s.last_t, 0.0) / tau)
+        s.last_t = max(s.last_t, t)
+
+        novel = pair not in s.pairs
+        s.count = s.count * decay + 1.0
+        s.offhour = s.offhour * decay + offhour
+        s.novel = s.novel * decay + novel
+
+        _touch(s.procs, process, t, t - window)
+        _touch(s.pairs, pair, t, t - novelty)
+
+        return (
+            s.count * 3600.0 / tau,  # ~ commands per hour over the last tau seconds
+            len(s.procs),
+            s.offhour / s.count,
+            float(novel),
+            s.novel / s.count,
+        )
+
+    # -----------------------------
+    # Batch / streaming entry point
+    # -----------------------------
+    def _event_columns(self, df):
+        timestamps = pd.to_datetime(df[self.timestamp_col], dayfirst=True, errors="coerce")
+        seconds = (timestamps - pd.Timestamp("1970-01-01")).dt.total_seconds().to_numpy()
+
+        hours = timestamps.dt.hour.to_numpy()
+        start, end = self.office_hours
+        offhour = ((hours < start) | (hours >= end) | timestamps.dt.dayofweek.isin(self.weekend_days).to_numpy())
+
+        def values(col):
+            # plain Python strings: cheap hashing as dict keys
+            return df[col].astype(object).where(df[col].notna(), "Unknown").astype(str).tolist()
+
+        return seconds, offhour.astype(float).tolist(), values(self.process_col), values(self.parent_col), \
+            {entity: values(col) for entity, col in self.entity_cols.items()}
+
+    def update(self, df, sort=True):
+        """
+        Feed a batch of events and return their features (aligned with df.index).
+        :param sort: process the events in timestamp order (batch files); with sort=False they are
+                     processed in arrival order (streams). Missing timestamps reuse the latest time seen.
+        """
+        n = len(df)
+        if n == 0:
+            return pd.DataFrame(np.zeros((0, len(self.feature_names))), index=df.index, columns=self.feature_names)
+
+        seconds, offhour, processes, parents, entity_values = self._event_columns(df)
+        order = np.argsort(seconds, kind="stable") if sort else np.arange(n)
+        seconds = seconds.tolist()  # Python floats: much cheaper than numpy scalars in the loop below
+
+        tau = self.half_life_hours * 3600.0 / math.log(2)
+        window = self.window_hours * 3600.0
+        novelty = self.novelty_days * 86400.0
+        entities = [(self.state[entity], keys) for entity, keys in entity_values.items()]
+        update = self._update
+
+        if self._undo is not None:
+            # keep the pre-stage copy of every entity this batch touches (first touch only)
+            saved = self._undo["entities"]
+            for entity, keys in entity_values.items():
+                states = self.state[entity]
+                for key in set(keys):
+                    if (entity, key) not in saved:
+                        previous = states.get(key)
+                        saved[(entity, key)] = previous.copy() if previous is not None else None
+
+        rows = [None] * n
+        for i in order.tolist():
+            t = seconds[i]
+            if math.isnan(t):
+                t = self.last_t if self.last_t is not None else 0.0
+            self.last_t = t if self.last_t is None else max(self.last_t, t)
+
+            pair = (parents[i], processes[i])
+            row = ()
+            for states, keys in entities:
+                row += update(states, keys[i], t, offhour[i], processes[i], pair, tau, window, novelty)
+            rows[i] = row
+
+        self.events += n
+        return pd.DataFrame(rows, index=df.index, columns=self.feature_names, dtype=float)
+
+    def fit_transform(self, df):
+        """ Featurize a training batch from a fresh state (events sorted by time). """
+        return self.reset().update(df, sort=True)
+
+    def transform(self, df):
+        """ Featurize newly arrived events, continuing from the current state. """
+        return self.update(df, sort=False)
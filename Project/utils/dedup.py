@@ -0,0 +1,179 @@
+# utils/dedup.py
+"""
+Score each distinct feature row once.
+
+Command telemetry repeats itself (the same command, process and user over and
+over). Rows are hashed to 64 bits (pandas' vectorized row hash + factorize, O(n)),
+only the first occurrence of every distinct row is scored, and its score is
+broadcast back to all its duplicates.
+
+Rows are grouped by hash, then every row is compared with the representative of
+its group on the final feature matrix; rows that differ (a 64-bit hash collision)
+are split off into groups of their own. So a row only ever shares the score of an
+identical row, the one it would have received on its own. When less than
+min_saving of the rows repeat, the gather / scatter is skipped and the full
+matrix is scored as usual (the hashing is the only overhead, ~1 µs per row).
+"""
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from agents.base_agent import iter_blocks, to_dense
+
+# mixes the hashes of several matrices into one key per row
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _dense_blocks(X, block_size):
+    if hasattr(X, "iloc"):
+        X = X.to_numpy()
+    if sparse.issparse(X):
+        X = X.tocsr()
+    for start in range(0, X.shape[0], block_size):
+        yield start, np.asarray(to_dense(X[start:start + block_size]))
+
+
+def rows_equal(X, reference, block_size=65_536):
+    """
+    :param reference: one row index per row of X
+    :return: boolean mask of the rows identical to X[reference] (NaN equals NaN)
+    """
+    if hasattr(X, "iloc"):
+        X = X.to_numpy()
+    equal = np.empty(X.shape[0], dtype=bool)
+    for start, block in _dense_blocks(X, block_size):
+        other = np.asarray(to_dense(X[reference[start:start + len(block)]]))
+        same = block == other
+        if block.dtype.kind == "f":
+            same |= np.isnan(block) & np.isnan(other)
+        equal[start:start + len(block)] = same.reshape(len(block), -1).all(axis=1)
+    return equal
+
+
+def row_hashes(X, block_size=65_536):
+    """
+    64-bit hash of every row of a dense (ndarray / DataFrame) or sparse matrix.
+    """
+    if hasattr(X, "iloc"):
+        X = X.to_numpy()
+    if not sparse.issparse(X):
+        return pd.util.hash_pandas_object(pd.DataFrame(X), index=False).to_numpy()
+    # sparse rows are hashed block by block on their dense form
+    return np.concatenate([row_hashes(to_dense(block)) for block in iter_blocks(X.tocsr(), block_size)])
+
+
+class RowDedup:
+    """
+    Distinct rows of one or more aligned matrices.
+
+    :param matrices: matrices with the same number of rows (e.g. the distinct entries of an X_dict);
+                     rows are duplicates only if they repeat in every matrix
+    """
+
+    def __init__(self, *matrices):
+        key = None
+        for X in matrices:
+            h = row_hashes(X)
+            key = h if key is None else key * _HASH_MULTIPLIER + h
+
+        codes, uniques = pd.factorize(key)
+        self.inverse = codes
+        self.n_rows = len(codes)
+        self.n_unique = len(uniques)
+
+        # codes are numbered in order of first appearance: assigning in reverse keeps the first index
+        self.first = np.empty(self.n_unique, dtype=np.int64)
+        self.first[codes[::-1]] = np.arange(self.n_rows - 1, -1, -1)
+
+        # hashes only group rows: any row that differs from its group's first row is a collision
+        differs = np.zeros(self.n_rows, dtype=bool)
+        for X in matrices:
+            differs |= ~rows_equal(X, self.first[codes])
+        self.collisions = int(differs.sum())
+        if self.collisions:
+            self._split_collisions(matrices, np.flatnonzero(differs))
+
+    def _split_collisions(self, matrices, rows):
+        """ Give the colliding rows groups of their own, keyed by their exact contents. """
+        if hasattr(matrices[0], "iloc"):
+            matrices = [X.to_numpy() if hasattr(X, "iloc") else X for X in matrices]
+        new_codes = {}
+        first = list(self.first)
+        for i in rows:
+            key = (self.inverse[i],) + tuple(np.asarray(to_dense(X[i:i + 1])).tobytes() for X in matrices)
+            if key not in new_codes:
+                new_codes[key] = len(first)
+                first.append(i)
+            self.inverse[i] = new_codes[key]
+        self.first = np.asarray(first, dtype=np.int64)
+        self.n_unique = len(first)
+
+    @property
+    def unique_ratio(self):
+        return self.n_unique / self.n_rows if self.n_rows else 1.0
+
+    def take(self, X):
+        """ The distinct rows of X (in order of first appearance). """
+        return X.iloc[self.first] if hasattr(X, "iloc") else X[self.first]
+
+    def expand(self, values):
+        """ Broadcast per-distinct-row values (last axis) back to every row. """
+        return np.asarray(values)[..., self.inverse]
+
+
+class DedupScorer:
+    """
+    Dedup layer in front of MetaAgent.score / score_matrix.
+    Keeps running totals so callers can report the unique ratio and time spent.
+
+    :param min_saving: deduplicate only if at least this fraction of the rows are repeats
+    """
+
+    def __init__(self, meta_agent, min_saving=0.05):
+        self.meta_agent = meta_agent
+        self.min_saving = min_saving
+        self.rows = 0
+        self.unique_rows = 0
+        self.hash_seconds = 0.0
+
+    @property
+    def unique_ratio(self):
+        return self.unique_rows / self.rows if self.rows else 1.0
+
+    def score_matrix(self, X_dict):
+        """
+        :return: (num_agents, num_samples) scores, each distinct row scored once
+        """
+        start = time.perf_counter()
+        # X_dict entries usually share one matrix: hash each distinct object once
+        matrices = list({id(X): X for X in X_dict.values()}.values())
+        dedup = RowDedup(*matrices)
+        self.hash_seconds += time.perf_counter() - start
+        self.rows += dedup.n_rows
+        self.unique_rows += dedup.n_unique
+
+        if dedup.n_unique > (1 - self.min_saving) * dedup.n_rows:
+            return self.meta_agent.score_matrix(X_dict)
+
+        unique_inputs = {id(X): dedup.take(X) for X in matrices}
+        unique_dict = {name: unique_inputs[id(X)] for name, X in X_dict.items()}
+        return dedup.expand(self.meta_agent.score_matrix(unique_dict))
+
+    def score(self, X_dict):
+        """ Ensemble scores, each distinct row scored once (same contract as MetaAgent.score). """
+        meta_agent = self.meta_agent
+        all_scores = self.score_matrix(X_dict)
+        final_scores = meta_agent.combine_scores(all_scores)
+        if meta_agent.online_calibration and meta_agent.threshold_ is not None:
+            meta_agent.update_calibration(all_scores, final_scores)
+        return final_scores
+
+    def stats(self):
+        return {
+            "rows": self.rows,
+            "unique_rows": self.unique_rows,
+            "unique_ratio": round(self.unique_ratio, 4),
+            "hash_seconds": round(self.hash_seconds, 4),
+        }
@@ -0,0 +1,452 @@
+# utils/drift_monitor.py
+"""
+Score / feature drift monitoring with background retraining and hot model swap.
+
+- RollingHistogram: fixed-memory sketch of the last `window` values (a ring of
+  count buckets over bin edges taken from the reference distribution)
+- DriftMonitor: PSI and (binned) KS of the live ensemble scores and numeric
+  features against a reference sample (held-out rows saved in the model bundle)
+- AdaptiveScorer: drop-in OnlineScorer replacement for serve.py / follow.py.
+  It feeds the monitor, and when drift passes the set level it refits the
+  bundle on recent records in a background process. The new model is swapped
+  in with a single reference assignment; scoring never waits for training.
+
+Retrained models have no labels to tune on, so their threshold is the
+(1 - contamination) quantile of their held-out scores instead of the
+F1-optimal validation threshold of find_best_threshold().
+"""
+import copy
+import datetime
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .model_io import ModelBundle, write_bundle
+from .preprocessing import FeaturePipeline, agent_inputs
+
+EPS = 1e-4
+
+
+# -----------------------------
+# Sketches and statistics
+# -----------------------------
+def quantile_edges(reference, bins=20):
+    """ Interior bin edges at the reference quantiles (duplicates merged for discrete features). """
+    reference = np.asarray(reference, dtype=float)
+    reference = reference[np.isfinite(reference)]
+    if reference.size == 0:
+        return np.array([])
+    return np.unique(np.quantile(reference, np.linspace(0, 1, bins + 1)[1:-1]))
+
+
+def histogram(values, edges):
+    values = np.asarray(values, dtype=float)
+    return np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+
+
+def psi(reference_counts, current_counts):
+    """ Population stability index between two histograms over the same bins. """
+    ref = np.maximum(reference_counts / max(reference_counts.sum(), 1), EPS)
+    cur = np.maximum(current_counts / max(current_counts.sum(), 1), EPS)
+    return float(np.sum((cur - ref) * np.log(cur / ref)))
+
+
+def ks(reference_counts, current_counts):
+    """ Kolmogorov-Smirnov distance between the binned CDFs. """
+    ref = np.cumsum(reference_counts) / max(reference_counts.sum(), 1)
+    cur = np.cumsum(current_counts) / max(current_counts.sum(), 1)
+    return float(np.max(np.abs(cur - ref)))
+
+
+class RollingHistogram:
+    """
+    Counts of the last ~window values: n_buckets sub-histograms in a ring,
+    the oldest one dropped when a new one starts. Memory is O(n_buckets * bins).
+    """
+
+    def __init__(self, edges, window=5000, n_buckets=10):
+        self.edges = edges
+        self.bucket_size = max(1, window // n_buckets)
+        self.buckets = deque(maxlen=n_buckets)
+        self.current = np.zeros(len(edges) + 1, dtype=np.int64)
+        self.current_n = 0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float)
+        start = 0
+        while start < len(values):
+            take = min(self.bucket_size - self.current_n, len(values) - start)
+            self.current += histogram(values[start:start + take], self.edges)
+            self.current_n += take
+            start += take
+            if self.current_n == self.bucket_size:
+                self.buckets.append(self.current)
+                self.current = np.zeros_like(self.current)
+                self.current_n = 0
+
+    def counts(self):
+        return self.current + sum(self.buckets) if self.buckets else self.current.copy()
+
+    @property
+    def n(self):
+        return self.current_n + self.bucket_size * len(self.buckets)
+
+
+def build_reference(scores, features=None, feature_names=None, max_rows=5000, seed=42):
+    """
+    Reference sample stored in a model bundle: ensemble scores (+ numeric feature rows) of held-out data.
+    """
+    scores = np.asarray(scores, dtype=float)
+    idx = np.arange(len(scores))
+    if len(idx) > max_rows:
+        idx = np.sort(np.random.default_rng(seed).choice(len(idx), max_rows, replace=False))
+    return {
+        "scores": scores[idx],
+        "features": np.asarray(features, dtype=float)[idx] if features is not None else None,
+        "feature_names": list(feature_names) if feature_names is not None else None,
+    }
+
+
+class DriftMonitor:
+    """
+    Compares rolling windows of live scores / features with a reference sample.
+
+    :param reference: build_reference() dict; None = use the first `window` live rows as reference
+    :param psi_threshold: drift when the score PSI or any feature PSI reaches this (0.2 is the usual "shifted" level)
+    :param ks_threshold: drift when the score KS distance reaches this
+    :param min_samples: live rows needed before drift is reported
+    """
+
+    def __init__(self, reference=None, bins=20, window=5000, n_buckets=10, psi_threshold=0.2,
+                 ks_threshold=0.2, min_samples=1000):
+        self.bins = bins
+        self.window = window
+        self.n_buckets = n_buckets
+        self.psi_threshold = psi_threshold
+        self.ks_threshold = ks_threshold
+        self.min_samples = min_samples
+
+        self.reference = None
+        self._warmup_scores = []
+        self._warmup_features = []
+        if reference is not None:
+            self._set_reference(reference)
+
+    @classmethod
+    def from_bundle(cls, bundle, **kwargs):
+        return cls(getattr(bundle, "reference", None), **kwargs)
+
+    def _set_reference(self, reference):
+        self.reference = reference
+        scores = np.asarray(reference["scores"], dtype=float)
+        # keep ~10 reference rows per bin so small references do not read as drift
+        bins = max(2, min(self.bins, len(scores) // 10))
+
+        edges = quantile_edges(scores, bins)
+        self.score_sketch = (histogram(scores, edges), RollingHistogram(edges, self.window, self.n_buckets))
+
+        self.feature_sketches = []
+        features = reference.get("features")
+        if features is not None:
+            names = reference.get("feature_names") or [f"feature_{j}" for j in range(features.shape[1])]
+            for j, name in enumerate(names):
+                edges = quantile_edges(features[:, j], bins)
+                self.feature_sketches.append(
+                    (name, histogram(features[:, j], edges), RollingHistogram(edges, self.window, self.n_buckets))
+                )
+
+    def update(self, scores, features=None):
+        """
+        :param scores: ensemble scores of the newly scored rows
+        :param features: matching numeric feature rows (same columns as the reference features)
+        """
+        if self.reference is None:
+            self._warmup_scores.append(np.asarray(scores, dtype=float))
+            if features is not None:
+                self._warmup_features.append(np.asarray(features, dtype=float))
+            if sum(len(s) for s in self._warmup_scores) >= self.window:
+                self._set_reference(build_reference(
+                    np.concatenate(self._warmup_scores),
+                    np.vstack(self._warmup_features) if self._warmup_features else None,
+                    max_rows=self.window
+                ))
+                self._warmup_scores, self._warmup_features = [], []
+            return
+
+        self.score_sketch[1].add(scores)
+        if features is not None:
+            for j, (_, _, sketch) in enumerate(self.feature_sketches):
+                sketch.add(features[:, j])
+
+    def check(self):
+        """
+        :return: dict with score PSI / KS, the most shifted features and whether drift is flagged
+        """
+        if self.reference is None:
+            return {"samples": 0, "drifted": False, "status": "warming up"}
+
+        ref_counts, sketch = self.score_sketch
+        report = {"samples": sketch.n, "score_psi": psi(ref_counts, sketch.counts()),
+                  "score_ks": ks(ref_counts, sketch.counts())}
+
+        feature_psi = {name: psi(ref, live.counts()) for name, ref, live in self.feature_sketches if live.n}
+        report["max_feature_psi"] = max(feature_psi.values()) if feature_psi else 0.0
+        report["top_features"] = dict(sorted(feature_psi.items(), key=lambda kv: kv[1], reverse=True)[:5])
+
+        reasons = []
+        if report["score_psi"] >= self.psi_threshold:
+            reasons.append("score_psi")
+        if report["score_ks"] >= self.ks_threshold:
+            reasons.append("score_ks")
+        if report["max_feature_psi"] >= self.psi_threshold:
+            reasons.append("feature_psi")
+
+        report["drifted"] = sketch.n >= self.min_samples and bool(reasons)
+        report["reasons"] = reasons
+        return report
+
+
+# -----------------------------
+# Retraining
+# -----------------------------
+def numeric_columns(pipeline):
+    """ Number of leading (scaled numeric) columns in the pipeline's feature matrix. """
+    return len(pipeline.feature_cols_)
+
+
+def retrain_bundle(bundle, records, contamination=0.05, holdout=0.2, seed=42):
+    """
+    Refit preprocessing and every agent (same configuration / weights) on recent records.
+    :return: new ModelBundle; threshold = (1 - contamination) quantile of the held-out scores
+    """
+    df = pd.DataFrame.from_records(records)
+    old = bundle.pipeline
+    pipeline = FeaturePipeline(
+        text_col=old.text_col,
+        label_col=old.label_col,
+        timestamp_col=old.timestamp_col,
+        tfidf_max_features=old.tfidf_max_features,
+        corr_threshold=old.corr_threshold,
+        behavior_features=old.behavior_ is not None
+    )
+    X_full, _ = pipeline.fit_transform(df)
+
+    rng = np.random.default_rng(seed)
+    is_holdout = rng.random(len(X_full)) < holdout
+    X_fit, X_hold = X_full[~is_holdout], X_full[is_holdout]
+
+    meta_agent = copy.deepcopy(bundle.meta_agent)
+    for agent in meta_agent.agents:
+        # the TF-IDF vocabulary (and with it the width) may change
+        if hasattr(agent, "input_dim"):
+            agent.input_dim = X_full.shape[1]
+    meta_agent.fit(agent_inputs(X_fit), X_val_dict=agent_inputs(X_hold))
+
+    all_scores = meta_agent.score_matrix(agent_inputs(X_hold))
+    meta_agent.contamination = contamination
+    meta_agent.calibrate(all_scores=all_scores)
+    scores = meta_agent.combine_scores(all_scores)
+    threshold = meta_agent.threshold_
+    n_numeric = numeric_columns(pipeline)
+    reference = build_reference(scores, X_hold[:, :n_numeric], pipeline.feature_cols_, seed=seed)
+
+    metadata = {**bundle.metadata, "retrained": datetime.datetime.now().isoformat(timespec="seconds"),
+                "retrain_rows": len(df), "threshold_rule": f"{1 - contamination:.2f} quantile of held-out scores"}
+    return ModelBundle(pipeline, meta_agent, threshold, metadata=metadata, reference=reference)
+
+
+def _init_retrain_worker():
+    try:
+        from bootstrap import setup_environment
+        setup_environment()
+    except ImportError:
+        pass
+
+
+class AdaptiveScorer:
+    """
+    OnlineScorer with drift monitoring, background retraining and atomic model swap.
+
+    Each score_records() call reads the current OnlineScorer once, so a batch is always
+    scored by a single model; a finished retrain replaces that reference for the next call.
+
+    :param retrain_rows: most recent raw records kept for retraining (bounded deque)
+    :param min_retrain_rows: records needed since the drift was first flagged before retraining
+                             (the model is refit on post-drift traffic only)
+    :param cooldown_seconds: minimum time between two retrains
+    :param check_every: rows between two drift checks
+    :param save_dir: optionally write every retrained bundle there (write_bundle)
+    """
+
+    def __init__(self, scorer, monitor_kwargs=None, retrain=True, retrain_rows=20_000, min_retrain_rows=5_000,
+                 cooldown_seconds=600.0, check_every=1000, contamination=0.05, save_dir=None):
+        self.monitor_kwargs = dict(monitor_kwargs or {})
+        self.retrain = retrain
+        self.min_retrain_rows = min_retrain_rows
+        self.cooldown_seconds = cooldown_seconds
+        self.check_every = check_every
+        self.contamination = contamination
+        self.save_dir = save_dir
+
+        self.scorer = scorer
+        self.monitor = DriftMonitor.from_bundle(scorer.bundle, **self.monitor_kwargs)
+        self.recent = deque(maxlen=retrain_rows)
+        self.version = 1
+        self.retrains = 0
+        self.retrain_errors = 0
+        self.last_report = None
+        self.last_swap = None
+
+        self._since_check = 0
+        self._seen = 0
+        self._drift_onset = None
+        self._retrain_started = None
+        self._future = None
+        self._executor = None
+        # re-entrant: a future that is already done runs its callback (and swap) inside submit
+        self._lock = threading.RLock()
+        self._finished = threading.Event()
+
+    @property
+    def threshold(self):
+        return self.scorer.threshold
+
+    @property
+    def allowlist(self):
+        return self.scorer.allowlist
+
+    @property
+    def text_cache(self):
+        return self.scorer.text_cache
+
+    @property
+    def retraining(self):
+        return self._future is not None and not self._future.done()
+
+    def score_records(self, records):
+        if not records:
+            return []
+        scorer = self.scorer  # one model for the whole batch, even if a swap lands meanwhile
+        monitor = self.monitor
+
+        scores, fast, X_full = scorer.score_partitioned(pd.DataFrame.from_records(records))
+        predictions = (scores >= scorer.threshold).astype(int)
+
+        # allowlisted (fast-path) records have no feature rows: only the scored ones are monitored
+        if X_full is not None:
+            monitor.update(scores[~fast], X_full[:, :numeric_columns(scorer.bundle.pipeline)])
+        self.recent.extend(records)
+        self._seen += len(records)
+        self._since_check += len(records)
+        if self._since_check >= self.check_every:
+            self._since_check = 0
+            self.check()
+
+        return [
+            {"anomaly_score": float(score), "predicted_anomaly": int(prediction)}
+            for score, prediction in zip(scores, predictions)
+        ]
+
+    def check(self):
+        self.last_report = self.monitor.check()
+        if not self.last_report["drifted"]:
+            self._drift_onset = None
+            return self.last_report
+
+        if self._drift_onset is None:
+            # the window already held some drifted rows before this check
+            self._drift_onset = max(0, self._seen - self.check_every)
+        if self.retrain:
+            self.start_retrain()
+        return self.last_report
+
+    def post_drift_records(self):
+        """ Buffered records that arrived since the drift was first flagged. """
+        if self._drift_onset is None:
+            return []
+        n = min(self._seen - self._drift_onset, len(self.recent))
+        return list(self.recent)[len(self.recent) - n:]
+
+    def start_retrain(self):
+        """ Submit a background refit on the recent records. :return: True if one was started """
+        with self._lock:
+            records = self.post_drift_records()
+            if self.retraining or len(records) < self.min_retrain_rows:
+                return False
+            if self._retrain_started is not None and time.monotonic() - self._retrain_started < self.cooldown_seconds:
+                return False
+
+            if self._executor is None:
+                # spawn: TensorFlow does not survive fork() reliably
+                self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                                     initializer=_init_retrain_worker)
+            self._retrain_started = time.monotonic()
+            self._finished.clear()
+            print(f"🔄 Drift detected ({', '.join(self.last_report['reasons'])}): "
+                  f"retraining on {len(records)} records since the drift began, in the background")
+            try:
+                self._future = self._executor.submit(retrain_bundle, self.scorer.bundle, records, self.contamination)
+            except Exception as e:
+                # never let a broken worker pool break scoring; a fresh pool is made next time
+                self._retrain_failed(e)
+                return False
+            self._future.add_done_callback(self._on_retrained)
+            return True
+
+    def _retrain_failed(self, error):
+        self.retrain_errors += 1
+        print(f"❌ Retraining failed: {error!r}")
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._finished.set()
+
+    def _on_retrained(self, future):
+        try:
+            bundle = future.result()
+            self.swap(self.scorer.with_bundle(bundle))
+            if self.save_dir:
+                write_bundle(self.save_dir, bundle)
+        except Exception as e:
+            self._retrain_failed(e)
+        finally:
+            self._finished.set()
+
+    def swap(self, scorer):
+        """ Replace the model (and the monitor's reference) for all following batches. """
+        monitor = DriftMonitor.from_bundle(scorer.bundle, **self.monitor_kwargs)
+        with self._lock:
+            self.monitor = monitor
+            self.scorer = scorer
+            self._drift_onset = None
+            self.version += 1
+            self.retrains += 1
+            self.last_swap = datetime.datetime.now().isoformat(timespec="seconds")
+        print(f"✅ Swapped in model version {self.version} (threshold {scorer.threshold:.6f})")
+
+    def wait(self, timeout=None):
+        """ Block until a running retrain (and its swap) has finished. :return: False on timeout """
+        if self._future is None:
+            return True
+        return self._finished.wait(timeout)
+
+    def status(self):
+        return {
+            "model_version": self.version,
+            "retraining": self.retraining,
+            "retrains": self.retrains,
+            "retrain_errors": self.retrain_errors,
+            "last_swap": self.last_swap,
+            "buffered_records": len(self.recent),
+            "drift": self.last_report,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self.scorer.close()
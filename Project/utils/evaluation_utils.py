@@ -1,26 +1,26 @@
 # utils/evaluation_utils.py
 import itertools
 import numpy as np
-from sklearn.metrics import confusion_matrix, precision_score, recall_score, f1_score
+from .metrics import classification_metrics
 
-def evaluate_agent(agent, X, y_true, threshold=None):
+def evaluate_agent(agent, X, y_true, threshold=None, store=None, split=None):
     """
     Evaluate a single agent.
     Prints confusion matrix, precision, recall, f1_score.
 
     If threshold is None:
     - For MetaAgent or agents with automatic thresholding, it will compute it automatically.
+
+    If a ScoreStore is given, scores are read from store[agent, split] instead of re-scoring X.
     """
-    # אם אין threshold, נסה להשתמש ב-predict עם threshold=None
-    if threshold is None:
-        y_pred = agent.predict(X, threshold=None)
+    if store is not None:
+        y_pred = agent.predict_from_scores(store.get(agent, split), threshold=threshold)
     else:
+        # אם אין threshold, נסה להשתמש ב-predict עם threshold=None
         y_pred = agent.predict(X, threshold=threshold)
 
-    cm = confusion_matrix(y_true, y_pred)
-    precision = precision_score(y_true, y_pred, zero_division=0)
-    recall = recall_score(y_true, y_pred, zero_division=0)
-    f1 = f1_score(y_true, y_pred, zero_division=0)
+    metrics = classification_metrics(y_true, y_pred)
+    cm, precision, recall, f1 = metrics["cm"], metrics["precision"], metrics["recall"], metrics["f1"]
 
     print(f"===== Evaluation: {agent.get_name()} =====")
     print("Confusion Matrix:")
@@ -30,11 +30,14 @@ def evaluate_agent(agent, X, y_true, threshold=None):
     return {"cm": cm, "precision": precision, "recall": recall, "f1": f1}
 
 
-def evaluate_ensemble(agents_list, X_dict, y_true, weights=None, contamination=0.05, threshold=None):
+def evaluate_ensemble(agents_list, X_dict, y_true, weights=None, contamination=0.05, threshold=None,
+                      store=None, split=None):
     """
     Evaluate an ensemble of agents.
     Uses percentile-based thresholding (default top contamination% = anomalies).
     Prints confusion matrix, precision, recall, f1_score for the ensemble.
+
+    If a ScoreStore is given, per-agent scores are read from it instead of re-scoring X_dict.
     """
     num_agents = len(agents_list)
     
@@ -43,13 +46,16 @@ def evaluate_ensemble(agents_list, X_dict, y_true, weights=None, contamination=0
     else:
         weights = np.array(weights) / np.sum(weights)
     
-    all_scores = []
-    for agent in agents_list:
-        X_agent = X_dict[agent.get_name()]
-        scores = agent.score(X_agent)
-        all_scores.append(scores)
-    
-    all_scores = np.array(all_scores)  # shape = (num_agents, num_samples)
+    if store is not None:
+        all_scores = store.matrix(agents_list, split)
+    else:
+        all_scores = []
+        for agent in agents_list:
+            X_agent = X_dict[agent.get_name()]
+            scores = agent.score(X_agent)
+            all_scores.append(scores)
+
+        all_scores = np.array(all_scores)  # shape = (num_agents, num_samples)
     
     # Weighted sum across agents
     final_scores = np.dot(weights, all_scores)
@@ -61,10 +67,8 @@ def evaluate_ensemble(agents_list, X_dict, y_true, weights=None, contamination=0
     
     y_pred = (final_scores >= threshold).astype(int)
     
-    cm = confusion_matrix(y_true, y_pred)
-    precision = precision_score(y_true, y_pred, zero_division=0)
-    recall = recall_score(y_true, y_pred, zero_division=0)
-    f1 = f1_score(y_true, y_pred, zero_division=0)
+    metrics = classification_metrics(y_true, y_pred)
+    cm, precision, recall, f1 = metrics["cm"], metrics["precision"], metrics["recall"], metrics["f1"]
     
     ensemble_names = "+".join([agent.get_name() for agent in agents_list])
     print(f"===== Ensemble Evaluation: {ensemble_names} =====")
@@ -72,4 +76,5 @@ def evaluate_ensemble(agents_list, X_dict, y_true, weights=None, contamination=0
     print(cm)
     print(f"Precision: {precision:.4f}, Recall: {recall:.4f}, F1: {f1:.4f}\n")
     
-    return {"cm": cm, "precision": precision, "recall": recall, "f1": f1, "threshold": threshold, "prediction": y_pred}
\ No newline at end of file
+    return {"cm": cm, "precision": precision, "recall": recall, "f1": f1, "threshold": threshold,
+            "prediction": y_pred, "scores": final_scores}
\ No newline at end of file
@@ -0,0 +1,228 @@
+# utils/hyperparam_search.py
+"""
+Successive-halving hyperparameter search for all agents at once.
+
+Every configuration of every agent starts on a small budget
+(a training subsample for IsolationForest / OneClassSVM, a few epochs for the
+Autoencoder). After each rung only the best 1/eta configurations per agent
+are promoted to an eta times larger budget, until the full budget is reached.
+All evaluations of a rung (across agents) run in one process pool.
+
+Configurations are scored like find_best_nu(): fit on the training rows,
+score the validation rows, take the best F1 over validation thresholds.
+"""
+import itertools
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .best_hyperparams import find_best_threshold
+
+# -----------------------------
+# Search spaces
+# -----------------------------
+SEARCH_SPACES = {
+    "OneClassSVM": {"nu": [round(float(nu), 2) for nu in np.arange(0.01, 0.51, 0.01)]},
+    "IsolationForest": {"n_estimators": list(range(50, 301, 10))},
+    "Autoencoder": {
+        "hidden_dims": [(128, 64), (256, 128, 64), (512, 256, 128, 64, 32)],
+        "latent_dim": [8, 16, 32],
+    },
+}
+
+# budget = fraction of the training rows, or number of epochs
+BUDGETS = {
+    "OneClassSVM": {"resource": "rows", "max": 1.0, "min_rows": 100},
+    "IsolationForest": {"resource": "rows", "max": 1.0, "min_rows": 100},
+    "Autoencoder": {"resource": "epochs", "max": 50, "min": 5},
+}
+
+
+def expand_space(space):
+    """ {"a": [1, 2], "b": [3]} -> [{"a": 1, "b": 3}, {"a": 2, "b": 3}] """
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def rung_budgets(agent_name, n_configs, n_train, eta=3):
+    """
+    Budgets of the successive rungs, smallest first, ending at the full budget.
+    The number of rungs is limited by both the number of configurations and the minimum budget.
+    """
+    budget = BUDGETS[agent_name]
+    if budget["resource"] == "rows":
+        min_budget = min(1.0, budget["min_rows"] / max(n_train, 1))
+    else:
+        min_budget = budget["min"]
+
+    max_budget = budget["max"]
+    n_rungs = 1 + min(
+        int(math.log(max(n_configs, 1), eta) + 1e-9),
+        int(math.log(max_budget / min_budget, eta) + 1e-9),
+    )
+    budgets = [max_budget * eta ** -(n_rungs - 1 - i) for i in range(n_rungs)]
+
+    if budget["resource"] == "epochs":
+        budgets = [max(1, int(round(b))) for b in budgets]
+    return budgets
+
+
+# -----------------------------
+# Worker side
+# -----------------------------
+_DATA = {}
+
+
+def _init_worker(data):
+    """ The matrices are sent once per worker instead of once per task. """
+    global _DATA
+    _DATA = data
+    try:
+        from bootstrap import setup_environment
+        setup_environment()
+    except ImportError:
+        pass
+
+
+def available_cpus():
+    """ CPUs this process may run on (cgroup/affinity aware where the OS supports it). """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _subsample(X, fraction, seed):
+    if fraction >= 1.0:
+        return X
+    n = max(1, int(round(X.shape[0] * fraction)))
+    # same rows for every configuration of a rung, so they compete on equal terms
+    idx = np.sort(np.random.default_rng(seed).choice(X.shape[0], n, replace=False))
+    return X[idx]
+
+
+def _build_agent(agent_name, params, budget, input_dim, seed):
+    if agent_name == "OneClassSVM":
+        from agents.svm_agent import SVMAgent
+        return SVMAgent(**params)
+    if agent_name == "IsolationForest":
+        from agents.isolation_forest_agent import IsolationForestAgent
+        return IsolationForestAgent(random_state=seed, **params)
+    if agent_name == "Autoencoder":
+        from agents.autoencoder_agent import AutoencoderAgent
+        return AutoencoderAgent(input_dim=input_dim, epochs=budget, seed=seed, **params)
+    raise ValueError(f"No search space for agent '{agent_name}'")
+
+
+def evaluate_config(agent_name, params, budget, seed=42, data=None):
+    """
+    Fit one configuration on its budget and return its best validation F1.
+    """
+    data = _DATA if data is None else data
+    X_train, X_val, y_val = data[agent_name], data[f"{agent_name}_val"], data["y_val"]
+
+    resource = BUDGETS[agent_name]["resource"]
+    if resource == "rows":
+        X_train = _subsample(X_train, budget, seed)
+
+    agent = _build_agent(agent_name, params, budget, X_train.shape[1], seed)
+    if agent_name == "Autoencoder":
+        agent.fit(X_train, X_val=X_val)
+    else:
+        agent.fit(X_train)
+
+    _, f1 = find_best_threshold(agent.score(X_val), y_val, n_thresholds=50)
+    return f1
+
+
+def _evaluate_task(task):
+    agent_name, params, budget, seed = task
+    return evaluate_config(agent_name, params, budget, seed)
+
+
+# -----------------------------
+# Driver
+# -----------------------------
+def successive_halving_search(X_train_dict, X_val_dict, y_val, agents=None, spaces=None,
+                              eta=3, n_jobs=None, seed=42):
+    """
+    Tune several agents together with successive halving.
+
+    :param X_train_dict: {agent_name: training matrix} (benign-only where the agent expects it)
+    :param X_val_dict: {agent_name: validation matrix}
+    :param agents: agent names to tune (default: every agent with a search space and data)
+    :param spaces: optional {agent_name: {param: [values]}} overriding SEARCH_SPACES
+    :param eta: keep the best 1/eta configurations per rung, multiply the budget by eta
+    :param n_jobs: worker processes (None = all CPUs, 1 = run in this process)
+    :return: {agent_name: {"params": best params, "f1": F1 at full budget, "history": [...]}}
+    """
+    spaces = {**SEARCH_SPACES, **(spaces or {})}
+    if agents is None:
+        agents = [name for name in spaces if name in X_train_dict]
+
+    y_val = np.asarray(y_val)
+    data = {"y_val": y_val}
+    for name in agents:
+        data[name] = X_train_dict[name]
+        data[f"{name}_val"] = X_val_dict[name]
+
+    # per agent: remaining configurations and the budgets still to run
+    state = {}
+    for name in agents:
+        configs = expand_space(spaces[name])
+        state[name] = {
+            "configs": configs,
+            "budgets": rung_budgets(name, len(configs), X_train_dict[name].shape[0], eta),
+            "history": [],
+        }
+
+    n_jobs = n_jobs or available_cpus()
+    print(f"\n=== Successive halving over {', '.join(agents)} (eta={eta}, workers={n_jobs}) ===\n")
+
+    executor = None
+    if n_jobs > 1:
+        # spawn: TensorFlow does not survive fork() reliably
+        executor = ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_init_worker, initargs=(data,))
+
+    try:
+        rung = 0
+        while any(s["budgets"] for s in state.values()):
+            tasks = []
+            for name, s in state.items():
+                if s["budgets"]:
+                    budget = s["budgets"][0]
+                    tasks += [(name, params, budget, seed + rung) for params in s["configs"]]
+
+            if executor is not None:
+                scores = list(executor.map(_evaluate_task, tasks))
+            else:
+                scores = [evaluate_config(*task, data=data) for task in tasks]
+
+            for name, s in state.items():
+                if not s["budgets"]:
+                    continue
+                budget = s["budgets"].pop(0)
+                results = [(params, f1) for (task_name, params, _, _), f1 in zip(tasks, scores) if task_name == name]
+                s["history"] += [{"rung": rung, "budget": budget, "params": params, "f1": f1}
+                                 for params, f1 in results]
+
+                ranked = sorted(results, key=lambda r: r[1], reverse=True)
+                keep = max(1, len(ranked) // eta) if s["budgets"] else 1
+                s["configs"] = [params for params, _ in ranked[:keep]]
+                s["best_f1"] = ranked[0][1]
+                print(f"{name:<16} rung {rung}: {len(results):>3} configs @ budget {budget:g} "
+                      f"-> best F1={ranked[0][1]:.4f} {ranked[0][0]}")
+            rung += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    best = {}
+    for name, s in state.items():
+        best[name] = {"params": s["configs"][0], "f1": s["best_f1"], "history": s["history"]}
+        print(f"\n✅ {name}: best {s['configs'][0]} with F1 = {s['best_f1']:.4f}")
+
+    return best
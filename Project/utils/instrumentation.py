@@ -0,0 +1,171 @@
+# utils/instrumentation.py
+"""
+Lightweight per-stage instrumentation.
+
+Each stage records wall time, CPU time, process RSS (current + high-water mark)
+and, optionally, the tracemalloc peak/delta of Python allocations. Stages nest;
+every record keeps its full path (e.g. "fit/IsolationForest").
+
+Usage:
+    tracer = Tracer("Enterprise_A")
+    with tracer.stage("preprocess"):
+        ...
+
+    @tracer.trace("load")
+    def load(...): ...
+
+    tracer.save("Results/Enterprise_A/Enterprise_A_trace.json")
+"""
+import contextlib
+import datetime
+import functools
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+MB = 2 ** 20
+
+
+def current_rss_mb():
+    """ Resident set size right now (Linux /proc), None where unavailable. """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / MB
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def max_rss_mb():
+    """ Process RSS high-water mark (ru_maxrss is KB on Linux, bytes on macOS). """
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / MB if sys.platform == "darwin" else max_rss / 1024
+
+
+class Tracer:
+    """
+    Collects stage records for one run.
+    :param trace_memory: also follow Python allocations with tracemalloc
+                         (accurate per-stage peaks, but slows allocation-heavy code)
+    """
+
+    def __init__(self, run_name, trace_memory=True):
+        self.run_name = run_name
+        self.trace_memory = trace_memory
+        self.records = []
+        self._stack = []
+        self._started = datetime.datetime.now()
+        self._t0 = time.perf_counter()
+        self._owns_tracemalloc = False
+
+    # -----------------------------
+    # Stages
+    # -----------------------------
+    def _start_tracemalloc(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+
+    def _stop_tracemalloc(self):
+        if self._owns_tracemalloc and not self._stack:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    @contextlib.contextmanager
+    def stage(self, name, **meta):
+        """
+        Time and measure the enclosed block. Extra keyword arguments are stored with the record.
+        """
+        self._start_tracemalloc()
+        frame = {
+            "name": name,
+            "wall": time.perf_counter(),
+            "cpu": time.process_time(),
+            "rss": current_rss_mb(),
+            "max_rss": max_rss_mb(),
+        }
+
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # the parent keeps its running peak; this stage measures its own from here
+            if self._stack:
+                self._stack[-1]["traced_peak"] = max(self._stack[-1]["traced_peak"], peak)
+            tracemalloc.reset_peak()
+            frame["traced_start"] = frame["traced_peak"] = current
+
+        self._stack.append(frame)
+        path = "/".join(f["name"] for f in self._stack)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            record = {
+                "stage": path,
+                "name": name,
+                "depth": len(self._stack),
+                "start_seconds": frame["wall"] - self._t0,
+                "wall_seconds": time.perf_counter() - frame["wall"],
+                "cpu_seconds": time.process_time() - frame["cpu"],
+                "rss_start_mb": frame["rss"],
+                "rss_end_mb": current_rss_mb(),
+                "max_rss_mb": max_rss_mb(),
+                "max_rss_delta_mb": max_rss_mb() - frame["max_rss"],
+            }
+
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                stage_peak = max(frame["traced_peak"], peak)
+                record["tracemalloc_peak_mb"] = (stage_peak - frame["traced_start"]) / MB
+                record["tracemalloc_delta_mb"] = (current - frame["traced_start"]) / MB
+                if self._stack:
+                    self._stack[-1]["traced_peak"] = max(self._stack[-1]["traced_peak"], stage_peak)
+                tracemalloc.reset_peak()
+
+            record.update(meta)
+            self.records.append(record)
+            self._stop_tracemalloc()
+
+    def trace(self, name=None):
+        """ Decorator form of stage(); the stage name defaults to the function name. """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name or fn.__name__):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # -----------------------------
+    # Output
+    # -----------------------------
+    def to_dict(self):
+        return {
+            "run": self.run_name,
+            "started": self._started.isoformat(timespec="seconds"),
+            "total_seconds": time.perf_counter() - self._t0,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "trace_memory": self.trace_memory,
+            # records are appended when a stage ends; list them in start order
+            "stages": sorted(self.records, key=lambda r: r["start_seconds"]),
+        }
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+    def summary(self, max_depth=None):
+        """ Print one line per stage, indented by nesting depth. """
+        print(f"\n=== Stage timings ({self.run_name}) ===\n")
+        for record in self.to_dict()["stages"]:
+            if max_depth is not None and record["depth"] > max_depth:
+                continue
+            name = "  " * record["depth"] + record["name"]
+            memory = (f" | peak {record['tracemalloc_peak_mb']:8.1f} MB"
+                      if "tracemalloc_peak_mb" in record else "")
+            print(f"{name:<36} {record['wall_seconds']:9.3f}s wall | {record['cpu_seconds']:9.3f}s cpu"
+                  f" | rss {record['max_rss_mb']:8.1f} MB{memory}")
@@ -0,0 +1,132 @@
+# knn_index_report.py
+"""
+Query-latency and recall-vs-exact curves for the KNNAgent IVF index.
+
+Run from the Project folder:
+    python -m utils.knn_index_report A
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from utils.preprocessing import preprocess_for_metaagent
+from utils.data_loader import load_dataset
+from agents.knn_agent import KNNAgent
+from agents.ann_index import exact_search
+
+
+def recall_at_k(approx_ids, exact_ids):
+    """
+    Fraction of the exact k nearest neighbours returned by the approximate search.
+    """
+    k = exact_ids.shape[1]
+    hits = [len(np.intersect1d(a, e)) for a, e in zip(approx_ids, exact_ids)]
+    return np.sum(hits) / (k * len(exact_ids))
+
+
+def index_curves(X_train, X_query, k=5, n_probe_options=None, n_components=32):
+    """
+    Build the index once, then sweep n_probe.
+    :return: DataFrame with latency (ms / query) and recall@k per n_probe
+    """
+    agent = KNNAgent(n_neighbors=k, n_components=n_components)
+
+    start = time.perf_counter()
+    agent.fit(X_train)
+    build_seconds = time.perf_counter() - start
+
+    index = agent.model
+    R_train = agent.reduce(X_train)
+    R_query = agent.reduce(X_query)
+
+    start = time.perf_counter()
+    _, exact_ids = exact_search(R_train, R_query, k)
+    exact_ms = 1000 * (time.perf_counter() - start) / len(R_query)
+
+    n_lists = len(index.centroids)
+    if n_probe_options is None:
+        n_probe_options = sorted({p for p in (1, 2, 4, 8, 16, 32, 64, n_lists) if p <= n_lists})
+
+    rows = []
+    for n_probe in n_probe_options:
+        start = time.perf_counter()
+        _, approx_ids = index.search(R_query, k, n_probe=n_probe)
+        latency_ms = 1000 * (time.perf_counter() - start) / len(R_query)
+
+        rows.append({
+            "n_probe": n_probe,
+            "n_lists": n_lists,
+            "latency_ms_per_query": latency_ms,
+            "exact_latency_ms_per_query": exact_ms,
+            "recall_at_k": recall_at_k(approx_ids, exact_ids),
+            "build_seconds": build_seconds,
+        })
+        print(f"n_probe={n_probe:>4} -> recall@{k}={rows[-1]['recall_at_k']:.4f}, "
+              f"{latency_ms:.4f} ms/query (exact {exact_ms:.4f} ms/query)")
+
+    return pd.DataFrame(rows)
+
+
+def plot_curves(curves, path, title):
+    fig, axes = plt.subplots(1, 2, figsize=(10, 4))
+
+    axes[0].plot(curves["n_probe"], curves["recall_at_k"], marker="o")
+    axes[0].set_xscale("log", base=2)
+    axes[0].set_xlabel("n_probe")
+    axes[0].set_ylabel("Recall vs exact")
+    axes[0].set_title("Recall vs exact k-NN")
+
+    axes[1].plot(curves["latency_ms_per_query"], curves["recall_at_k"], marker="o", label="IVF")
+    axes[1].axvline(curves["exact_latency_ms_per_query"].iloc[0], color="red", linestyle="--", label="Exact")
+    axes[1].set_xlabel("Latency (ms / query)")
+    axes[1].set_ylabel("Recall vs exact")
+    axes[1].set_title("Recall vs query latency")
+    axes[1].legend()
+
+    fig.suptitle(title)
+    plt.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def run_report(dataset_letter, output_dir="Results/KNN_Index", k=5):
+    df = load_dataset(f"data/Enterprise_{dataset_letter}.csv")
+    X_dict, y = preprocess_for_metaagent(
+        df,
+        text_col="command_text",
+        label_col="is_anomaly",
+        timestamp_col="timestamp",
+        tfidf_max_features=512
+    )
+    X = X_dict["OneClassSVM"]
+    y = np.asarray(y)
+
+    # index benign rows, query with everything else
+    rng = np.random.default_rng(42)
+    benign = np.flatnonzero(y == 0)
+    rng.shuffle(benign)
+    n_train = int(0.7 * len(benign))
+    train_idx = benign[:n_train]
+    query_idx = np.setdiff1d(np.arange(len(y)), train_idx)
+
+    curves = index_curves(X[train_idx], X[query_idx], k=k)
+
+    os.makedirs(output_dir, exist_ok=True)
+    csv_path = f"{output_dir}/Enterprise_{dataset_letter}_knn_index_curves.csv"
+    png_path = f"{output_dir}/Enterprise_{dataset_letter}_knn_index_curves.png"
+    curves.to_csv(csv_path, index=False)
+    plot_curves(curves, png_path, f"Enterprise_{dataset_letter} (k={k})")
+
+    print(f"\n✅ KNN index curves saved to {csv_path} and {png_path}")
+    return curves
+
+
+if __name__ == "__main__":
+    letters = sys.argv[1:] or ["A", "B", "C"]
+    for letter in letters:
+        run_report(letter.upper())
@@ -0,0 +1,186 @@
+# utils/log_follower.py
+"""
+Incremental reader for a growing command-log file (CSV with header, or JSONL), like `tail -f`.
+
+Only complete lines are consumed: a line still being written (no trailing newline)
+is left for the next poll. The byte offset after the last *scored* line is
+checkpointed, so a restart resumes exactly there. A file that was truncated or
+replaced (rotation: new inode) is read again from the start.
+"""
+import csv
+import json
+import os
+
+from .online_scorer import SCALAR_TYPES
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if ext == ".csv":
+        return "csv"
+    raise ValueError(f"Cannot infer the log format of '{path}'. Use fmt='csv' or fmt='jsonl'.")
+
+
+class LogFollower:
+    """
+    :param path: the log file (may not exist yet)
+    :param fmt: 'csv' or 'jsonl' (default: from the file extension)
+    :param checkpoint_path: JSON file holding the committed offset (None = no checkpointing)
+    :param from_start: without a checkpoint, start at the beginning of the file instead of its end
+    """
+
+    def __init__(self, path, fmt=None, checkpoint_path=None, from_start=False):
+        self.path = path
+        self.fmt = fmt or detect_format(path)
+        self.checkpoint_path = checkpoint_path
+        self.from_start = from_start
+
+        self.offset = None      # read position (after the last returned line)
+        self.committed = None   # offset saved in the checkpoint
+        self.inode = None
+        self.header = None
+        self.skipped = 0
+        self._file = None
+
+        checkpoint = self._load_checkpoint()
+        if checkpoint is not None:
+            self.offset = self.committed = checkpoint["offset"]
+            self.inode = checkpoint.get("inode")
+
+    # -----------------------------
+    # Checkpoint
+    # -----------------------------
+    def _load_checkpoint(self):
+        if not self.checkpoint_path:
+            return None
+        try:
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if checkpoint.get("path") != os.path.abspath(self.path):
+            return None
+        return checkpoint
+
+    def commit(self, offset=None, **extra):
+        """
+        Mark everything before offset (default: everything returned so far) as processed.
+        """
+        self.committed = self.offset if offset is None else offset
+        if not self.checkpoint_path:
+            return
+        checkpoint = {"path": os.path.abspath(self.path), "offset": self.committed, "inode": self.inode, **extra}
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # -----------------------------
+    # File handling
+    # -----------------------------
+    def _open(self):
+        """ (Re)open the file; returns False while it does not exist. """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+
+        rotated = self.inode is not None and stat.st_ino != self.inode
+        truncated = self.offset is not None and stat.st_size < self.offset
+        if rotated or truncated:
+            self.offset = None
+
+        self._close()
+        self._file = open(self.path, "rb")
+        self.inode = stat.st_ino
+
+        if self.fmt == "csv":
+            first = self._file.readline()
+            if not first.endswith(b"\n"):
+                # header not complete yet
+                self._close()
+                return False
+            self.header = next(csv.reader([first.decode("utf-8")]))
+            header_end = self._file.tell()
+        else:
+            header_end = 0
+
+        if self.offset is None:
+            self.offset = header_end if (self.from_start or rotated or truncated) else stat.st_size
+        self.offset = max(self.offset, header_end)
+        self._file.seek(self.offset)
+        return True
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        self._close()
+
+    def _needs_reopen(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return stat.st_ino != self.inode or stat.st_size < self.offset
+
+    # -----------------------------
+    # Reading
+    # -----------------------------
+    def _parse(self, line):
+        text = line.decode("utf-8", errors="replace").rstrip("\r\n")
+        if not text.strip():
+            return None
+        if self.fmt == "jsonl":
+            record = json.loads(text)
+            if not isinstance(record, dict):
+                return None
+            # nested lists / objects cannot be featurized: treat the line as malformed
+            if not all(isinstance(value, SCALAR_TYPES) for value in record.values()):
+                return None
+            return record
+
+        values = next(csv.reader([text]))
+        if len(values) != len(self.header):
+            return None
+        return dict(zip(self.header, values))
+
+    def poll(self, max_records):
+        """
+        Read up to max_records newly appended records.
+        :return: list of record dicts (empty when there is nothing new yet)
+        """
+        if self._file is None or self._needs_reopen():
+            if not self._open():
+                return []
+
+        records = []
+        while len(records) < max_records:
+            line = self._file.readline()
+            if not line.endswith(b"\n"):
+                # EOF, or a line still being written: come back to it later
+                self._file.seek(self.offset)
+                break
+            self.offset = self._file.tell()
+
+            try:
+                record = self._parse(line)
+            except (ValueError, csv.Error):
+                record = None
+            if record is None:
+                self.skipped += bool(line.strip())
+                continue
+            records.append(record)
+
+        return records
+
+    def lag_bytes(self):
+        """ Bytes appended to the file that were not read yet. """
+        try:
+            return max(0, os.stat(self.path).st_size - (self.offset or 0))
+        except FileNotFoundError:
+            return 0
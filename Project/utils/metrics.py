@@ -0,0 +1,109 @@
+# utils/metrics.py
+"""
+Confusion-count metrics kernel.
+
+TP/FP/TN/FN are computed in one vectorized pass over int8 label arrays and
+precision / recall / F1 are derived from those counts. The batched forms
+evaluate many prediction vectors (e.g. a threshold x sample matrix) at once,
+which is what the tuning loops need.
+"""
+import numpy as np
+
+
+def _as_int8(y):
+    return np.asarray(y).astype(np.int8, copy=False).ravel()
+
+
+# -----------------------------
+# Single prediction vector
+# -----------------------------
+def confusion_counts(y_true, y_pred):
+    """
+    :return: (tp, fp, tn, fn) as ints
+    """
+    y_true = _as_int8(y_true)
+    y_pred = _as_int8(y_pred)
+
+    # code = 2*true + pred -> 0=TN, 1=FP, 2=FN, 3=TP
+    tn, fp, fn, tp = np.bincount(2 * y_true + y_pred, minlength=4)[:4]
+    return int(tp), int(fp), int(tn), int(fn)
+
+
+def metrics_from_counts(tp, fp, tn, fn):
+    """
+    Precision, recall and F1 from confusion counts (scalars or arrays).
+    Undefined ratios are 0, like sklearn's zero_division=0.
+    """
+    tp, fp, tn, fn = (np.asarray(c, dtype=np.float64) for c in (tp, fp, tn, fn))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        f1 = np.where(2 * tp + fp + fn > 0, 2 * tp / (2 * tp + fp + fn), 0.0)
+
+    if precision.ndim == 0:
+        return {"precision": float(precision), "recall": float(recall), "f1": float(f1)}
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def confusion_matrix_from_counts(tp, fp, tn, fn):
+    """
+    Same layout as sklearn: [[TN, FP], [FN, TP]].
+    """
+    return np.array([[tn, fp], [fn, tp]])
+
+
+def classification_metrics(y_true, y_pred):
+    """
+    Confusion matrix + precision / recall / F1 from a single pass.
+    """
+    tp, fp, tn, fn = confusion_counts(y_true, y_pred)
+    metrics = metrics_from_counts(tp, fp, tn, fn)
+    metrics["cm"] = confusion_matrix_from_counts(tp, fp, tn, fn)
+    return metrics
+
+
+def f1_score(y_true, y_pred):
+    return metrics_from_counts(*confusion_counts(y_true, y_pred))["f1"]
+
+
+# -----------------------------
+# Batched forms
+# -----------------------------
+def batched_confusion_counts(y_true, preds):
+    """
+    Confusion counts for many prediction vectors at once.
+    :param preds: 2D array (n_vectors, n_samples) of 0/1 predictions
+    :return: (tp, fp, tn, fn) arrays of length n_vectors
+    """
+    y_true = _as_int8(y_true).astype(bool)
+    preds = np.asarray(preds).astype(bool, copy=False)
+
+    n = y_true.shape[0]
+    positives = np.count_nonzero(y_true)
+
+    tp = np.count_nonzero(preds & y_true, axis=1)
+    predicted_pos = np.count_nonzero(preds, axis=1)
+
+    fp = predicted_pos - tp
+    fn = positives - tp
+    tn = n - tp - fp - fn
+    return tp, fp, tn, fn
+
+
+def threshold_metrics(scores, y_true, thresholds, chunk_size=256):
+    """
+    Precision / recall / F1 for every threshold (prediction = score >= threshold).
+    Builds the threshold x sample matrix chunk by chunk to bound memory.
+    :return: dict of arrays aligned with thresholds
+    """
+    scores = np.asarray(scores).ravel()
+    thresholds = np.asarray(thresholds).ravel()
+
+    counts = [np.empty(len(thresholds), dtype=np.int64) for _ in range(4)]
+    for start in range(0, len(thresholds), chunk_size):
+        block = scores[None, :] >= thresholds[start:start + chunk_size, None]
+        for out, c in zip(counts, batched_confusion_counts(y_true, block)):
+            out[start:start + chunk_size] = c
+
+    return metrics_from_counts(*counts)
@@ -0,0 +1,96 @@
+# utils/model_io.py
+"""
+Save / load a fitted detector ("model bundle") for scoring new records.
+
+A bundle is a directory with:
+- model.pkl:     the fitted FeaturePipeline, MetaAgent (with its tuned weights), decision threshold
+                 and an optional reference sample of scores / features (for utils.drift_monitor)
+- manifest.json: human-readable description (agents, weights, threshold, feature count, library versions)
+
+The Autoencoder pickles its weights instead of the Keras model (see AutoencoderAgent.__getstate__).
+"""
+import datetime
+import json
+import os
+import pickle
+
+import numpy as np
+
+from .tuning_cache import library_versions
+
+BUNDLE_FILE = "model.pkl"
+MANIFEST_FILE = "manifest.json"
+BUNDLE_PACKAGES = ["numpy", "pandas", "scikit-learn", "scipy", "tensorflow-cpu", "tensorflow", "tf-keras"]
+
+
+class ModelBundle:
+    """
+    Everything needed to turn raw records into ensemble scores and alerts.
+    """
+
+    def __init__(self, pipeline, meta_agent, threshold, metadata=None, reference=None):
+        """
+        :param reference: optional {"scores", "features", "feature_names"} of held-out rows the
+                          model considers normal traffic (see drift_monitor.build_reference)
+        """
+        self.pipeline = pipeline
+        self.meta_agent = meta_agent
+        self.threshold = float(threshold)
+        self.metadata = dict(metadata or {})
+        self.reference = reference
+
+    def manifest(self):
+        return {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "agents": [agent.get_name() for agent in self.meta_agent.agents],
+            "weights": np.asarray(self.meta_agent.weights, dtype=float).tolist(),
+            "voting": self.meta_agent.voting,
+            "threshold": self.threshold,
+            "input_columns": list(self.pipeline.input_columns_),
+            "n_features": len(self.pipeline.feature_cols_) + (
+                len(self.pipeline.vectorizer_.vocabulary_) if self.pipeline.vectorizer_ is not None else 0),
+            "reference_rows": len(self.reference["scores"]) if self.reference is not None else 0,
+            "versions": library_versions(BUNDLE_PACKAGES),
+            **self.metadata,
+        }
+
+
+def save_bundle(directory, pipeline, meta_agent, threshold, metadata=None, reference=None):
+    """
+    Write a model bundle to directory (created if needed).
+    :return: the directory
+    """
+    return write_bundle(directory, ModelBundle(pipeline, meta_agent, threshold, metadata, reference))
+
+
+def write_bundle(directory, bundle):
+    """ Write an existing ModelBundle (e.g. a retrained one) to directory. """
+    os.makedirs(directory, exist_ok=True)
+
+    # write-then-rename: a scorer reloading the bundle never reads half a file
+    tmp_path = os.path.join(directory, f"{BUNDLE_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, os.path.join(directory, BUNDLE_FILE))
+
+    with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+        json.dump(bundle.manifest(), f, indent=2)
+
+    return directory
+
+
+def load_bundle(directory):
+    """
+    Load a bundle written by save_bundle().
+    Only load bundles you created yourself: model.pkl is a pickle.
+    """
+    path = os.path.join(directory, BUNDLE_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No model bundle in '{directory}' (expected {BUNDLE_FILE}). "
+                                f"Run main.py / batch_main.py first.")
+    with open(path, "rb") as f:
+        bundle = pickle.load(f)
+    # bundles written before reference samples existed
+    if not hasattr(bundle, "reference"):
+        bundle.reference = None
+    return bundle
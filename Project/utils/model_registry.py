@@ -0,0 +1,208 @@
+# utils/model_registry.py
+"""
+Many enterprises ("tenants") served from one scoring process.
+
+Every tenant has its own fitted pipeline + ensemble + threshold on disk, in the
+layout main.py / batch_main.py write: {root}/{tenant}/model (e.g. Results/Enterprise_A/model).
+
+- Lazy: a tenant's bundle is loaded on its first request, not at start-up.
+- Bounded: at most max_resident tenants stay in memory, and their estimated size
+  (bundle file + text cache budget + allowlist counters) stays within
+  memory_budget_mb; the least recently used tenants are evicted first and their
+  scorer is closed (allowlist counters are saved). The tenant being scored is never evicted.
+- Routing: each record names its tenant in tenant_field; records of one batch
+  are grouped per tenant, scored with that tenant's model and returned in order.
+- Tenant lookups hit an in-memory set of the tenants under root; the folder is
+  listed again only when an id is missing, so tenants trained later appear live.
+
+Scoring (score_records / get) must run in one thread at a time, like OnlineScorer;
+tenant lookups and stats() may be called from another thread (e.g. an event loop).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .model_io import BUNDLE_FILE
+from .online_scorer import OnlineScorer
+
+
+class UnknownTenantError(KeyError):
+    """ The record names a tenant without a model bundle under the registry root. """
+
+
+class ModelRegistry:
+    """
+    :param root: folder with one {tenant}/{model_subdir} bundle per tenant
+    :param max_resident: maximum number of tenants kept loaded
+    :param memory_budget_mb: maximum estimated size of the loaded tenants (None = count limit only)
+    :param scorer_factory: function(bundle directory) -> scorer with score_records() (default OnlineScorer)
+    :param tenant_field: record key holding the tenant id
+    :param default_tenant: tenant of records without tenant_field (None = such records are rejected)
+    """
+
+    def __init__(self, root="Results", max_resident=4, memory_budget_mb=None, scorer_factory=None,
+                 tenant_field="tenant_id", default_tenant=None, model_subdir="model"):
+        self.root = root
+        self.max_resident = max_resident
+        self.memory_budget = memory_budget_mb * 2 ** 20 if memory_budget_mb else None
+        self.scorer_factory = scorer_factory or OnlineScorer.from_directory
+        self.tenant_field = tenant_field
+        self.default_tenant = default_tenant
+        self.model_subdir = model_subdir
+
+        self._resident = OrderedDict()  # tenant -> (scorer, estimated bytes), least recently used first
+        self._known = frozenset()        # tenants with a bundle under root, as of the last listing
+        self._lock = threading.Lock()    # guards _resident / _known and the counters
+        self.bytes = 0
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    # -----------------------------
+    # Tenants on disk
+    # -----------------------------
+    def model_directory(self, tenant):
+        return os.path.join(self.root, tenant, self.model_subdir)
+
+    @staticmethod
+    def _valid_name(tenant):
+        return isinstance(tenant, str) and tenant not in ("", ".", "..") and "/" not in tenant and "\\" not in tenant
+
+    def tenants(self):
+        """ Ids of every tenant with a bundle under root (lists root and refreshes the known set). """
+        names = os.listdir(self.root) if os.path.isdir(self.root) else []
+        known = frozenset(name for name in names if self._valid_name(name) and
+                          os.path.isfile(os.path.join(self.model_directory(name), BUNDLE_FILE)))
+        with self._lock:
+            self._known = known
+        return sorted(known)
+
+    def cached_unknown(self, tenants):
+        """ Ids of tenants not in the known set, without touching the disk. """
+        with self._lock:
+            return {tenant for tenant in tenants if tenant not in self._known}
+
+    def unknown_tenants(self, tenants):
+        """ Ids of tenants without a bundle; root is listed again only if an id is not known yet. """
+        missing = self.cached_unknown(tenants)
+        if missing:
+            self.tenants()
+            missing = self.cached_unknown(missing)
+        return missing
+
+    def has_tenant(self, tenant):
+        """ True if tenant is a plain name with a bundle under root. """
+        return self._valid_name(tenant) and not self.unknown_tenants([tenant])
+
+    def tenant_id(self, record):
+        """ Tenant named by the record (not checked against the bundles on disk). """
+        tenant = record.get(self.tenant_field, self.default_tenant)
+        if tenant is None:
+            raise ValueError(f"record without '{self.tenant_field}' (and no default tenant)")
+        return str(tenant)
+
+    # -----------------------------
+    # Loading / eviction
+    # -----------------------------
+    @staticmethod
+    def _estimate_bytes(directory, scorer):
+        size = os.path.getsize(os.path.join(directory, BUNDLE_FILE))
+        size += int(getattr(scorer, "text_cache_mb", 0) * 2 ** 20)
+        allowlist = getattr(scorer, "allowlist", None)
+        if allowlist is not None:
+            size += allowlist.sketch.nbytes
+        return size
+
+    def get(self, tenant):
+        """
+        Scorer of a tenant, loaded on first use; marks the tenant most recently used.
+        """
+        with self._lock:
+            if tenant in self._resident:
+                self._resident.move_to_end(tenant)
+                self.hits += 1
+                return self._resident[tenant][0]
+
+        if not self.has_tenant(tenant):
+            raise UnknownTenantError(tenant)
+        # loaded outside the lock: stats() is not blocked while a bundle is read
+        directory = self.model_directory(tenant)
+        start = time.perf_counter()
+        scorer = self.scorer_factory(directory)
+        size = self._estimate_bytes(directory, scorer)
+
+        with self._lock:
+            self.load_seconds += time.perf_counter() - start
+            self.loads += 1
+            self._resident[tenant] = (scorer, size)
+            self.bytes += size
+        self._evict(keep=tenant)
+        return scorer
+
+    def _over_budget(self):
+        if len(self._resident) > self.max_resident:
+            return True
+        return self.memory_budget is not None and self.bytes > self.memory_budget
+
+    def _evict(self, keep=None):
+        with self._lock:
+            tenants = list(self._resident)
+        for tenant in tenants:
+            with self._lock:
+                if not self._over_budget():
+                    break
+            if tenant != keep:
+                self.unload(tenant)
+                with self._lock:
+                    self.evictions += 1
+
+    def unload(self, tenant):
+        """ Drop a resident tenant (its scorer is closed, e.g. to save its allowlist). """
+        with self._lock:
+            scorer, size = self._resident.pop(tenant)
+            self.bytes -= size
+        if hasattr(scorer, "close"):
+            scorer.close()
+
+    def close(self):
+        with self._lock:
+            tenants = list(self._resident)
+        for tenant in tenants:
+            self.unload(tenant)
+
+    # -----------------------------
+    # Scoring
+    # -----------------------------
+    def score_records(self, records):
+        """
+        :param records: list of dicts with the raw log columns and the tenant id in tenant_field
+        :return: list of {"tenant", "anomaly_score", "predicted_anomaly"}, in the order of records
+        """
+        groups = OrderedDict()
+        for i, record in enumerate(records):
+            groups.setdefault(self.tenant_id(record), []).append(i)
+
+        results = [None] * len(records)
+        for tenant, rows in groups.items():
+            scored = self.get(tenant).score_records([records[i] for i in rows])
+            for i, result in zip(rows, scored):
+                results[i] = {"tenant": tenant, **result}
+        return results
+
+    def stats(self):
+        """ Snapshot taken under the lock, safe to call while another thread scores. """
+        with self._lock:
+            return {
+                "root": self.root,
+                "known_tenants": len(self._known),
+                "resident": list(self._resident),
+                "resident_mb": round(self.bytes / 2 ** 20, 2),
+                "max_resident": self.max_resident,
+                "memory_budget_mb": round(self.memory_budget / 2 ** 20, 2) if self.memory_budget else None,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "load_seconds": round(self.load_seconds, 3),
+            }
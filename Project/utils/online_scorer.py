@@ -0,0 +1,144 @@
+# utils/online_scorer.py
+"""
+Score raw command-log records with a saved model bundle.
+
+records (list of dicts / DataFrame)
+    -> [optional BenignAllowlist fast path: known-benign tuples get a cached low score]
+    -> FeaturePipeline.transform (fitted at training time; command TF-IDF rows memoized in an LRU cache)
+    -> MetaAgent.score (tuned weights; repeated rows of a batch are scored once)
+    -> anomaly_score + predicted_anomaly (tuned threshold)
+"""
+import numpy as np
+import pandas as pd
+
+from .dedup import DedupScorer
+from .model_io import load_bundle
+from .preprocessing import agent_inputs
+
+# value types a raw record may carry (JSON scalars); nested lists / objects cannot be featurized
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def typical_benign_score(bundle):
+    """
+    Cached score of allowlisted records: the median calibration score of the model
+    (MetaAgent sketch, else the bundle's reference sample), well below the alert threshold.
+    """
+    meta_agent = bundle.meta_agent
+    if meta_agent.score_sketch is not None:
+        score = float(meta_agent.score_sketch.quantile(0.5))
+    elif bundle.reference is not None:
+        score = float(np.median(bundle.reference["scores"]))
+    else:
+        raise ValueError("The allowlist needs a calibrated bundle (rerun main.py / batch_main.py).")
+    # a fast-path record must never raise an alert
+    return score if score < bundle.threshold else float(np.nextafter(bundle.threshold, -np.inf))
+
+
+class OnlineScorer:
+    """
+    Scoring front-end around a ModelBundle. Scoring mutates state: the per-user / per-host
+    behavior windows of the pipeline, the allowlist counters and the command-text cache.
+    Not thread-safe: call it from one thread at a time, with records in arrival order.
+    """
+
+    def __init__(self, bundle, dedup=True, allowlist=None, text_cache_mb=64):
+        """
+        :param dedup: score each distinct feature row of a batch once (utils.dedup)
+        :param allowlist: optional utils.benign_allowlist.BenignAllowlist used as a fast path
+        :param text_cache_mb: memory budget of the command-text featurization cache (0 disables it)
+        """
+        self.bundle = bundle
+        self.dedup = DedupScorer(bundle.meta_agent) if dedup else None
+        self.allowlist = allowlist
+        self.benign_score = typical_benign_score(bundle) if allowlist is not None else None
+        self.text_cache_mb = text_cache_mb
+        bundle.pipeline.enable_text_cache(int(text_cache_mb * 2 ** 20))
+
+    @classmethod
+    def from_directory(cls, directory, **kwargs):
+        return cls(load_bundle(directory), **kwargs)
+
+    def with_bundle(self, bundle):
+        """ A scorer with the same options (and allowlist) around another bundle, e.g. a retrained one. """
+        return OnlineScorer(bundle, dedup=self.dedup is not None, allowlist=self.allowlist,
+                            text_cache_mb=self.text_cache_mb)
+
+    @property
+    def text_cache(self):
+        return self.bundle.pipeline.text_cache_
+
+    @property
+    def threshold(self):
+        return self.bundle.threshold
+
+    def close(self):
+        """ Persist the allowlist counters (when the allowlist has a path). """
+        if self.allowlist is not None and self.allowlist.path:
+            self.allowlist.save()
+
+    def score_features(self, df, behavior=None):
+        """
+        :param behavior: behavior features of df already computed with pipeline.update_behavior()
+        :return: (feature matrix, anomaly scores) for the rows of df
+        """
+        X_full = self.bundle.pipeline.transform(df, behavior=behavior)
+        scorer = self.dedup if self.dedup is not None else self.bundle.meta_agent
+        return X_full, scorer.score(agent_inputs(X_full))
+
+    def score_partitioned(self, df):
+        """
+        Score df, sending known-benign records through the allowlist fast path.
+        :return: (anomaly scores of every row, mask of the fast-path rows, feature matrix of the other rows)
+        """
+        pipeline = self.bundle.pipeline
+        # every record advances the per-user / per-host windows once, in arrival order, whether it
+        # then takes the fast path or not; staged, so a batch that fails to score (and is retried,
+        # e.g. request by request in serve.py) does not advance them
+        behavior = pipeline.update_behavior(df, staged=True)
+        try:
+            result = self._score_partitioned(df, behavior)
+        except Exception:
+            pipeline.rollback_behavior()
+            raise
+        pipeline.commit_behavior()
+        return result
+
+    def _score_partitioned(self, df, behavior):
+        allowlist = self.allowlist
+        if allowlist is None:
+            X_full, scores = self.score_features(df, behavior=behavior)
+            return scores, np.zeros(len(df), dtype=bool), X_full
+
+        keys = allowlist.keys(df)
+        fast = allowlist.lookup(df, keys=keys)
+        scores = np.full(len(df), self.benign_score)
+        X_full = None
+        if not fast.all():
+            slow_behavior = behavior[~fast] if behavior is not None else None
+            X_full, scores[~fast] = self.score_features(df[~fast], behavior=slow_behavior)
+
+        if allowlist.learn_online:
+            allowlist.confirm(df, mask=~fast & (scores <= self.benign_score), keys=keys)
+        allowlist.maintain()
+        return scores, fast, X_full
+
+    def score_frame(self, df):
+        """
+        :return: (anomaly scores, binary predictions) as np.arrays, one entry per row of df
+        """
+        scores, _, _ = self.score_partitioned(df)
+        return scores, (scores >= self.bundle.threshold).astype(int)
+
+    def score_records(self, records):
+        """
+        :param records: list of dicts with the raw log columns (missing columns are treated as missing values)
+        :return: list of {"anomaly_score": float, "predicted_anomaly": int}
+        """
+        if not records:
+            return []
+        scores, predictions = self.score_frame(pd.DataFrame.from_records(records))
+        return [
+            {"anomaly_score": float(score), "predicted_anomaly": int(prediction)}
+            for score, prediction in zip(scores, predictions)
+        ]
@@ -5,6 +5,9 @@ import re
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import StandardScaler
 
+from .behavior_features import BehaviorFeatures
+from .text_cache import TextVectorCache
+
 # -----------------------------
 # Encode labels
 # -----------------------------
@@ -46,9 +49,18 @@ def process_timestamp(X, timestamp_col):
 # -----------------------------
 # Handle missing values
 # -----------------------------
-def handle_missing_values(X, numeric_cols, categorical_cols):
+def handle_missing_values(X, numeric_cols, categorical_cols, medians=None):
+    """
+    :param medians: fill values for numeric_cols (default: medians of X itself)
+    """
     X = X.copy()
-    X[numeric_cols] = X[numeric_cols].fillna(X[numeric_cols].median())
+    if medians is None:
+        medians = X[numeric_cols].median()
+    X[numeric_cols] = X[numeric_cols].fillna(medians)
+    for col in categorical_cols:
+        if isinstance(X[col].dtype, pd.CategoricalDtype) and X[col].isna().any():
+            if 'Unknown' not in X[col].cat.categories:
+                X[col] = X[col].cat.add_categories('Unknown')
     X[categorical_cols] = X[categorical_cols].fillna('Unknown')
     if 'command_text' in X.columns:
         X['command_text'] = X['command_text'].fillna('').astype(str)
@@ -56,14 +68,54 @@ def handle_missing_values(X, numeric_cols, categorical_cols):
 
 
 
+# -----------------------------
+# Frequency encoding
+# -----------------------------
+def frequency_encode(series):
+    """
+    Replace each value by how often it occurs.
+    Category columns are counted directly on their integer codes (one bincount),
+    other columns fall back to value_counts on the raw values.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        counts = np.bincount(codes, minlength=len(series.cat.categories))
+        return pd.Series(counts[codes], index=series.index)
+
+    return series.map(series.value_counts())
+
+
+def frequency_table(series):
+    """ {value: count} learned on the training data (see apply_frequency). """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        counts = np.bincount(series.cat.codes.to_numpy(), minlength=len(series.cat.categories))
+        return dict(zip(series.cat.categories.tolist(), counts.tolist()))
+    return series.value_counts().to_dict()
+
+
+def apply_frequency(series, table):
+    """
+    Frequency-encode with counts learned at fit time; values never seen in training get 0.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        lookup = np.array([table.get(c, 0) for c in series.cat.categories] + [0], dtype=np.int64)
+        # code -1 (missing) reads the trailing 0
+        return pd.Series(lookup[series.cat.codes.to_numpy()], index=series.index)
+    return series.map(table).fillna(0).astype(np.int64)
+
+
 # -----------------------------
 # Remove highly correlated features
 # -----------------------------
-def remove_highly_correlated(X, numeric_cols, threshold=0.95):
-    X = X.copy()
+def find_highly_correlated(X, numeric_cols, threshold=0.95):
     corr_matrix = X[numeric_cols].corr().abs()
     upper_tri = corr_matrix.where(~np.tril(np.ones(corr_matrix.shape)).astype(bool))
-    to_drop = [col for col in upper_tri.columns if any(upper_tri[col] > threshold)]
+    return [col for col in upper_tri.columns if any(upper_tri[col] > threshold)]
+
+
+def remove_highly_correlated(X, numeric_cols, threshold=0.95):
+    X = X.copy()
+    to_drop = find_highly_correlated(X, numeric_cols, threshold)
     X = X.drop(columns=to_drop)
     numeric_cols = [col for col in numeric_cols if col not in to_drop]
     return X, numeric_cols
@@ -90,6 +142,232 @@ def tfidf_vectorize(df, column='command_text', max_features=512):
                         columns=[f"{column}_tfidf_{i}" for i in range(X_tfidf.shape[1])])
 
 
+# -----------------------------
+# Fitted feature pipeline (fit once, transform new records)
+# -----------------------------
+TIME_FEATURES = [
+    'hour_sin','hour_cos','minute_sin','minute_cos',
+    'day_sin','day_cos','dow_sin','dow_cos',
+    'month_sin','month_cos'
+]
+
+
+class FeaturePipeline:
+    """
+    The preprocess_for_metaagent() steps as a fit/transform object.
+
+    fit_transform() learns everything that depends on the data (column roles,
+    medians, frequency tables, dropped correlated columns, TF-IDF vocabulary,
+    scaler) and transform() re-applies that state to new records, e.g. online.
+
+    With behavior_features=True, per-user / per-host rolling aggregates
+    (utils.behavior_features) are added as numeric columns. Their state keeps
+    evolving: transform() continues from the training events, as a stream would.
+
+    enable_text_cache() memoizes the cleaned + TF-IDF row of every command string
+    seen by transform() (utils.text_cache); the cache is not pickled with the pipeline.
+    """
+
+    # class-level default: pipelines pickled before the cache existed load without one
+    text_cache_ = None
+
+    def __init__(self, text_col='command_text', label_col=None, timestamp_col=None,
+                 tfidf_max_features=512, corr_threshold=0.95, behavior_features=False):
+        self.text_col = text_col
+        self.label_col = label_col
+        self.timestamp_col = timestamp_col
+        self.tfidf_max_features = tfidf_max_features
+        self.corr_threshold = corr_threshold
+
+        self.behavior_ = None
+        if behavior_features:
+            if not timestamp_col:
+                raise ValueError("behavior_features needs a timestamp_col.")
+            self.behavior_ = BehaviorFeatures(timestamp_col=timestamp_col)
+
+        self.input_columns_ = None
+        self.numeric_cols_ = None
+        self.categorical_cols_ = None
+        self.medians_ = None
+        self.frequency_tables_ = None
+        self.feature_cols_ = None
+        self.vectorizer_ = None
+        self.scaler_ = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("text_cache_", None)
+        return state
+
+    def enable_text_cache(self, max_bytes=64 * 2 ** 20):
+        """
+        Memoize command-text featurization in transform() within a memory budget (None/0 disables it).
+        """
+        if not max_bytes or self.vectorizer_ is None:
+            self.text_cache_ = None
+        else:
+            self.text_cache_ = TextVectorCache(self.vectorizer_, clean_text_column, max_bytes=max_bytes)
+        return self.text_cache_
+
+    def _prepare(self, df, fit=False, behavior=None):
+        """ Shared first steps: copy, split off labels, behavior + timestamp features. """
+        df = df.copy()
+
+        y_encoded = None
+        if self.label_col and self.label_col in df.columns:
+            y_encoded = encode_labels(df[self.label_col])
+            df = df.drop(columns=[self.label_col])
+
+        # needs the raw timestamps, so before process_timestamp drops them
+        if behavior is None and self.behavior_ is not None:
+            behavior = self.behavior_.fit_transform(df) if fit else self.behavior_.transform(df)
+
+        if self.timestamp_col and self.timestamp_col in df.columns:
+            df = process_timestamp(df, self.timestamp_col)
+
+        if behavior is not None:
+            df[behavior.columns] = behavior
+
+        return df, y_encoded
+
+    def fit_transform(self, df):
+        """
+        :return: X_full (np.array), y_encoded (None if there is no label column)
+        """
+        self.input_columns_ = [col for col in df.columns if col != self.label_col]
+
+        # Identify numeric/categorical on the raw columns
+        raw = df[self.input_columns_]
+        numeric_cols = raw.select_dtypes(include="number").columns.tolist()
+        categorical_cols = raw.select_dtypes(include=["object", "category"]).columns.tolist()
+        if self.text_col in categorical_cols:
+            categorical_cols.remove(self.text_col)
+
+        df, y_encoded = self._prepare(df, fit=True)
+        if self.timestamp_col and self.timestamp_col in self.input_columns_:
+            numeric_cols += TIME_FEATURES
+            categorical_cols = [col for col in categorical_cols if col in df.columns]
+        if self.behavior_ is not None:
+            numeric_cols += self.behavior_.feature_names
+
+        self.numeric_cols_ = numeric_cols
+        self.categorical_cols_ = categorical_cols
+
+        # Handle missing values
+        self.medians_ = df[numeric_cols].median()
+        df = handle_missing_values(df, numeric_cols, categorical_cols, medians=self.medians_)
+
+        # Frequency Encoding for categorical features
+        self.frequency_tables_ = {}
+        for col in categorical_cols:
+            self.frequency_tables_[col] = frequency_table(df[col])
+            df[col] = apply_frequency(df[col], self.frequency_tables_[col])
+
+        # Remove highly correlated numeric features
+        candidates = numeric_cols + categorical_cols
+        to_drop = find_highly_correlated(df, candidates, self.corr_threshold)
+        self.feature_cols_ = [col for col in candidates if col not in to_drop]
+
+        # TF-IDF
+        X_tfidf = None
+        if self.text_col in df.columns:
+            df = clean_text_column(df, self.text_col)
+            self.vectorizer_ = TfidfVectorizer(max_features=self.tfidf_max_features)
+            X_tfidf = self.vectorizer_.fit_transform(df[self.text_col]).toarray()
+
+        # Scaling
+        X_numeric = None
+        if self.feature_cols_:
+            self.scaler_ = StandardScaler()
+            X_numeric = self.scaler_.fit_transform(df[self.feature_cols_].values)
+
+        return self._combine(X_numeric, X_tfidf), y_encoded
+
+    def fit(self, df):
+        self.fit_transform(df)
+        return self
+
+    def feature_names(self):
+        """ Names of the transform() columns: scaled numeric / encoded columns, then 'tfidf:<term>'. """
+        if self.feature_cols_ is None:
+            raise ValueError("FeaturePipeline not fitted. Call fit() first.")
+        names = list(self.feature_cols_) if self.scaler_ is not None else []
+        if self.vectorizer_ is not None:
+            names += [f"tfidf:{term}" for term in self.vectorizer_.get_feature_names_out()]
+        return names
+
+    def update_behavior(self, df, staged=False):
+        """
+        Advance the per-user / per-host windows with the records of df, in row order.
+        :param staged: keep the update undoable until commit_behavior() / rollback_behavior()
+        :return: their behavior features (aligned with df.index), None without behavior features
+        """
+        if self.behavior_ is None:
+            return None
+        df = df.reindex(columns=self.input_columns_)
+        return self.behavior_.stage(df) if staged else self.behavior_.transform(df)
+
+    def commit_behavior(self):
+        if self.behavior_ is not None:
+            self.behavior_.commit()
+
+    def rollback_behavior(self):
+        if self.behavior_ is not None:
+            self.behavior_.rollback()
+
+    def transform(self, df, behavior=None):
+        """
+        Features for new records with the fitted state.
+        Missing input columns are treated as missing values; a label column is ignored.
+        :param behavior: features of these rows from update_behavior() (the windows are then not advanced again)
+        """
+        if self.feature_cols_ is None:
+            raise ValueError("FeaturePipeline not fitted. Call fit() first.")
+
+        df = df.reindex(columns=self.input_columns_)
+        df, _ = self._prepare(df, behavior=behavior)
+
+        # records decoded from JSON / CSV text may carry numbers as strings
+        for col in self.numeric_cols_:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        df = handle_missing_values(df, self.numeric_cols_, self.categorical_cols_, medians=self.medians_)
+        for col, table in self.frequency_tables_.items():
+            df[col] = apply_frequency(df[col], table)
+
+        X_tfidf = None
+        if self.text_cache_ is not None:
+            X_tfidf = self.text_cache_.transform(df[self.text_col]).toarray()
+        elif self.vectorizer_ is not None:
+            df = clean_text_column(df, self.text_col)
+            X_tfidf = self.vectorizer_.transform(df[self.text_col]).toarray()
+
+        X_numeric = None
+        if self.scaler_ is not None:
+            X_numeric = self.scaler_.transform(df[self.feature_cols_].astype(float).values)
+
+        return self._combine(X_numeric, X_tfidf)
+
+    @staticmethod
+    def _combine(X_numeric, X_tfidf):
+        # Combine numeric + TF-IDF
+        if X_numeric is not None and X_tfidf is not None:
+            return np.hstack([X_numeric, X_tfidf])
+        if X_numeric is not None:
+            return X_numeric
+        if X_tfidf is not None:
+            return X_tfidf
+        raise ValueError("No features available for preprocessing.")
+
+
+def agent_inputs(X_full):
+    """ Prepare X_dict for MetaAgent: every agent receives numeric + TF-IDF. """
+    return {
+        "IsolationForest": X_full,
+        "Autoencoder": X_full,
+        "OneClassSVM": X_full
+    }
+
+
 # -----------------------------
 # Full preprocessing + prepare dict for MetaAgent
 # -----------------------------
@@ -98,79 +376,26 @@ def preprocess_for_metaagent(
     text_col='command_text',
     label_col=None,
     timestamp_col=None,
-    tfidf_max_features=512
+    tfidf_max_features=512,
+    return_pipeline=False,
+    behavior_features=False
 ):
     """
     Returns: X_dict (dict of np.arrays), y_encoded (if label exists)
     Each agent receives numeric + TF-IDF
+    :param return_pipeline: also return the fitted FeaturePipeline (to transform new records later)
+    :param behavior_features: add per-user / per-host rolling aggregates (needs timestamp_col)
     """
-    df = df.copy()
-
-    # Encode labels
-    y_encoded = None
-    if label_col and label_col in df.columns:
-        y_encoded = encode_labels(df[label_col])
-        df = df.drop(columns=[label_col])
-
-    # Identify numeric/categorical
-    numeric_cols = df.select_dtypes(include="number").columns.tolist()
-    categorical_cols = df.select_dtypes(include="object").columns.tolist()
-    if text_col in categorical_cols:
-        categorical_cols.remove(text_col)
-
-    # Process timestamp
-    if timestamp_col and timestamp_col in df.columns:
-        df = process_timestamp(df, timestamp_col)
-        new_time_features = [
-            'hour_sin','hour_cos','minute_sin','minute_cos',
-            'day_sin','day_cos','dow_sin','dow_cos',
-            'month_sin','month_cos'
-        ]
-        numeric_cols += new_time_features
-        categorical_cols = [col for col in categorical_cols if col in df.columns]
-
-    # Handle missing values
-    df = handle_missing_values(df, numeric_cols, categorical_cols)
-
-    # Frequency Encoding for categorical features
-    if categorical_cols:
-        for col in categorical_cols:
-            freq_map = df[col].value_counts()
-            df[col] = df[col].map(freq_map)
-
-        numeric_cols += categorical_cols
-
-    # Remove highly correlated numeric features
-    df, numeric_cols = remove_highly_correlated(df, numeric_cols)
-
-    # TF-IDF
-    X_tfidf = tfidf_vectorize(df, column=text_col, max_features=tfidf_max_features) if text_col in df.columns else None
-
-    # Numeric array
-    X_numeric = df[numeric_cols].values if numeric_cols else None
-
-    # ==========================
-    # SCALING
-    # ==========================
-    if X_numeric is not None:
-        scaler = StandardScaler()
-        X_numeric = scaler.fit_transform(X_numeric)
-
-    # Combine numeric + TF-IDF
-    if X_numeric is not None and X_tfidf is not None:
-        X_full = np.hstack([X_numeric, X_tfidf.values])
-    elif X_numeric is not None:
-        X_full = X_numeric
-    elif X_tfidf is not None:
-        X_full = X_tfidf.values
-    else:
-        raise ValueError("No features available for preprocessing.")
-
-    # Prepare X_dict for MetaAgent
-    X_dict = {
-        "IsolationForest": X_full,
-        "Autoencoder": X_full,
-        "OneClassSVM": X_full
-    }
+    pipeline = FeaturePipeline(
+        text_col=text_col,
+        label_col=label_col,
+        timestamp_col=timestamp_col,
+        tfidf_max_features=tfidf_max_features,
+        behavior_features=behavior_features
+    )
+    X_full, y_encoded = pipeline.fit_transform(df)
+    X_dict = agent_inputs(X_full)
 
-    return X_dict, y_encoded
\ No newline at end of file
+    if return_pipeline:
+        return X_dict, y_encoded, pipeline
+    return X_dict, y_encoded
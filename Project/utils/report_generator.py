@@ -1,12 +1,18 @@
 # report_generator.py
+import io
 import os
+from concurrent.futures import ThreadPoolExecutor
+
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.utils import ImageReader
-from sklearn.metrics import confusion_matrix
 import pandas as pd
 
+from .metrics import classification_metrics
+
 
 def export_metrics_to_csv(filename, agents_info, ensemble_info=None):
     rows = []
@@ -37,11 +43,15 @@ def export_metrics_to_csv(filename, agents_info, ensemble_info=None):
     print(f"Metrics CSV saved to: {filename}")
 
 def generate_pdf_report(filename, agents_info, ensemble_info, weights=None):
+    """
+    Write the PDF report.
+    Each info dict's 'graph' may be a PNG file path or an in-memory buffer (io.BytesIO).
+    """
     c = canvas.Canvas(filename, pagesize=A4)
     width, height = A4
     y = height - 50
 
-    def write_section(title, metrics, graph_path, show_weights=False):
+    def write_section(title, metrics, graph, show_weights=False):
         nonlocal y
         c.setFont("Helvetica-Bold", 14)
         c.drawString(50, y, f"----- {title} -----")
@@ -68,8 +78,8 @@ def generate_pdf_report(filename, agents_info, ensemble_info, weights=None):
                 y -= 20
 
         # Draw graph
-        if os.path.exists(graph_path):
-            img = ImageReader(graph_path)
+        if graph is not None and (hasattr(graph, "read") or os.path.exists(graph)):
+            img = ImageReader(graph)
             img_width, img_height = img.getSize()
             max_width = 400
             max_height = 200
@@ -95,18 +105,25 @@ def generate_pdf_report(filename, agents_info, ensemble_info, weights=None):
 
     # Write individual agents
     for info in agents_info:
-        write_section(info['name'], info['metrics'], info['graph'])
+        write_section(info['name'], info['metrics'], info.get('graph'))
 
     # Write ensemble (with named weights)
-    write_section("Ensemble", ensemble_info['metrics'], ensemble_info['graph'], show_weights=True)
+    write_section("Ensemble", ensemble_info['metrics'], ensemble_info.get('graph'), show_weights=True)
 
     c.save()
 
 
-def plot_confusion_matrix_graph(y_true, y_pred, title, path):
-    cm = confusion_matrix(y_true, y_pred)
-    fig, ax = plt.subplots(figsize=(4, 3))
-    im = ax.imshow(cm, cmap='Blues')
+def plot_confusion_matrix_graph(y_true, y_pred, title, path=None):
+    """
+    Render a confusion matrix figure.
+    Saves to path if given, otherwise returns an in-memory PNG buffer.
+    Uses the object-oriented Figure API (no pyplot state), so it is safe to call from threads.
+    """
+    cm = classification_metrics(y_true, y_pred)["cm"]
+    fig = Figure(figsize=(4, 3))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.imshow(cm, cmap='Blues')
 
     for i in range(cm.shape[0]):
         for j in range(cm.shape[1]):
@@ -115,34 +132,73 @@ def plot_confusion_matrix_graph(y_true, y_pred, title, path):
     ax.set_xlabel("Predicted")
     ax.set_ylabel("Actual")
     ax.set_title(title)
-    plt.tight_layout()
-    fig.savefig(path)
-    plt.close(fig)
+    # fixed margins: tight_layout would render the figure a second time just to measure it
+    fig.subplots_adjust(left=0.15, right=0.97, bottom=0.17, top=0.88)
+
+    if path is not None:
+        fig.savefig(path)
+        return path
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    buffer.seek(0)
+    return buffer
+
+
+def render_confusion_matrices(figures, max_workers=None):
+    """
+    Render several confusion matrices concurrently into in-memory PNG buffers.
+    :param figures: list of (y_true, y_pred, title)
+    :return: list of io.BytesIO, in the same order
+    """
+    if not figures:
+        return []
+
+    max_workers = max_workers or min(len(figures), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda f: plot_confusion_matrix_graph(*f), figures))
+
+
+def find_enterprise_summaries(results_folder="Results"):
+    """
+    Discover every {name}/{name}_metrics_summary.csv under results_folder.
+    :return: dict {enterprise_name: csv_path}
+    """
+    files = {}
+    if not os.path.isdir(results_folder):
+        return files
+
+    for name in sorted(os.listdir(results_folder)):
+        path = os.path.join(results_folder, name, f"{name}_metrics_summary.csv")
+        if os.path.exists(path):
+            files[name] = path
 
+    return files
 
-def compare_enterprises(results_folder="Results"):
 
-    files = {
-        "Enterprise_A": f"{results_folder}/Enterprise_A/Enterprise_A_metrics_summary.csv",
-        "Enterprise_B": f"{results_folder}/Enterprise_B/Enterprise_B_metrics_summary.csv",
-        "Enterprise_C": f"{results_folder}/Enterprise_C/Enterprise_C_metrics_summary.csv",
-    }
+def compare_enterprises(results_folder="Results", enterprises=None):
+    """
+    Plot per-agent metrics side by side for every enterprise with a metrics summary.
+    :param enterprises: optional list of enterprise names to compare (default: all found)
+    """
+    files = find_enterprise_summaries(results_folder)
+    if enterprises is not None:
+        files = {name: path for name, path in files.items() if name in enterprises}
 
-    for f in files.values():
-        if not os.path.exists(f):
-            print("❌ Not all enterprise CSV files exist. Skipping comparison.")
-            return
+    if not files:
+        print("❌ No enterprise metrics CSV files found. Skipping comparison.")
+        return
 
-    print("✅ All enterprise CSV files found. Generating comparison graphs...")
+    print(f"✅ Found metrics for {', '.join(files)}. Generating comparison graphs...")
 
     # יצירת תיקיית output
     output_folder = os.path.join(results_folder, "Enterprise_Comparison")
     os.makedirs(output_folder, exist_ok=True)
 
     # טעינת הטבלאות
-    dfs = {name: pd.read_csv(path) for name, path in files.items()}
+    dfs = {name: pd.read_csv(path).set_index("Agent name") for name, path in files.items()}
 
-    agents = dfs["Enterprise_A"]["Agent name"]
+    agents = list(dict.fromkeys(agent for df in dfs.values() for agent in df.index))
 
     metrics = ["Recall", "Precision", "F1 Score"]
 
@@ -150,17 +206,17 @@ def compare_enterprises(results_folder="Results"):
 
         fig, ax = plt.subplots(figsize=(8, 5))
 
-        width = 0.25
+        width = 0.75 / len(dfs)
         x = range(len(agents))
 
         for i, (enterprise, df) in enumerate(dfs.items()):
-            values = df[metric]
+            values = df[metric].reindex(agents).fillna(0)
             positions = [p + width * i for p in x]
 
             ax.bar(positions, values, width=width, label=enterprise)
 
         ax.set_title(f"{metric} Comparison Across Enterprises")
-        ax.set_xticks([p + width for p in x])
+        ax.set_xticks([p + width * (len(dfs) - 1) / 2 for p in x])
         ax.set_xticklabels(agents, rotation=30)
         ax.set_ylabel(metric)
         ax.legend()
@@ -0,0 +1,162 @@
+# utils/results_writer.py
+"""
+Streaming writer for scored anomaly results.
+
+Formats:
+- parquet: columnar, compressed, dictionary-encoded string columns (default)
+- arrow:   Arrow IPC stream (.arrows), compressed record batches
+- csv:     plain CSV, appended batch by batch
+
+Parquet / Arrow need the optional pyarrow dependency.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# repeated string columns of the command logs -> dictionary encoding
+DICTIONARY_COLUMNS = [
+    "host_id", "user_id", "user_role", "process_name",
+    "parent_process", "script_type", "execution_result", "is_anomaly",
+]
+
+EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrows", "csv": ".csv"}
+
+
+def top_features_column(indices, shares, feature_names, mask=None):
+    """
+    Readable per-row attributions for the export, e.g. 'tfidf:sudo=0.41; hour=0.22'.
+    :param indices, shares: (num_rows, top_k) output of an agent's score_with_attribution()
+    :param mask: only describe these rows (e.g. predicted anomalies); the others get ''
+                 (an empty string, not null, so every batch keeps the same column type)
+    """
+    rows = np.flatnonzero(mask) if mask is not None else np.arange(len(indices))
+    column = np.full(len(indices), "", dtype=object)
+    for row in rows:
+        column[row] = "; ".join(
+            f"{feature_names[i]}={share:.2f}" for i, share in zip(indices[row], shares[row]) if share > 0
+        )
+    return column
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "pyarrow is required for Parquet/Arrow results. "
+            "Install it with 'pip install pyarrow' or use format='csv'."
+        ) from e
+    return pa, pq
+
+
+def results_path(base_path, fmt):
+    """ Results/Enterprise_A/Enterprise_A_anomaly_results + parquet -> ....parquet """
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Unknown results format '{fmt}'. Available: {', '.join(EXTENSIONS)}")
+    return base_path + EXTENSIONS[fmt]
+
+
+class ResultsWriter:
+    """
+    Streams DataFrame batches to a single results file.
+
+    Usage:
+        with ResultsWriter(path, fmt="parquet") as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+    """
+
+    def __init__(self, path, fmt="parquet", dictionary_columns=None, compression="zstd"):
+        if fmt not in EXTENSIONS:
+            raise ValueError(f"Unknown results format '{fmt}'. Available: {', '.join(EXTENSIONS)}")
+
+        self.path = path
+        self.fmt = fmt
+        self.dictionary_columns = DICTIONARY_COLUMNS if dictionary_columns is None else dictionary_columns
+        self.compression = compression
+        self.rows_written = 0
+
+        self._writer = None
+        self._schema = None
+
+        if fmt != "csv":
+            self._pa, self._pq = _require_pyarrow()
+
+        if os.path.exists(path):
+            os.remove(path)
+
+    # =========================
+    # Writing
+    # =========================
+    def _to_table(self, df):
+        pa = self._pa
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        for col in self.dictionary_columns:
+            if col in table.column_names and not pa.types.is_dictionary(table.schema.field(col).type):
+                i = table.column_names.index(col)
+                encoded = table.column(col).cast(pa.string()).dictionary_encode()
+                table = table.set_column(i, pa.field(col, encoded.type), encoded)
+
+        if self._schema is None:
+            self._schema = table.schema
+        return table.cast(self._schema)
+
+    def write_batch(self, df):
+        if len(df) == 0:
+            return
+
+        if self.fmt == "csv":
+            df.to_csv(self.path, mode="a", header=self.rows_written == 0, index=False)
+
+        else:
+            table = self._to_table(df)
+
+            if self._writer is None:
+                if self.fmt == "parquet":
+                    self._writer = self._pq.ParquetWriter(
+                        self.path, self._schema,
+                        compression=self.compression,
+                        use_dictionary=True
+                    )
+                else:
+                    options = self._pa.ipc.IpcWriteOptions(compression=self.compression)
+                    self._writer = self._pa.ipc.new_stream(self.path, self._schema, options=options)
+
+            self._writer.write_table(table)
+
+        self.rows_written += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+def read_results(path, columns=None):
+    """
+    Read a results file, loading only the requested columns when the format allows it.
+    """
+    if path.endswith(EXTENSIONS["parquet"]):
+        return pd.read_parquet(path, columns=columns)
+
+    if path.endswith(EXTENSIONS["arrow"]):
+        pa, _ = _require_pyarrow()
+        with pa.ipc.open_stream(path) as reader:
+            table = reader.read_all()
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+
+    return pd.read_csv(path, usecols=columns)
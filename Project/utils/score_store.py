@@ -0,0 +1,114 @@
+# utils/score_store.py
+from collections import Counter
+
+import numpy as np
+
+from .dedup import RowDedup
+
+
+class ScoreStore:
+    """
+    Memoizes anomaly scores per (agent, split).
+
+    Every consumer (threshold tuning, evaluation, ensemble search, export)
+    reads scores from here, so each model runs inference once per split.
+    With dedup=True, each distinct feature row of a split is scored once (utils.dedup).
+    attribution() explains only the rows asked for (e.g. the flagged ones), so the
+    extra cost of attribution does not grow with the unflagged rows.
+    """
+
+    def __init__(self, splits=None, dedup=False, min_saving=0.05):
+        """
+        :param splits: optional dict {split_name: X_dict}
+        :param dedup: score repeated feature rows once and broadcast their scores
+        :param min_saving: only deduplicate if at least this fraction of a split's rows are repeats
+        """
+        self.splits = dict(splits or {})
+        self.dedup = dedup
+        self.min_saving = min_saving
+        self._scores = {}
+        self._dedup = {}  # (split, id(matrix)) -> RowDedup
+        self.inference_counts = Counter()
+
+    def add_split(self, split, X_dict):
+        """
+        Register (or replace) the features of a split. Cached scores of that split are dropped.
+        """
+        self.splits[split] = X_dict
+        self._scores = {key: s for key, s in self._scores.items() if key[1] != split}
+        self._dedup = {key: d for key, d in self._dedup.items() if key[0] != split}
+
+    def get(self, agent, split):
+        """
+        Scores of one agent on one split, computed on first access.
+        """
+        key = (agent.get_name(), split)
+
+        if key not in self._scores:
+            if split not in self.splits:
+                raise KeyError(f"Unknown split '{split}'")
+            X = self.splits[split][agent.get_name()]
+            self._scores[key] = self._score(agent, X, split)
+            self.inference_counts[key] += 1
+
+        return self._scores[key]
+
+    def attribution(self, agent, split, rows, top_k=3):
+        """
+        Top_k features of an attributing agent for the given rows of a split only.
+        :param rows: row positions to explain (e.g. the predicted anomalies)
+        :return: (feature indices, contribution shares), both (num_samples, top_k); other rows are 0
+        """
+        if not agent.supports_attribution:
+            raise KeyError(f"No attribution for {agent.get_name()}")
+        X = self.splits[split][agent.get_name()]
+        indices = np.zeros((X.shape[0], top_k), dtype=np.int64)
+        shares = np.zeros((X.shape[0], top_k))
+        if len(rows):
+            _, indices[rows], shares[rows] = agent.score_with_attribution(X[rows], top_k=top_k)
+        return indices, shares
+
+    def _score(self, agent, X, split):
+        def run(X_block):
+            return np.asarray(agent.score(X_block))
+
+        if not self.dedup:
+            return run(X)
+
+        # agents of a split usually share one matrix: it is hashed once
+        key = (split, id(X))
+        if key not in self._dedup:
+            self._dedup[key] = RowDedup(X)
+        dedup = self._dedup[key]
+
+        if dedup.n_unique > (1 - self.min_saving) * dedup.n_rows:
+            return run(X)
+        return dedup.expand(run(dedup.take(X)))
+
+    def dedup_stats(self):
+        """
+        :return: {split: {"rows", "unique_rows", "unique_ratio"}} of the deduplicated matrices
+        """
+        stats = {}
+        for (split, _), dedup in self._dedup.items():
+            entry = stats.setdefault(split, {"rows": 0, "unique_rows": 0})
+            entry["rows"] += dedup.n_rows
+            entry["unique_rows"] += dedup.n_unique
+        for entry in stats.values():
+            entry["unique_ratio"] = round(entry["unique_rows"] / entry["rows"], 4) if entry["rows"] else 1.0
+        return stats
+
+    def matrix(self, agents, split):
+        """
+        Scores of several agents stacked as (num_agents, num_samples).
+        """
+        return np.array([self.get(agent, split) for agent in agents])
+
+    def invalidate(self, agent=None):
+        """
+        Forget cached scores (of one agent, or all of them), e.g. after refitting.
+        """
+        if agent is None:
+            self._scores.clear()
+        else:
+            self._scores = {key: s for key, s in self._scores.items() if key[0] != agent.get_name()}
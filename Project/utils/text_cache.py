@@ -0,0 +1,119 @@
+# utils/text_cache.py
+"""
+Bounded LRU memo of command-text featurization for online scoring.
+
+FeaturePipeline.transform() cleans (clean_text_column) and TF-IDF-vectorizes
+every record, although the same command strings come back thousands of times
+a day. TextVectorCache maps the raw command string to its cleaned + vectorized
+sparse row, so only strings that are new (or were evicted) are cleaned and
+passed to TfidfVectorizer.transform; text cost tracks distinct commands, not events.
+
+Entries are evicted least-recently-used first once their estimated size
+(key string + row indices / data + bookkeeping) exceeds max_bytes.
+"""
+import sys
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# per-entry bookkeeping (OrderedDict node, tuple, array headers), added to the payload size
+ENTRY_OVERHEAD_BYTES = 300
+
+
+class TextVectorCache:
+    """
+    :param vectorizer: fitted TfidfVectorizer
+    :param clean: function(DataFrame, column) -> DataFrame that cleans the text column in place
+    :param max_bytes: memory budget of the cached entries
+    """
+
+    def __init__(self, vectorizer, clean, max_bytes=64 * 2 ** 20):
+        self.vectorizer = vectorizer
+        self.clean = clean
+        self.max_bytes = max_bytes
+        self.n_features = len(vectorizer.vocabulary_)
+        self._entries = OrderedDict()  # raw string -> (indices, data, size)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def _vectorize(self, texts):
+        """ clean + TF-IDF rows of the given raw strings, as a CSR matrix. """
+        cleaned = self.clean(pd.DataFrame({"text": texts}), "text")["text"]
+        return self.vectorizer.transform(cleaned).tocsr()
+
+    def _insert(self, text, indices, data):
+        size = sys.getsizeof(text) + indices.nbytes + data.nbytes + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+        self._entries[text] = (indices, data, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def transform(self, texts):
+        """
+        :param texts: raw command strings (Series / list; missing values count as '' like in
+                      handle_missing_values, other non-strings are converted with str())
+        :return: CSR matrix (len(texts) x vocabulary size), identical to clean + vectorizer.transform
+        """
+        texts = pd.Series(texts).fillna("").astype(str)
+        codes, uniques = pd.factorize(texts)
+        uniques = list(uniques)
+
+        rows = [None] * len(uniques)
+        missing = []
+        for i, text in enumerate(uniques):
+            entry = self._entries.get(text)
+            if entry is None:
+                missing.append(i)
+            else:
+                self._entries.move_to_end(text)
+                rows[i] = entry
+        # counted per event: a repeated string inside the batch is a hit after its first occurrence
+        counts = np.bincount(codes, minlength=len(uniques))
+        self.misses += len(missing)
+        self.hits += int(counts.sum()) - len(missing)
+
+        if missing:
+            X_missing = self._vectorize([uniques[i] for i in missing])
+            for j, i in enumerate(missing):
+                start, end = X_missing.indptr[j], X_missing.indptr[j + 1]
+                indices, data = X_missing.indices[start:end].copy(), X_missing.data[start:end].copy()
+                rows[i] = (indices, data, None)
+                self._insert(uniques[i], indices, data)
+
+        lengths = np.fromiter((len(row[0]) for row in rows), dtype=np.int64, count=len(rows))
+        indptr = np.concatenate([[0], np.cumsum(lengths)])
+        indices = np.concatenate([row[0] for row in rows]) if rows else np.zeros(0, dtype=np.int32)
+        data = np.concatenate([row[1] for row in rows]) if rows else np.zeros(0)
+        X_unique = sparse.csr_matrix((data, indices, indptr), shape=(len(uniques), self.n_features))
+        return X_unique[codes]
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "mb": round(self.bytes / 2 ** 20, 3),
+            "max_mb": round(self.max_bytes / 2 ** 20, 3),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,198 @@
+# utils/tuning_cache.py
+"""
+Persistent cache for hyperparameter-tuning results.
+
+An entry stores the best parameters and the full score table of one search.
+Its key is a fingerprint of:
+- the matrices / labels the search ran on (dtype, shape and raw bytes)
+- the search space and search settings
+- the library versions that influence the scores
+
+so a rerun on the same data skips the search, while changed data, a changed
+grid or upgraded libraries simply miss the cache.
+Entries are small JSON files in .tuning_cache/ (one file per key).
+"""
+import hashlib
+import json
+import os
+import platform
+from importlib import metadata
+
+import numpy as np
+from scipy import sparse
+
+from .best_hyperparams import find_best_nu, find_best_n_estimators_if
+from .hyperparam_search import SEARCH_SPACES, BUDGETS, successive_halving_search
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(PROJECT_DIR, ".tuning_cache")
+
+VERSIONED_PACKAGES = ["numpy", "scikit-learn", "scipy"]
+
+
+def library_versions(packages=None):
+    versions = {"python": platform.python_version()}
+    for package in packages or VERSIONED_PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def _update_with_array(h, X):
+    if X is None:
+        h.update(b"none")
+        return
+    if sparse.issparse(X):
+        X = X.tocsr()
+        h.update(f"csr{X.shape}".encode())
+        for part in (X.data, X.indices, X.indptr):
+            _update_with_array(h, part)
+        return
+
+    X = np.ascontiguousarray(np.asarray(X))
+    h.update(f"{X.dtype.str}{X.shape}".encode())
+    h.update(X.data if X.dtype != object else repr(X.tolist()).encode())
+
+
+def fingerprint(arrays, config):
+    """
+    blake2b over the arrays (in order) and a JSON-serialisable config dict.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    for X in arrays:
+        _update_with_array(h, X)
+    h.update(json.dumps(config, sort_keys=True, default=_to_json).encode())
+    return h.hexdigest()
+
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (np.ndarray, tuple)):
+        return list(value.tolist() if isinstance(value, np.ndarray) else value)
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class TuningCache:
+    """
+    Small file-backed key -> result store.
+    Hits and misses are counted so callers (and tests of a run) can see what was skipped.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._path(key) + f".{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f, indent=2, default=_to_json)
+        # atomic: concurrent batch workers never see a half-written entry
+        os.replace(tmp_path, self._path(key))
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return 0
+        removed = 0
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.directory, name))
+                removed += 1
+        return removed
+
+    def cached(self, search_name, arrays, config, compute, packages=None):
+        """
+        Return the cached result of search_name for (arrays, config), or run compute() and store it.
+        compute() must return a JSON-serialisable dict.
+        """
+        config = {"search": search_name, "config": config, "versions": library_versions(packages)}
+        key = fingerprint(arrays, config)
+
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            print(f"\n✅ {search_name}: using cached tuning result ({key[:12]})")
+            return entry["result"]
+
+        self.misses += 1
+        result = compute()
+        self.put(key, {"key": key, **config, "result": result})
+        return result
+
+
+# -----------------------------
+# Cached searches
+# -----------------------------
+def cached_find_best_nu(svm_agent_class, X_train, X_val, y_val, nu_options=None, cache=None):
+    """ find_best_nu with a persistent cache. :return: best nu """
+    cache = cache or TuningCache()
+    nu_options = np.arange(0.01, 0.51, 0.01) if nu_options is None else nu_options
+
+    def compute():
+        best_nu, table = find_best_nu(svm_agent_class, X_train, X_val, y_val, nu_options, return_table=True)
+        return {"params": {"nu": float(best_nu)}, "table": table}
+
+    config = {"agent_class": svm_agent_class, "nu_options": np.round(np.asarray(nu_options, dtype=float), 6)}
+    result = cache.cached("find_best_nu", [X_train, X_val, np.asarray(y_val)], config, compute)
+    return result["params"]["nu"]
+
+
+def cached_find_best_n_estimators_if(X, y, n_start=50, n_end=300, step=10, contamination=0.05,
+                                     random_state=42, cache=None):
+    """ find_best_n_estimators_if with a persistent cache. :return: best n_estimators """
+    cache = cache or TuningCache()
+
+    def compute():
+        best_n, table = find_best_n_estimators_if(X, y, n_start, n_end, step, contamination, random_state,
+                                                  return_table=True)
+        return {"params": {"n_estimators": int(best_n)}, "table": table}
+
+    config = {"n_start": n_start, "n_end": n_end, "step": step,
+              "contamination": contamination, "random_state": random_state}
+    result = cache.cached("find_best_n_estimators_if", [X, np.asarray(y)], config, compute)
+    return result["params"]["n_estimators"]
+
+
+def cached_successive_halving_search(X_train_dict, X_val_dict, y_val, agents=None, spaces=None,
+                                     eta=3, n_jobs=None, seed=42, cache=None):
+    """
+    successive_halving_search with a persistent cache (n_jobs does not change the result and is not keyed).
+    """
+    cache = cache or TuningCache()
+    spaces = {**SEARCH_SPACES, **(spaces or {})}
+    if agents is None:
+        agents = [name for name in spaces if name in X_train_dict]
+
+    def compute():
+        return successive_halving_search(X_train_dict, X_val_dict, y_val, agents=agents, spaces=spaces,
+                                         eta=eta, n_jobs=n_jobs, seed=seed)
+
+    arrays = [np.asarray(y_val)]
+    for name in agents:
+        arrays += [X_train_dict[name], X_val_dict[name]]
+
+    config = {"agents": agents, "spaces": {name: spaces[name] for name in agents},
+              "budgets": {name: BUDGETS[name] for name in agents}, "eta": eta, "seed": seed}
+    packages = VERSIONED_PACKAGES + (["tensorflow-cpu", "tensorflow", "tf-keras"] if "Autoencoder" in agents else [])
+    result = cache.cached("successive_halving_search", arrays, config, compute, packages=packages)
+
+    # JSON has no tuples; layer sizes are used as tuples by the agents
+    for name, entry in result.items():
+        entry["params"] = {k: tuple(v) if isinstance(v, list) else v for k, v in entry["params"].items()}
+    return result